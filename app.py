@@ -1,9 +1,13 @@
+import argparse
 import pandas   as pd
 import datetime as DT
 
 from datetime import datetime
 
+from utils                  import profiling
 from utils.search_string    import location
+from utils.news_ingest      import ingest
+from utils.pipeline         import run_pipeline
 from market_response.crypto import CoinMarketCapResponse
 from media_response.news    import CryptoNewsResponse
 
@@ -23,53 +27,86 @@ slugs, tickers, id = list(zip(*[[x, y, z] for x, (y, z) in cryptocurrencies.item
 coins        = 5000
 currency     = "USD"
 cmc_endpoint = "latest-quotes"
-today        = datetime.now().strftime("%Y%m%d")
 
 # run_type = "API"                # !!! Uses CMC API key and credit. Are you SURE???
 # run_type = "SANDBOX"            # Uses CMC sandbox and no credit.
-run_type = "DEBUG"              # Uses ../data/debug_<endpoint>_data.csv (we want this for testing).
-
-crypto_data = CoinMarketCapResponse(tickers, slugs, id, coins, currency, cmc_endpoint, run_type=run_type)
-crypto_data.to_csv(mode="a", suffix=today)
-
-crypto_df = crypto_data.dataframe
+cmc_run_type = "DEBUG"            # Uses ../data/debug_<endpoint>_data.csv (we want this for testing).
 
 # CRYPTO NEWS SECTION
 items         = 50               # Pull 50 articles.
 rank_days     = 3                # Will sort by rank for the last X days.
 news_endpoint = "ticker-news"    # Define the type of data to collect (ARCHIVE_FILES).
-run_type = "TICKER-NEWS"         # !!! Uses Cryptonews API key and credit. Are you SURE???
+news_run_type = "TICKER-NEWS"    # !!! Uses Cryptonews API key and credit. Are you SURE???
+
+# FETCH ENGINE SECTION
+max_workers = 4                  # Maximum number of requests in flight at once.
 
 time_formatter = lambda t: t.strftime("%Y%m%d")
-today = DT.datetime.now()
-
-for page in range(1, 4):
-    for day in range(14, 22):
-        collection_switch = {
-            ("ticker-top-mention", "TICKER-TOP-MENTION"): {
-                "date": f"{time_formatter(today-DT.timedelta(days=7))}-{time_formatter(today)}",
-                "run_type": "TIKER-MENTION",
-                "save_csv": None,
-                },
-            ("ticker-stats", "TICKER-STATS"): {
-                "date": "last7days",
-                "run_type": "TICKER-STATS",
-                "save_csv": None,
-                },
-            ("ticker-news", "TICKER-NEWS"): {
-                "date": f"202108{day}",
-                "items": 50,
-                "rank_days": 1,
-                "run_type": "TICKER-NEWS",
-                "save_csv": None,
-                "page": page,
-                },
-        }
-
-        # Collect news:
-        collection = collection_switch.get((news_endpoint, run_type))
-        news_data  = CryptoNewsResponse(tickers, news_endpoint, **collection)
-        suffix     = collection["date"]
-
-        news_data.to_csv(mode="a", suffix=suffix)
 
+
+def collect_market(run_type=cmc_run_type, endpoint=cmc_endpoint):
+    today = datetime.now().strftime("%Y%m%d")
+
+    crypto_data = CoinMarketCapResponse(tickers, slugs, id, coins, currency, endpoint, run_type=run_type)
+    crypto_data.to_csv(mode="a", suffix=today)
+
+    return crypto_data.dataframe
+
+
+def news_collection(page, day, today, run_type=news_run_type, endpoint=news_endpoint):
+    collection_switch = {
+        ("ticker-top-mention", "TICKER-TOP-MENTION"): {
+            "date": f"{time_formatter(today-DT.timedelta(days=7))}-{time_formatter(today)}",
+            "run_type": "TIKER-MENTION",
+            "save_csv": None,
+            },
+        ("ticker-stats", "TICKER-STATS"): {
+            "date": "last7days",
+            "run_type": "TICKER-STATS",
+            "save_csv": None,
+            },
+        ("ticker-news", "TICKER-NEWS"): {
+            "date": f"202108{day}",
+            "items": 50,
+            "rank_days": 1,
+            "run_type": "TICKER-NEWS",
+            "save_csv": None,
+            "page": page,
+            },
+    }
+
+    return collection_switch.get((endpoint, run_type))
+
+
+def collect_news(pages=range(1, 4), days=range(14, 22), run_type=news_run_type, endpoint=news_endpoint):
+    today = DT.datetime.now()
+
+    # Plan the page x day grid without I/O, then run the unique queries through the staged
+    # pipeline: fetches overlap with parsing, and each target archive is written in batches.
+    collections     = [news_collection(page, day, today, run_type, endpoint) for page in pages for day in days]
+    news_data       = [CryptoNewsResponse(tickers, endpoint, lazy=True, **collection) for collection in collections]
+    news_data, took = run_pipeline(news_data, fetch_workers=max_workers, mode="a", suffix=lambda r: r.date)
+
+    print(took.to_string(index=False))
+
+    return news_data
+
+
+def collect_news_incremental(run_type=news_run_type, endpoint=news_endpoint):
+    # Steady-state alternative to collect_news(): only articles newer than each ticker's
+    # persisted watermark are fetched (data/.state/news_watermarks.json).
+    return ingest(tickers, endpoint=endpoint, items=items, run_type=run_type)
+
+
+if __name__ == "__main__":
+    # Usage: python app.py [--profile [DIR]]
+    #   --profile writes a CPU/allocation profile per stage (see utils/profiling.py) at exit.
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--profile", nargs="?", const="")
+    args = parser.parse_args()
+
+    if args.profile is not None:
+        profiling.enable(args.profile or None)
+
+    crypto_df = collect_market()
+    news_data = collect_news()
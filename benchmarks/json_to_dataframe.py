@@ -0,0 +1,114 @@
+import sys
+sys.path.append('.')
+
+import io
+import re
+import json
+import time
+import tracemalloc
+
+import pandas as pd
+
+from market_response.crypto import CoinMarketCapResponse
+from utils                  import json_stream
+from utils.frame_builder    import ColumnBuffer, cmc_frame
+from utils.synthetic        import cmc_payload
+
+
+SIZES   = [100, 1_000, 5_000]
+REPEATS = 3
+
+
+def legacy_json_to_dataframe(response):
+    # CoinMarketCapResponse.json_to_dataframe before the row builder, kept for comparison.
+    df = pd.json_normalize(response["data"])
+
+    df.columns = ['.'.join(re.split(r"\.", col)[1:]) for col in df.columns]
+    try:
+        stack = lambda s: s.stack(dropna=False).values
+        stack(df.iloc[:, :1])
+    except (TypeError, ValueError):
+        # pandas >= 2.1 rejects dropna and duplicate column labels; the frame is a single row, so
+        # stacking it is the same as flattening the values.
+        stack = lambda s: s.values.ravel()
+
+    return pd.DataFrame({col: stack(df.loc[:, col]) for col in df.columns.unique()})
+
+
+def measure(func, *args):
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    func(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return best, peak
+
+
+def builder(response):
+    client = CoinMarketCapResponse([], [], [], len(response["data"]), "USD", "latest-quotes", cache=False, lazy=True)
+    client.load_response(response)
+
+    return client.dataframe
+
+
+def full_parse(body):
+    # Response bytes -> str -> object tree -> frame, as in the default (non-streaming) mode.
+    return cmc_frame(json.loads(body.decode("utf-8"))["data"])
+
+
+def stream_parse(body):
+    # Always streamed, whatever the body size (see json_stream.STREAM_MIN_BYTES).
+    buffer = ColumnBuffer()
+    json_stream.read_records(io.BytesIO(body), buffer)
+
+    return buffer.to_frame()
+
+
+def run(sizes=SIZES):
+    results = []
+    for coins in sizes:
+        for endpoint in ["latest-quotes", "latest-listings"]:
+            # No "platform" dicts: the legacy path breaks on records of different shapes.
+            response = cmc_payload(coins, endpoint=endpoint, tokens=0)
+
+            for name, func in [("legacy", legacy_json_to_dataframe), ("builder", builder)]:
+                # The legacy path only understood "data" keyed by id.
+                if name == "legacy" and endpoint == "latest-listings":
+                    continue
+
+                seconds, peak = measure(func, response)
+                results.append({
+                    "coins":    coins,
+                    "endpoint": endpoint,
+                    "method":   name,
+                    "seconds":  round(seconds, 5),
+                    "peak_mb":  round(peak / 1024**2, 2),
+                })
+
+    # Parse modes start from the raw response body, so the decoded text and object tree count.
+    if json_stream.ijson is not None:
+        for coins in sizes:
+            body = json.dumps(cmc_payload(coins, endpoint="latest-listings")).encode("utf-8")
+
+            for name, func in [("full-parse", full_parse), ("stream", stream_parse)]:
+                seconds, peak = measure(func, body)
+                results.append({
+                    "coins":    coins,
+                    "endpoint": "latest-listings",
+                    "method":   name,
+                    "seconds":  round(seconds, 5),
+                    "peak_mb":  round(peak / 1024**2, 2),
+                })
+
+    return pd.DataFrame(results)
+
+
+if __name__ == "__main__":
+    # Usage: python benchmarks/json_to_dataframe.py
+    print(run().to_string(index=False))
@@ -0,0 +1,129 @@
+import sys
+sys.path.append('.')
+
+import io
+import time
+import argparse
+import contextlib
+
+import numpy  as np
+import pandas as pd
+
+from market_response.crypto import CoinMarketCapResponse
+from media_response.news    import CryptoNewsResponse
+from utils                  import http_session
+from utils.fetch            import fetch_all
+from utils.mock_server      import MockAPIServer, symbols
+
+
+# Offline load test of both clients against utils/mock_server.py: every request goes through the
+# real fetch path (pooled session, retries, JSON decode, frame build) with the response cache off.
+
+ENDPOINTS = ["latest-quotes", "latest-listings", "ticker-news", "ticker-stats", "ticker-top-mention"]
+REQUESTS  = 40
+WORKERS   = 4
+
+# Records per response: coins (CMC), articles (ticker-news) or tickers (stats, top-mention).
+SIZE = 500
+
+
+def cmc_client(url, endpoint, size, i):
+    tickers = symbols(size)
+    ids     = [str(n + 1) for n in range(size)]
+
+    return CoinMarketCapResponse(tickers, tickers, ids, size, "USD", endpoint, run_type="API", domain=url,
+                                 cache=False, lazy=True)
+
+
+def news_client(url, endpoint, size, i):
+    run_type = {"ticker-news": "TICKER-NEWS", "ticker-stats": "TICKER-STATS", "ticker-top-mention": "TICKER-TOP-MENTION"}[endpoint]
+    date     = {"ticker-stats": "last7days", "ticker-top-mention": "08152021-08212021"}.get(endpoint, "today")
+
+    # Pages cycle so the server sees distinct requests, as a paged collection would.
+    return CryptoNewsResponse(symbols(6), endpoint, date=date, items=size, page=i % 10 + 1, run_type=run_type,
+                              domain=url, cache=False, lazy=True)
+
+
+def client(url, endpoint, size, i):
+    if endpoint in CoinMarketCapResponse.ARCHIVE_FILES:
+        return cmc_client(url, endpoint, size, i)
+    return news_client(url, endpoint, size, i)
+
+
+def timed(query):
+    # (seconds, rows) of one query; rows is None when the request failed after its retries.
+    def job():
+        start = time.perf_counter()
+        query.request()
+        seconds = time.perf_counter() - start
+
+        df = query.dataframe
+        return seconds, len(df) if isinstance(df, pd.DataFrame) and not df.empty else None
+
+    return job
+
+
+def load(url, endpoint, requests=REQUESTS, workers=WORKERS, size=SIZE):
+    queries = [client(url, endpoint, size, i) for i in range(requests)]
+
+    # Each request() prints its source; keep the report readable.
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = fetch_all([timed(query) for query in queries], max_workers=workers)
+    wall = time.perf_counter() - start
+
+    seconds = np.array([s for s, _ in results])
+    rows    = [r for _, r in results if r is not None]
+
+    return {
+        "endpoint":   endpoint,
+        "requests":   requests,
+        "failed":     requests - len(rows),
+        "rows":       sum(rows),
+        "wall_s":     round(wall, 3),
+        "req_per_s":  round(requests / wall, 1),
+        "rows_per_s": round(sum(rows) / wall),
+        "p50_ms":     round(np.percentile(seconds, 50) * 1000, 1),
+        "p95_ms":     round(np.percentile(seconds, 95) * 1000, 1),
+        "max_ms":     round(seconds.max() * 1000, 1),
+    }
+
+
+def run(url, endpoints=ENDPOINTS, requests=REQUESTS, workers=WORKERS, size=SIZE):
+    # One keep-alive connection per worker, so no connection is discarded for a full pool.
+    http_session.set_session(http_session.new_session(default_pool_size=workers))
+
+    return pd.DataFrame([load(url, endpoint, requests, workers, size) for endpoint in endpoints])
+
+
+if __name__ == "__main__":
+    # Usage: python benchmarks/load_test.py [--size 5000] [--requests 40] [--workers 8] [--latency 0.2] [--error-rate 0.05]
+    #   Starts utils/mock_server.py in-process unless --url points at one already running (e.g. in
+    #   another process, so the server does not share this interpreter).
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url")
+    parser.add_argument("--endpoints",   nargs="+", default=ENDPOINTS)
+    parser.add_argument("--requests",    type=int,   default=REQUESTS)
+    parser.add_argument("--workers",     type=int,   default=WORKERS)
+    parser.add_argument("--size",        type=int,   default=SIZE)
+    parser.add_argument("--latency",     type=float, default=0.05)
+    parser.add_argument("--jitter",      type=float, default=0.05)
+    parser.add_argument("--error-rate",  type=float, default=0.0)
+    parser.add_argument("--retry-after", type=int,   default=0)
+    args = parser.parse_args()
+
+    server = None
+    if not args.url:
+        server = MockAPIServer(port=0, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                               retry_after=args.retry_after).start()
+
+    try:
+        report = run(args.url or server.url, args.endpoints, args.requests, args.workers, args.size)
+    finally:
+        if server:
+            server.stop()
+
+    print(report.to_string(index=False))
+
+    if server:
+        print(pd.DataFrame(server.stats()).T.to_string())
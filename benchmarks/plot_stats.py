@@ -0,0 +1,174 @@
+import sys
+sys.path.append('.')
+
+import time
+import string
+
+import numpy  as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from utils.plot import stats, total_mentions
+
+
+TICKERS = [6, 60, 600, 3_000]
+DAYS    = 7
+REPEATS = 3
+
+LEGACY_MAX_TICKERS = 600
+
+
+def symbols(n):
+    rng = np.random.default_rng(0)
+    return ["".join(rng.choice(list(string.ascii_uppercase), 3)) + str(i) for i in range(n)]
+
+
+def stats_frame(tickers, days=DAYS, seed=0):
+    # Same layout as data/ticker-stats_last7days.csv.
+    rng   = np.random.default_rng(seed)
+    dates = pd.date_range("2021-08-15", periods=days).strftime("%Y-%m-%d")
+    rows  = len(tickers) * days
+
+    df = pd.DataFrame({
+        "Neutral":         rng.integers(0, 200, rows),
+        "Positive":        rng.integers(0, 200, rows),
+        "Negative":        rng.integers(0, 200, rows),
+        "sentiment_score": rng.uniform(-1.5, 1.5, rows).round(3),
+        "date":            np.tile(dates, len(tickers)),
+        "ticker":          np.repeat(tickers, days),
+    })
+    totals = df.groupby("ticker")[["Positive", "Negative", "Neutral"]].transform("sum")
+
+    return df.assign(**{
+        "Total Positive":  totals["Positive"],
+        "Total Negative":  totals["Negative"],
+        "Total Neutral":   totals["Neutral"],
+        "Sentiment Score": rng.uniform(-1.5, 1.5, rows).round(3),
+    })
+
+
+def mentions_frame(tickers, seed=0):
+    # Same layout as the ticker-top-mention response.
+    rng  = np.random.default_rng(seed)
+    rows = len(tickers)
+    pos, neg, neu = (rng.integers(0, 500, rows) for _ in range(3))
+
+    return pd.DataFrame({
+        "ticker":            tickers,
+        "name":              [f"Coin {t}" for t in tickers],
+        "total_mentions":    pos + neg + neu,
+        "positive_mentions": pos,
+        "negative_mentions": neg,
+        "neutral_mentions":  neu,
+        "sentiment_score":   rng.uniform(-1.5, 1.5, rows).round(3),
+        "from_date":         "08152021",
+        "to_date":           "08212021",
+    })
+
+
+def legacy_ordinal(n):
+    return "%d%s" % (n,"tsnrhtdd"[(n//10%10!=1)*(n%10<4)*n%10::4])
+
+
+def legacy_stats_bar(df):
+    # stats_bar/get_custom_data before grouped totals and array-level ordinals, for comparison.
+    df.columns = [str(col.lower()).replace(" ", "_") for col in df.columns]
+    df["mentions"] = df.loc[:, ["positive", "negative", "neutral"]].sum(axis=1)
+
+    for ticker in df["ticker"].unique():
+        df.loc[df["ticker"]==ticker, "total_mentions"] = df.loc[df["ticker"]==ticker, "mentions"].sum()
+        df.loc[df["ticker"]==ticker, "total_positive"] = df.loc[df["ticker"]==ticker, "positive"].sum()
+        df.loc[df["ticker"]==ticker, "total_negative"] = df.loc[df["ticker"]==ticker, "negative"].sum()
+        df.loc[df["ticker"]==ticker, "total_neutral"]  = df.loc[df["ticker"]==ticker, "neutral" ].sum()
+
+    df        = df.sort_values(["ticker", "date"], ascending=True)
+    rank_dict = {key: stats.get_rank(df[key]) for key in df.columns}
+    columns   = [df["date"], df["mentions"], df["positive"], df["negative"], df["neutral"]]
+    columns  += [[legacy_ordinal(n) for n in rank_dict[key]] for key in ["mentions", "positive", "negative", "neutral"]]
+    columns  += [df["total_mentions"], df["total_positive"], df["total_negative"], df["total_neutral"]]
+    columns  += [[legacy_ordinal(n) for n in rank_dict[key]] for key in ["total_mentions", "total_positive", "total_negative", "total_neutral"]]
+
+    return legacy_figure(stats, df, np.stack(columns, axis=-1), ["positive", "negative", "neutral"])
+
+
+def legacy_mentions_bar(df, tickers=[]):
+    df = df[df["ticker"].isin(tickers)]
+    df = df.sort_values("ticker", ascending=True)
+
+    df["from_date"] = pd.to_datetime(df["from_date"], format="%m%d%Y").dt.strftime("%d-%b-%Y")
+    df["to_date"]   = pd.to_datetime(df["to_date"],   format="%m%d%Y").dt.strftime("%d-%b-%Y")
+
+    rank_dict = {key: total_mentions.get_rank(df[key]) for key in df.columns}
+    columns   = [df["name"], df["from_date"], df["total_mentions"], df["positive_mentions"], df["negative_mentions"], df["neutral_mentions"]]
+    columns  += [[legacy_ordinal(n) for n in rank_dict[key]] for key in total_mentions.RANK_COLS[:4]]
+    columns  += [df["sentiment_score"], [legacy_ordinal(n) for n in rank_dict["sentiment_score"]]]
+
+    return legacy_figure(total_mentions, df, np.stack(columns, axis=-1), ["positive_mentions", "negative_mentions", "neutral_mentions"])
+
+
+def legacy_figure(module, df, customdata, columns):
+    fig = go.Figure([module.create_bar_trace(df[col], df["ticker"], col, customdata=customdata) for col in columns])
+    module.set_layout(df, fig)
+
+    return fig
+
+
+def new_stats_bar(df):
+    return stats.stats_bar(df)
+
+
+def new_mentions_bar(df):
+    return total_mentions.mentions_bar(df, tickers=list(df["ticker"]))
+
+
+def legacy_mentions(df):
+    return legacy_mentions_bar(df, tickers=list(df["ticker"]))
+
+
+def same(a, b):
+    # Legacy totals were floats ("12.0"), the grouped ones are ints ("12").
+    a, b = np.asarray(a).ravel(), np.asarray(b).ravel()
+    for x, y in zip(a, b):
+        if x != y and float(x) != float(y):
+            return False
+    return len(a) == len(b)
+
+
+def measure(func, make_df):
+    best = float("inf")
+    for _ in range(REPEATS):
+        df    = make_df()
+        start = time.perf_counter()
+        out   = func(df)
+        best  = min(best, time.perf_counter() - start)
+
+    return best, out
+
+
+def run(sizes=TICKERS):
+    cases = [
+        ("stats_bar",    lambda tickers: lambda: stats_frame(tickers),    new_stats_bar,    legacy_stats_bar),
+        ("mentions_bar", lambda tickers: lambda: mentions_frame(tickers), new_mentions_bar, legacy_mentions),
+    ]
+
+    results = []
+    for n in sizes:
+        tickers = symbols(n)
+
+        for plot, make, new, legacy in cases:
+            seconds, fig = measure(new, make(tickers))
+            results.append({"plot": plot, "tickers": n, "method": "vectorized", "seconds": round(seconds, 4)})
+
+            # The quadratic loop takes minutes past LEGACY_MAX_TICKERS.
+            if n <= LEGACY_MAX_TICKERS:
+                seconds, old = measure(legacy, make(tickers))
+                results.append({"plot": plot, "tickers": n, "method": "legacy", "seconds": round(seconds, 4)})
+
+                assert same(old.data[0].customdata, fig.data[0].customdata), f"{plot} hover data changed"
+
+    return pd.DataFrame(results)
+
+
+if __name__ == "__main__":
+    # Usage: python benchmarks/plot_stats.py
+    print(run().to_string(index=False))
@@ -0,0 +1,357 @@
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import subprocess
+import tracemalloc
+
+from datetime import datetime
+
+ROOT     = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(ROOT, "data")
+
+# Project modules resolve data/, data/.state and data/.cache from the working directory at import
+# time. The suite runs them from a scratch directory so it never writes next to the real archives.
+WORK_DIR = tempfile.mkdtemp(prefix="gcb-bench-")
+sys.path.insert(0, ROOT)
+os.chdir(WORK_DIR)
+os.makedirs("data")
+
+import numpy  as np
+import pandas as pd
+
+from market_response.crypto     import CoinMarketCapResponse
+from media_response.news        import CryptoNewsResponse
+from utils                      import Clean_data_crypto_function, Clean_news_function, json_stream
+from utils.frame_builder        import ColumnBuffer, cmc_frame
+from utils.merge_crypto_sources import merge_df
+from utils.plot.stats           import stats_bar
+from utils.plot.total_mentions  import mentions_bar
+from utils.synthetic            import cmc_payload, news_payload
+from utils.timezone             import to_utc_datetime
+
+
+# The old-vs-new comparisons run at sizes of their own: benchmarks/json_to_dataframe.py (legacy
+# json_normalize path, 100 to 5,000 coins) and benchmarks/plot_stats.py (legacy plot loops, 6 to
+# 3,000 tickers).
+SCALES  = [1, 10, 100]
+REPEATS = 3
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+# A run is flagged when a benchmark is this many times slower than in the compared results.
+REGRESSION = 1.25
+
+# Records per API response at 1x: the clients' default page size.
+BASE_RECORDS = 50
+
+# Rows appended per to_csv(mode="a") call: ten CMC scrapes of the six tracked coins, or one
+# news page.
+APPEND_ROWS = {"latest-quotes_data_ALL": 60, "debug_ticker-news_data": 50}
+
+# How the archives in data/ are scaled up. Every copy of the rows is shifted past the previous
+# one in time (keeping each column's own format), gets unique values where the archive needs
+# them (news_url), or new tickers where the benchmark scales with the ticker universe.
+SCALE_UP = {
+    "latest-quotes_data_ALL": {
+        "time":   {"last_updated": "%Y-%m-%dT%H:%M:%S.000Z", "quote.USD.last_updated": "%Y-%m-%d %H:%M:%S+00:00"},
+    },
+    "ticker-news_data_ALL": {
+        "time":   {"date": "%a, %d %b %Y %H:%M:%S %z"},
+        "unique": ["news_url"],
+    },
+    "debug_ticker-news_data": {
+        "time":   {"date": "%a, %d %b %Y %H:%M:%S %z"},
+        "unique": ["news_url"],
+    },
+    "ticker-stats_last7days": {
+        "ticker": ["ticker"],
+    },
+}
+
+
+def read_data(name):
+    df = pd.read_csv(os.path.join(DATA_DIR, name + ".csv"))
+    return df.drop(columns=[col for col in df.columns if col.startswith("Unnamed")])
+
+
+def scaled(name, factor, start=0):
+    # `factor` copies of data/<name>.csv; copy k is copy 0 moved k time spans (or k ticker sets)
+    # along, so the scaled archive reads like a longer history (or a wider universe).
+    base  = read_data(name)
+    rules = SCALE_UP[name]
+    times = {col: to_utc_datetime(base[col]) for col in rules.get("time", {})}
+    span  = max([(t.max() - t.min()) for t in times.values()] or [pd.Timedelta(0)]) + pd.Timedelta(minutes=5)
+
+    copies = []
+    for k in range(start, start + factor):
+        df = base.copy()
+        for col, fmt in rules.get("time", {}).items():
+            df[col] = (times[col] + k * span).dt.strftime(fmt)
+        for col in rules.get("unique", []) + rules.get("ticker", []):
+            df[col] = df[col].astype(str) + (f"-{k}" if k else "")
+        copies.append(df)
+
+    return pd.concat(copies, ignore_index=True)
+
+
+def mentions_from_stats(stats_df):
+    # ticker-top-mention rows derived from the (scaled) ticker-stats archive.
+    grp   = stats_df.groupby("ticker")
+    dates = pd.to_datetime(stats_df["date"])
+
+    df = pd.DataFrame({
+        "name":              grp["ticker"].first(),
+        "positive_mentions": grp["Positive"].sum(),
+        "negative_mentions": grp["Negative"].sum(),
+        "neutral_mentions":  grp["Neutral"].sum(),
+        "sentiment_score":   grp["sentiment_score"].mean().round(3),
+    })
+    df["total_mentions"] = df[["positive_mentions", "negative_mentions", "neutral_mentions"]].sum(axis=1)
+    df["from_date"]      = dates.min().strftime("%m%d%Y")
+    df["to_date"]        = dates.max().strftime("%m%d%Y")
+
+    return df.reset_index()
+
+
+def cmc_client(payload, endpoint="latest-quotes"):
+    client = CoinMarketCapResponse([], [], [], len(payload["data"]), "USD", endpoint, cache=False, lazy=True)
+    client.load_response(payload)
+
+    return client
+
+
+def news_client(payload, endpoint="ticker-news"):
+    client = CryptoNewsResponse([], endpoint, items=len(payload["data"]), run_type="TICKER-NEWS", cache=False, lazy=True)
+    client.load_response(payload)
+
+    return client
+
+
+def full_parse(body):
+    # Response bytes -> str -> object tree -> frame, as in the default (non-streaming) mode.
+    return cmc_frame(json.loads(body.decode("utf-8"))["data"])
+
+
+def stream_parse(body):
+    # Always streamed, whatever the body size (see json_stream.STREAM_MIN_BYTES).
+    buffer = ColumnBuffer()
+    json_stream.read_records(io.BytesIO(body), buffer)
+
+    return buffer.to_frame()
+
+
+def measure(func, setup=None, repeats=REPEATS):
+    # Best wall time of `repeats` runs, then one traced run for the peak Python allocation.
+    # setup() builds the inputs outside the timed region; func(*inputs) is the hot path.
+    best = float("inf")
+    for _ in range(repeats):
+        args  = setup() if setup else ()
+        start = time.perf_counter()
+        func(*args)
+        best  = min(best, time.perf_counter() - start)
+
+    args = setup() if setup else ()
+    tracemalloc.start()
+    func(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return best, peak
+
+
+def snapshot(paths):
+    # Copy of an archive and its state, so every repeat appends to the same starting point.
+    saved = tempfile.mkdtemp(dir=WORK_DIR)
+    for path in paths:
+        if os.path.isdir(path):
+            shutil.copytree(path, os.path.join(saved, os.path.basename(path)))
+        elif os.path.isfile(path):
+            shutil.copy2(path, saved)
+
+    def restore():
+        for path in paths:
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            elif os.path.isfile(path):
+                os.remove(path)
+
+            copy = os.path.join(saved, os.path.basename(path))
+            if os.path.isdir(copy):
+                shutil.copytree(copy, path)
+            elif os.path.isfile(copy):
+                shutil.copy2(copy, path)
+
+    return restore
+
+
+def append_case(scale, name, client, archive, state):
+    # Seed data/<archive> with scale x the real archive and bring its state (rollups, ticker and
+    # dedup indexes) up to date with one append; each repeat then appends a fresh batch to it.
+    filename = os.path.join("data", archive)
+    seed     = scaled(name, scale)
+    batch    = scaled(name, 1, start=scale).head(APPEND_ROWS[name])
+
+    client.write_archive(seed.iloc[:-len(batch)], filename, mode="w")
+    client.write_archive(seed.iloc[-len(batch):], filename, mode="a")
+
+    restore = snapshot([filename] + state)
+
+    def setup():
+        restore()
+        return ()
+
+    return lambda: client.write_archive(batch, filename, mode="a"), setup, len(seed)
+
+
+def cases(scale):
+    # (benchmark, build) for every hot path at one scale. build() seeds the inputs and returns
+    # (rows, func, setup); it only runs for the benchmarks selected, so --only skips the
+    # (large) inputs of the others.
+    records = BASE_RECORDS * scale
+
+    def json_to_dataframe(client, payload):
+        def build():
+            payload_ = payload(records)
+            return records, lambda: client(payload_).json_to_dataframe(), None
+        return build
+
+    def parse(func):
+        # From the raw response body, so the decoded text and object tree count.
+        def build():
+            body = json.dumps(cmc_payload(records, endpoint="latest-listings")).encode("utf-8")
+            return records, lambda: func(body), None
+        return build
+
+    def append(name, client, archive, state):
+        def build():
+            func, setup, rows = append_case(scale, name, client(), archive, state)
+            return rows, func, setup
+        return build
+
+    def clean_crypto():
+        # Cleaners read the daily partitions the clients write with to_csv(mode="w").
+        quotes = scaled("latest-quotes_data_ALL", scale)
+        quotes.to_csv(Clean_data_crypto_function.date_str_func("bench"))
+        return len(quotes), lambda: Clean_data_crypto_function.data_pull("bench"), None
+
+    def clean_news():
+        articles = scaled("debug_ticker-news_data", scale)
+        articles.to_csv(Clean_news_function.date_str_func("bench"))
+        return len(articles), lambda: Clean_news_function.data_pull("bench"), None
+
+    def merge():
+        quotes_df = scaled("latest-quotes_data_ALL", scale)
+        news_df   = scaled("ticker-news_data_ALL", scale)
+        return len(quotes_df) + len(news_df), lambda: merge_df(quotes_df, news_df), None
+
+    def plot_stats():
+        stats_df = scaled("ticker-stats_last7days", scale)
+        return len(stats_df), stats_bar, lambda: (stats_df.copy(),)
+
+    def plot_mentions():
+        mentions_df = mentions_from_stats(scaled("ticker-stats_last7days", scale))
+        return len(mentions_df), lambda df: mentions_bar(df, tickers=list(df["ticker"])), lambda: (mentions_df.copy(),)
+
+    yield "cmc.json_to_dataframe",  json_to_dataframe(cmc_client, lambda n: cmc_payload(n, tokens=0.5))
+    yield "news.json_to_dataframe", json_to_dataframe(news_client, news_payload)
+    yield "cmc.full_parse",         parse(full_parse)
+
+    # Streaming needs the optional ijson package.
+    if json_stream.ijson is not None:
+        yield "cmc.stream_parse", parse(stream_parse)
+
+    yield "cmc.to_csv(mode='a')",  append("latest-quotes_data_ALL", lambda: cmc_client(cmc_payload(1)), "latest-quotes_data_ALL.csv",
+                                          [os.path.join("data", ".state"), os.path.join("data", "rollups")])
+    yield "news.to_csv(mode='a')", append("debug_ticker-news_data", lambda: news_client(news_payload(1)), "ticker-news_data_ALL.csv",
+                                          [os.path.join("data", ".state")])
+
+    yield "Clean_data_crypto.data_pull",   clean_crypto
+    yield "Clean_news.data_pull",          clean_news
+    yield "merge_crypto_sources.merge_df", merge
+    yield "plot.stats_bar",                plot_stats
+    yield "plot.mentions_bar",             plot_mentions
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+
+def run(scales=SCALES, only=None):
+    results = []
+    for scale in scales:
+        for bench, build in cases(scale):
+            if only and not any(name in bench for name in only):
+                continue
+
+            rows, func, setup = build()
+            seconds, peak     = measure(func, setup)
+            results.append({
+                "benchmark": bench,
+                "scale":     scale,
+                "rows":      int(rows),
+                "seconds":   round(seconds, 5),
+                "peak_mb":   round(peak / 1024**2, 2),
+            })
+            print(f"{bench:<32} {scale:>4}x {rows:>9} rows {seconds:>9.4f}s {peak / 1024**2:>9.2f} MB", flush=True)
+
+    return {
+        "revision":  git_revision(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python":    platform.python_version(),
+        "pandas":    pd.__version__,
+        "numpy":     np.__version__,
+        "results":   results,
+    }
+
+
+def compare(current, previous, threshold=REGRESSION):
+    # Benchmarks present in both runs, with the time ratio; ratios above threshold are regressions.
+    key  = ["benchmark", "scale"]
+    cur  = pd.DataFrame(current["results"]).set_index(key)
+    prev = pd.DataFrame(previous["results"]).set_index(key)
+    df   = cur[["seconds"]].join(prev[["seconds"]], rsuffix="_previous", how="inner")
+
+    df["ratio"]      = (df["seconds"] / df["seconds_previous"]).round(2)
+    df["regression"] = df["ratio"] > threshold
+
+    return df.reset_index()
+
+
+if __name__ == "__main__":
+    # Usage: python benchmarks/suite.py [--scales 1 10 100] [--only merge plot] [--compare results.json]
+    #   Writes benchmarks/results/<timestamp>_<revision>.json; with --compare, exits with status 1
+    #   if any benchmark got more than REGRESSION times slower.
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scales",  type=int, nargs="+", default=SCALES)
+    parser.add_argument("--only",    nargs="+")
+    parser.add_argument("--out")
+    parser.add_argument("--compare")
+    args = parser.parse_args()
+
+    try:
+        report = run(args.scales, args.only)
+    finally:
+        os.chdir(ROOT)
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+    out = args.out or os.path.join(RESULTS_DIR, f"{datetime.now():%Y%m%d_%H%M%S}_{report['revision'] or 'local'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results : {out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            diff = compare(report, json.load(f))
+
+        print(diff.to_string(index=False))
+        sys.exit(1 if diff["regression"].any() else 0)
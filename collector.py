@@ -0,0 +1,207 @@
+import os
+import sys
+import time
+import fcntl
+import random
+import signal
+import argparse
+import threading
+import traceback
+
+from datetime  import datetime
+from functools import partial
+
+import app
+
+
+# Long-running replacement for cmc_runner.bat plus an OS scheduler. One process keeps the
+# interpreter, pandas and the pooled HTTP session (utils/http_session.py), response cache and
+# instrument warm between runs, and schedules each collection on its own interval.
+#   python collector.py [--market-interval 300] [--news-interval 3600] [--jitter 0.1]
+#                       [--market-run-type API] [--news-run-type TICKER-NEWS]
+# Runs until SIGINT/SIGTERM, then waits for collections in progress to finish.
+
+STATE_DIR = os.path.join(os.getcwd(), "data", ".state")
+LOCK_FILE = os.path.join(STATE_DIR, "collector.lock")
+
+# Seconds between runs, per collection.
+INTERVALS = {
+    "market": 5 * 60,
+    "news":   60 * 60,
+}
+
+# Each run starts up to this fraction of its interval late, so runs do not line up with other
+# clients of the same APIs (or with each other) on the minute.
+JITTER = 0.1
+
+COLLECTIONS = {
+    "market": app.collect_market,
+    "news":   app.collect_news_incremental,
+}
+
+# Run type of each collection. The daemon collects from the live APIs unless told otherwise
+# (e.g. --market-run-type DEBUG to exercise the schedule without spending credits); app.py's
+# own defaults are for interactive runs and are not used here.
+RUN_TYPES = {
+    "market": "API",
+    "news":   "TICKER-NEWS",
+}
+
+RUN_TYPE_OPTIONS = {
+    "market": app.CoinMarketCapResponse.RUN_TYPE_OPTIONS,
+    "news":   app.CryptoNewsResponse.RUN_TYPE_OPTIONS,
+}
+
+
+def log(message):
+    print(f"{datetime.now():%Y-%m-%d %H:%M:%S} {message}", flush=True)
+
+
+class Job:
+    # One collection on a fixed grid of start times (start, start + interval, ...), each delayed
+    # by its own random jitter. The grid never drifts with run time; slots missed while a run
+    # overran are skipped, not made up.
+    def __init__(self, name, func, interval, jitter=JITTER):
+        self.name     = name
+        self.func     = func
+        self.interval = interval
+        self.jitter   = jitter
+        self.slot     = time.monotonic()
+        self.next_run = self.slot + self.delay()
+        self.thread   = None
+        self.runs     = 0
+        self.skips    = 0
+        self.failures = 0
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def delay(self):
+        return random.uniform(0, self.jitter * self.interval)
+
+    def schedule(self, now):
+        self.slot += self.interval
+        if self.slot <= now:
+            self.slot += (int((now - self.slot) // self.interval) + 1) * self.interval
+
+        self.next_run = self.slot + self.delay()
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name=f"collect-{self.name}")
+        self.thread.start()
+
+    def run(self):
+        start = time.monotonic()
+        log(f"{self.name}: started")
+        try:
+            self.func()
+            self.runs += 1
+            log(f"{self.name}: finished in {time.monotonic() - start:.1f}s")
+        except Exception:
+            self.failures += 1
+            log(f"{self.name}: failed after {time.monotonic() - start:.1f}s")
+            traceback.print_exc()
+
+
+class Collector:
+    def __init__(self, jobs, lock_file=LOCK_FILE):
+        self.jobs      = jobs
+        self.lock_file = lock_file
+        self.stopping  = threading.Event()
+        self.__lock    = None
+
+    def acquire(self):
+        # Exclusive, non-blocking lock held for the life of the process. The kernel drops it when
+        # the process exits, so a crashed collector never leaves a stale lock behind.
+        os.makedirs(os.path.dirname(os.path.abspath(self.lock_file)), exist_ok=True)
+        f = open(self.lock_file, "a+")
+
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            f.seek(0)
+            pid = f.read().strip()
+            f.close()
+            return pid or "?"
+
+        f.seek(0)
+        f.truncate()
+        f.write(str(os.getpid()))
+        f.flush()
+        self.__lock = f
+
+        return None
+
+    def release(self):
+        if self.__lock is not None:
+            fcntl.flock(self.__lock, fcntl.LOCK_UN)
+            self.__lock.close()
+            self.__lock = None
+
+    def stop(self, signum=None, frame=None):
+        self.stopping.set()
+
+    def run(self):
+        # Start every due job whose previous run has finished; a job still running skips its tick.
+        while not self.stopping.is_set():
+            now = time.monotonic()
+            for job in self.jobs:
+                if now < job.next_run:
+                    continue
+
+                if job.running:
+                    job.skips += 1
+                    log(f"{job.name}: previous run still in progress, skipping this tick")
+                else:
+                    job.start()
+                job.schedule(now)
+
+            self.stopping.wait(max(0, min(job.next_run for job in self.jobs) - time.monotonic()))
+
+        for job in self.jobs:
+            if job.running:
+                log(f"{job.name}: waiting for the run in progress")
+                job.thread.join()
+
+    def once(self):
+        # Every job once, one after the other (e.g. from cron, or to check the setup).
+        for job in self.jobs:
+            job.run()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--jobs",            nargs="+", default=list(COLLECTIONS), choices=list(COLLECTIONS))
+    parser.add_argument("--market-interval", type=float, default=INTERVALS["market"])
+    parser.add_argument("--news-interval",   type=float, default=INTERVALS["news"])
+    parser.add_argument("--market-run-type", default=RUN_TYPES["market"], choices=RUN_TYPE_OPTIONS["market"])
+    parser.add_argument("--news-run-type",   default=RUN_TYPES["news"],   choices=RUN_TYPE_OPTIONS["news"])
+    parser.add_argument("--jitter",          type=float, default=JITTER)
+    parser.add_argument("--lock-file",       default=LOCK_FILE)
+    parser.add_argument("--once",            action="store_true")
+    args = parser.parse_args()
+
+    intervals = {"market": args.market_interval, "news": args.news_interval}
+    run_types = {"market": args.market_run_type, "news": args.news_run_type}
+    jobs      = [Job(name, partial(COLLECTIONS[name], run_type=run_types[name]), intervals[name], args.jitter) for name in args.jobs]
+    collector = Collector(jobs, args.lock_file)
+
+    owner = collector.acquire()
+    if owner:
+        log(f"Another collector is running (pid {owner}); exiting.")
+        sys.exit(1)
+
+    signal.signal(signal.SIGTERM, collector.stop)
+    signal.signal(signal.SIGINT,  collector.stop)
+
+    try:
+        log(f"Collector started (pid {os.getpid()}): " +
+            ", ".join(f"{job.name} ({run_types[job.name]}) every {job.interval:g}s" for job in jobs))
+        if args.once:
+            collector.once()
+        else:
+            collector.run()
+    finally:
+        collector.release()
+        log("Collector stopped: " + ", ".join(f"{job.name} {job.runs} runs, {job.skips} skipped, {job.failures} failed" for job in jobs))
@@ -1,18 +1,21 @@
 # Import the required libraries and dependencies
 import os
-import re
 import urllib
 import json
 
 import pandas as pd
 
 from dotenv   import load_dotenv
-from requests import Session
 from datetime import datetime
 from pathlib  import Path
 
 from collections.abc     import Iterable
-from requests.exceptions import ConnectionError, Timeout, TooManyRedirects
+from requests.exceptions import ConnectionError, HTTPError, Timeout, TooManyRedirects
+
+from utils               import http_session, instrument, json_stream, profiling, response_cache
+from utils.csv_archive   import append_csv, write_csv_atomic
+from utils.frame_builder import ColumnBuffer, cmc_frame
+from utils.rollup        import set_rollup
 
 
 class Investment:
@@ -44,6 +47,15 @@ class CoinMarketCapResponse(Investment):
     RUN_TYPE_OPTIONS = ["API", "SANDBOX", "DEBUG"]
     SAVE_CSV_OPTIONS = [None, "a", "w"]
 
+    # Archives feeding the hourly/daily/weekly OHLCV tables (see utils/rollup.py), by table set:
+    # the API archive and its daily partitions (latest-quotes_data_<YYYYMMDD>.csv, which
+    # collect_market() appends to) roll up into one set of tables, the combined _ALL archive into
+    # its own. DEBUG/SANDBOX copies and the timestamped mode="w" files are not rolled up.
+    ROLLUP_ARCHIVES = {
+        "latest-quotes_data":     r"latest-quotes_data(_\d{8})?\.csv",
+        "latest-quotes_data_ALL": r"latest-quotes_data_ALL\.csv",
+    }
+
     DOMAIN_SWITCH = {
         "API":     "https://pro-api.coinmarketcap.com",
         "SANDBOX": "https://sandbox-api.coinmarketcap.com",
@@ -51,16 +63,31 @@ class CoinMarketCapResponse(Investment):
     }
 
     def __init__(self, ticker: str, name: str, id: Iterable, coins: float, currency: str, endpoint: str,
-                 run_type="API", save_csv=None):
+                 run_type="API", save_csv=None, storage=None, domain=None,
+                 cache=None, lazy=False, stream=False):
         super().__init__(ticker, name, id, coins, currency)
 
         self.__catch_value_error(run_type, "run_type", self.RUN_TYPE_OPTIONS)
         self.__catch_value_error(save_csv, "save_csv", self.SAVE_CSV_OPTIONS)
 
-        self.__run_type = run_type
-        self.save_csv   = save_csv
+        self.__run_type  = run_type
+        self.save_csv    = save_csv
+        self.storage     = storage
+        self.domain      = domain
+        self.cache       = response_cache.get_cache() if cache is None else cache
+        self.stream      = stream
+        self.__executed  = False
+        self.__dataframe = None
+        self.__payload   = None
         self.__set_endpoint(endpoint)
-        self.request()
+
+        if stream:
+            json_stream.require()
+
+        # A lazy query does no I/O until its dataframe/response is first accessed, or until it is
+        # run in bulk with utils.fetch.execute().
+        if not lazy:
+            self.request()
 
     @property
     def coins(self):
@@ -75,6 +102,8 @@ class CoinMarketCapResponse(Investment):
         prefix       = run_type.lower()
 
         if run_type.upper() in ["API", "SANDBOX"]:
+            # Optional host override, e.g. a local stand-in server: "http://127.0.0.1:8000".
+            domain   = self.domain or domain
             endpoint = self.__endpoint["endpoint_url"]
             return urllib.parse.urljoin(domain, endpoint)
         else:
@@ -83,13 +112,40 @@ class CoinMarketCapResponse(Investment):
 
     @property
     def response(self):
+        self.__execute()
         return self._Investment__response
 
+    @property
     def dataframe(self):
-        if not self.__response:
-            return None
-        else:
-            return self.dataframe
+        self.__execute()
+        return self.__dataframe
+
+    @dataframe.setter
+    def dataframe(self, df):
+        self.__dataframe = df
+
+    @property
+    def executed(self):
+        return self.__executed
+
+    @property
+    def endpoint_tag(self):
+        return self.__endpoint['endpoint_tag']
+
+    def __execute(self):
+        if not self.__executed:
+            self.request()
+
+    def query_key(self):
+        # Identity of the planned request (token excluded), used to deduplicate queries.
+        params = {k: str(v) for k, v in self.request_params().items()}
+        return (type(self).__name__, self.__run_type, self.url, tuple(sorted(params.items())))
+
+    def copy_result(self, other):
+        # Adopt the result of an identical, already executed query.
+        self._Investment__response = other.response
+        self.dataframe             = other.dataframe
+        self.__executed            = True
 
     def __set_endpoint(self, endpoint_tag):
         endpoint = {
@@ -122,20 +178,7 @@ class CoinMarketCapResponse(Investment):
 
         self.__endpoint = endpoint
         
-    def request(self):
-        # Using the Python requests library, make a CoinMarketCap API call to access the current
-        # cryptocurrency statistics.
-
-        print(f"Source   : {self.url}")
-        print(f"RUN TYPE : {self.__run_type.upper()}")
-
-        # Set request credentialsa and params
-        headers = {
-            "Accepts":           "application/json",
-            "Accept-Encoding":   "deflate, gzip",
-            "X-CMC_PRO_API_KEY": os.getenv("X-CMC_PRO_API_KEY"),
-        }
-
+    def request_params(self):
         parameters = {
             "start":   "1",
             "limit":   self.coins,
@@ -144,61 +187,195 @@ class CoinMarketCapResponse(Investment):
             "id":      ",".join(self.id),
         }
 
-        # Set url request
-        session_get_switch = {
-            "metadata":        lambda : session.get(self.url, params={k: parameters[k] for k in ["slug",]}),
-            "latest-listings": lambda : session.get(self.url, params={k: parameters[k] for k in ["start", "limit", "convert"]}),
-            "latest-quotes":   lambda : session.get(self.url, params={k: parameters[k] for k in ["id"]})
+        # Set url request params per endpoint
+        params_switch = {
+            "metadata":        ["slug",],
+            "latest-listings": ["start", "limit", "convert"],
+            "latest-quotes":   ["id"],
         }
 
+        return {k: parameters[k] for k in params_switch.get(self.__endpoint['endpoint_tag'])}
+
+    def request(self):
+        # Using the Python requests library, make a CoinMarketCap API call to access the current
+        # cryptocurrency statistics.
+        # Instrumented as one call: network, decode, frame and persist time, bytes, rows, credits.
+        with profiling.stage("fetch"), instrument.call(type(self).__name__, self.__endpoint['endpoint_tag'], "request") as call:
+            self.__request(call)
+
+            status = (self._Investment__response or {}).get("status") or {}
+            call.set(rows=len(self.__dataframe) if isinstance(self.__dataframe, pd.DataFrame) else None,
+                     credit_count=status.get("credit_count"), api_elapsed_ms=status.get("elapsed"))
+
+    def __request(self, call):
+        self.__executed = True
+
+        print(f"Source   : {self.url}")
+        print(f"RUN TYPE : {self.__run_type.upper()}")
+
         endpoint_tag = self.__endpoint['endpoint_tag']
+        params       = self.request_params()
+        headers      = self.__headers()
 
         # Get CoinMarketCap API response and data:
+        # The pooled session retries 429/5xx with backoff; a request that still fails leaves the
+        # response empty and yields an empty dataframe.
         if self.__run_type.upper() in ["API", "SANDBOX"]:
-            session = Session()
-            session.headers.update(headers)
-
-            try:
-                response = session_get_switch.get(endpoint_tag)()
-                self._Investment__response = json.loads(response.text)
-            except (ConnectionError, Timeout, TooManyRedirects) as e:
-                print(e)
-
-            self.dataframe = self.json_to_dataframe()
+            # Serve from the on-disk response cache when possible (no network, no credits).
+            cache = self.__active_cache()
+
+            # Streaming mode: records go straight from the response body into column buffers.
+            if self.stream:
+                self.dataframe = self.__request_stream(endpoint_tag, params, headers, cache, call)
+            else:
+                self.dataframe = self.__request_payload(endpoint_tag, params, headers, cache, call)
         
+        # Get saved data from the partitioned archive:
+        elif self.storage:
+            with call.phase("read"):
+                self.dataframe = self.storage.read(endpoint_tag, tickers=list(self.ticker))
+
         # Get saved data:
         else:
-            self.dataframe = pd.read_csv(Path(self.url))
+            with call.phase("read"):
+                self.dataframe = pd.read_csv(Path(self.url))
 
         # Save dataframe to csv.
         if self.save_csv:
             self.to_csv(mode=self.save_csv, suffix="auto")
 
+    def __headers(self):
+        # Request headers and credentials
+        return {
+            "Accepts":           "application/json",
+            "Accept-Encoding":   "deflate, gzip",
+            "X-CMC_PRO_API_KEY": os.getenv("X-CMC_PRO_API_KEY"),
+        }
+
+    def __active_cache(self):
+        return self.cache if self.cache and self.cache.enabled else None
+
+    def fetch(self):
+        # Network half of request() for the staged pipeline (utils/pipeline.py): the raw payload
+        # is read from the cache or the API and held for parse(). Always reads the full body;
+        # DEBUG and storage reads happen in parse().
+        self.__payload = None
+
+        if self.__run_type.upper() in ["API", "SANDBOX"]:
+            endpoint_tag = self.__endpoint['endpoint_tag']
+            with profiling.stage("fetch"), instrument.call(type(self).__name__, endpoint_tag, "fetch") as call:
+                self.__payload = self.__fetch_payload(endpoint_tag, self.request_params(), self.__headers(),
+                                                      self.__active_cache(), call)
+
+        return self
+
+    def parse(self):
+        # CPU half of request(): decode and frame the payload held by fetch(). Without one, this
+        # is a plain request().
+        if self.__payload is None:
+            self.request()
+            return self.dataframe
+
+        (payload, fetched), self.__payload = self.__payload, None
+        endpoint_tag = self.__endpoint['endpoint_tag']
+
+        with profiling.stage("parse"), instrument.call(type(self).__name__, endpoint_tag, "parse") as call:
+            self.__executed = True
+            self.dataframe  = self.__load_payload(payload, fetched, endpoint_tag, self.request_params(),
+                                                  self.__active_cache(), call)
+
+            status = (self._Investment__response or {}).get("status") or {}
+            call.set(rows=len(self.__dataframe), credit_count=status.get("credit_count"), api_elapsed_ms=status.get("elapsed"))
+
+        return self.dataframe
+
+    def __request_payload(self, endpoint_tag, params, headers, cache, call):
+        # Full-body mode: the payload is read as text, decoded with json.loads and then framed.
+        payload, fetched = self.__fetch_payload(endpoint_tag, params, headers, cache, call)
+        return self.__load_payload(payload, fetched, endpoint_tag, params, cache, call)
+
+    def __fetch_payload(self, endpoint_tag, params, headers, cache, call):
+        # (payload text or None, whether it came from the API rather than the cache)
+        with call.phase("network"):
+            payload = cache.get(endpoint_tag, params, url=self.url) if cache else None
+            fetched = False
+            call.set(cache=("hit" if payload is not None else "miss") if cache else None)
+
+            if payload is None and not (cache and cache.offline):
+                try:
+                    response = http_session.get(self.url, params=params, headers=headers)
+                    call.set(status=response.status_code)
+                    response.raise_for_status()
+                    payload  = response.text
+                    fetched  = True
+                except (ConnectionError, Timeout, TooManyRedirects, HTTPError) as e:
+                    call.set(error=repr(e))
+                    print(e)
+
+        call.set(bytes=len(payload) if payload is not None else None)
+
+        return payload, fetched
+
+    def __load_payload(self, payload, fetched, endpoint_tag, params, cache, call):
+        try:
+            with call.phase("decode"):
+                self._Investment__response = json.loads(payload) if payload is not None else None
+
+            # Only well-formed payloads are cached.
+            if fetched and cache:
+                cache.put(endpoint_tag, params, payload, url=self.url)
+        except ValueError as e:
+            print(e)
+
+        return self.json_to_dataframe()
+
+    def __request_stream(self, endpoint_tag, params, headers, cache, call):
+        # Only the "status" block is kept as the response; the "data" object tree is only built
+        # for bodies under json_stream.STREAM_MIN_BYTES. Network, decode and buffering overlap
+        # here and are timed together as "stream".
+        buffer = ColumnBuffer()
+        with call.phase("stream"):
+            header = json_stream.fetch_stream(self.url, params, endpoint_tag, buffer, headers=headers, cache=cache)
+
+        if header is None:
+            self._Investment__response = None
+            return pd.DataFrame()
+
+        self._Investment__response = {"status": header.get("status")}
+        return buffer.to_frame()
+
     def json_to_dataframe(self):
         if not self.response:
             return pd.DataFrame()
 
-        df = pd.json_normalize(self.response["data"])
-
-        # Remove CryptoMarketCap ID from column names.
-        df.columns = ['.'.join(re.split("\.", col)[1:]) for col in df.columns]
-        df = pd.DataFrame(
-            {col: df.loc[:, col].stack(dropna=False).values for col in df.columns.unique()}
-        )
+        # Build the frame row by row from the per-coin records (nested quote.<CUR> fields become
+        # dotted columns) instead of normalizing one very wide row keyed by CMC id.
+        endpoint_tag = self.__endpoint['endpoint_tag']
+        with profiling.stage("json_to_dataframe"), instrument.call(type(self).__name__, endpoint_tag, "json_to_dataframe") as call:
+            with call.phase("frame"):
+                df = cmc_frame(self.response["data"])
+            call.set(rows=len(df))
 
         return df
 
-    def merge_df_responses(self, filename):
-        df_new    = self.dataframe
-        df_prev   = pd.read_csv(filename)
-        df_merged = pd.concat([df_prev, df_new], axis=0)
-
-        return df_merged
+    def load_response(self, response):
+        # Use an already decoded response (cache, replay, benchmarks) in place of a request.
+        self.__executed            = True
+        self._Investment__response = response
+        self.dataframe             = self.json_to_dataframe()
 
     def print_json_dump(self):
+        # Debug only; in streaming mode the response holds just the "status" block.
         print(json.dumps(self.response, indent=4, sort_keys=True))
 
     def to_csv(self, mode="a", suffix=""):
+        filename = self.archive_filename(mode=mode, suffix=suffix)
+
+        with profiling.stage("persist"), instrument.call(type(self).__name__, self.__endpoint['endpoint_tag'], "to_csv") as call:
+            with call.phase("persist"):
+                self.write_archive(self.dataframe, filename, mode=mode)
+
+    def archive_filename(self, mode="a", suffix=""):
         self.__catch_value_error(mode, "mode", [opt for opt in self.SAVE_CSV_OPTIONS if opt])
 
         # Set to data archive domain: os.path.join(os.getcwd(), "data")
@@ -221,18 +398,28 @@ class CoinMarketCapResponse(Investment):
         endpoint      = prefix + endpoint + suffix + ext
 
         # Assign filename.
-        filename = os.path.join(domain, endpoint)
+        return os.path.join(domain, endpoint)
 
+    def write_archive(self, df, filename, mode="a"):
         # If writing to file:
         # Write to file.
         if mode == "w" or not os.path.isfile(filename):
-            self.dataframe.to_csv(filename, index=False)
+            write_csv_atomic(df, filename)
 
         # If appending to file:
-        # Read the existing file, concatenate with new data, and write to file.
+        # Append only the new rows.
         elif mode == "a":
-            self.dataframe = self.merge_df_responses(filename)
-            self.dataframe.to_csv(filename, index=False)
+            append_csv(df, filename)
+
+        # Fold the new snapshots into the OHLCV buckets they fall in.
+        rollup = set_rollup(filename, self.ROLLUP_ARCHIVES) if os.path.isfile(filename) else None
+        if rollup:
+            rollup.update()
+
+    def to_storage(self, storage=None):
+        # Write the response to a partitioned columnar archive (see utils/storage.py).
+        storage = storage or self.storage
+        return storage.write(self.dataframe, self.__endpoint['endpoint_tag'])
 
     @staticmethod
     def __catch_value_error(var, varname, opts):
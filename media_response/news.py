@@ -1,15 +1,21 @@
 import os
 import json
 import re
+import urllib.parse
 
 import pandas as pd
 
 from dotenv   import load_dotenv
-from requests import Session
 from datetime import datetime
 from pathlib  import Path
 
-from requests.exceptions import ConnectionError, Timeout, TooManyRedirects
+from requests.exceptions import ConnectionError, HTTPError, Timeout, TooManyRedirects
+
+from utils               import http_session, instrument, json_stream, profiling, response_cache
+from utils.csv_archive   import append_csv, write_csv_atomic
+from utils.dedup_index   import DedupIndex
+from utils.ticker_index  import TickerIndex
+from utils.frame_builder import ColumnBuffer
 
 
 class CryptoNewsResponse():
@@ -32,6 +38,14 @@ class CryptoNewsResponse():
 
     SAVE_CSV_OPTIONS = [None, "a", "w"]
 
+    # Endpoints whose "data" is a list of flat records and can be parsed as a stream; the others
+    # need the whole response to be reshaped.
+    STREAM_ENDPOINTS = ["ticker-news"]
+
+    # Archives with a "tickers" column. With by_ticker=True, DEBUG reads return only the rows
+    # of the held tickers, located through the archive's ticker index.
+    INDEXED_ENDPOINTS = ["ticker-news"]
+
     DOMAIN_SWITCH = {
         "TICKER-NEWS":        "https://cryptonews-api.com/api/v1",
         "TICKER-EVENTS":      "https://cryptonews-api.com/api/v1/events",
@@ -42,22 +56,40 @@ class CryptoNewsResponse():
     }
 
     def __init__(self, ticker: str, endpoint: str, date="today", time="0000", items=50, page=1, rank_days=1, search_str="",
-                 run_type="TICKER-EVENTS", save_csv=None):
+                 run_type="TICKER-EVENTS", save_csv=None, storage=None, domain=None,
+                 cache=None, lazy=False, sortby="rank", stream=False, by_ticker=False):
 
         self.__catch_value_error(run_type, "run_type", self.RUN_TYPE_OPTIONS)
         self.__catch_value_error(save_csv, "save_csv", self.SAVE_CSV_OPTIONS)
 
-        self.ticker     = ticker
-        self.date       = date
-        self.time       = time
-        self.items      = items
-        self.page       = page
-        self.rank_days  = rank_days
-        self.search_str = search_str
-        self.__run_type = run_type
-        self.save_csv   = save_csv
-        self.__endpoint = endpoint
-        self.request()
+        self.ticker      = ticker
+        self.date        = date
+        self.time        = time
+        self.items       = items
+        self.page        = page
+        self.rank_days   = rank_days
+        self.search_str  = search_str
+        self.sortby      = sortby
+        self.__run_type  = run_type
+        self.save_csv    = save_csv
+        self.storage     = storage
+        self.domain      = domain
+        self.cache       = response_cache.get_cache() if cache is None else cache
+        self.stream      = stream
+        self.by_ticker   = by_ticker
+        self.__endpoint  = endpoint
+        self.__response  = None
+        self.__executed  = False
+        self.__dataframe = None
+        self.__payload   = None
+
+        if stream:
+            json_stream.require()
+
+        # A lazy query does no I/O until its dataframe/response is first accessed, or until it is
+        # run in bulk with utils.fetch.execute().
+        if not lazy:
+            self.request()
 
     @property
     def url(self):
@@ -68,6 +100,9 @@ class CryptoNewsResponse():
 
         run_type = self.__run_type
         if run_type.upper() not in ["DEBUG",]:
+            # Optional host override, e.g. a local stand-in server: "http://127.0.0.1:8000".
+            if self.domain:
+                domain = urllib.parse.urljoin(self.domain, urllib.parse.urlsplit(domain).path)
             return domain
         else:
             endpoint = f"{prefix}_{self.ARCHIVE_FILES[endpoint_tag]}"
@@ -75,22 +110,42 @@ class CryptoNewsResponse():
 
     @property
     def response(self):
+        self.__execute()
         return self.__response
 
+    @property
     def dataframe(self):
-        if not self.__response:
-            return None
-        else:
-            return self.dataframe
-    
-    def request(self):
-        # Using the Python requests library, make an API call to access Crypto News
-        # information.
+        self.__execute()
+        return self.__dataframe
 
-        print(f"Source   : {self.url}")
-        print(f"RUN TYPE : {self.__run_type.upper()}")
-        print(f"TICKER   : {self.ticker}")
+    @dataframe.setter
+    def dataframe(self, df):
+        self.__dataframe = df
+
+    @property
+    def executed(self):
+        return self.__executed
 
+    @property
+    def endpoint_tag(self):
+        return self.__endpoint
+
+    def __execute(self):
+        if not self.__executed:
+            self.request()
+
+    def query_key(self):
+        # Identity of the planned request (token excluded), used to deduplicate queries.
+        params = {k: str(v) for k, v in self.request_params().items() if k != "token"}
+        return (type(self).__name__, self.__run_type, self.url, tuple(sorted(params.items())))
+
+    def copy_result(self, other):
+        # Adopt the result of an identical, already executed query.
+        self.__response = other.response
+        self.dataframe  = other.dataframe
+        self.__executed = True
+
+    def request_params(self):
         # Set request credentialsa and params
         load_dotenv()
         crypto_news_api_key = os.getenv("CRYPTO_NEWS_API_KEY")
@@ -99,7 +154,7 @@ class CryptoNewsResponse():
             "tickers":      self.ticker if isinstance(self.ticker, str) else ",".join(self.ticker),
             "section":      "alltickers",
             "items":        self.items,
-            "sortby":       "rank",
+            "sortby":       self.sortby,
             "days":         self.rank_days,
             "extra-fields": "id,eventid,rankscore",
             "searchOR":     self.search_str,
@@ -110,41 +165,162 @@ class CryptoNewsResponse():
             "cache":        "false",
             "token":        crypto_news_api_key,
         }
-        
-        # Set url request
-        session_get_switch = {
-            "ticker-stats":       lambda : session.get(self.url, params={k: parameters[k] for k in ["tickers", "date", "token"]}),
-            "ticker-top-mention": lambda : session.get(self.url, params={k: parameters[k] for k in ["tickers", "date", "cache", "token"]}),
-            "ticker-news":        lambda : session.get(self.url, params={k: parameters[k] for k in ["tickers", "items", "sortby", "extra-fields", "page", "days", "token"]}),
+
+        # Set url request params per endpoint
+        params_switch = {
+            "ticker-stats":       ["tickers", "date", "token"],
+            "ticker-top-mention": ["tickers", "date", "cache", "token"],
+            "ticker-news":        ["tickers", "items", "sortby", "extra-fields", "page", "days", "token"],
         }
 
+        # sortby=None falls back to the API default ordering (newest first).
+        return {k: parameters[k] for k in params_switch.get(self.__endpoint) if parameters[k] is not None}
+
+    def request(self):
+        # Using the Python requests library, make an API call to access Crypto News
+        # information.
+        # Instrumented as one call: network, decode, frame and persist time, bytes and rows.
+        with profiling.stage("fetch"), instrument.call(type(self).__name__, self.__endpoint, "request") as call:
+            self.__request(call)
+            call.set(rows=len(self.__dataframe) if isinstance(self.__dataframe, pd.DataFrame) else None)
+
+    def __request(self, call):
+        self.__executed = True
+
+        print(f"Source   : {self.url}")
+        print(f"RUN TYPE : {self.__run_type.upper()}")
+        print(f"TICKER   : {self.ticker}")
+
         endpoint_tag = self.__endpoint
+        params       = self.request_params()
 
         # Get CryptoNews Response:
+        # The pooled session retries 429/5xx with backoff; a request that still fails leaves the
+        # response empty and yields no dataframe.
         if self.__run_type.upper() not in ["DEBUG",]:
-            session = Session()
-            try:
-                # response = session.get(self.url, params=parameters)
-                response = session_get_switch.get(endpoint_tag)()
-                self.__response = json.loads(response.text)
-            except (ConnectionError, Timeout, TooManyRedirects) as e:
-                print(e)
-
-            self.dataframe = self.json_to_dataframe()
+            # Serve from the on-disk response cache when possible (no network, no credits).
+            cache = self.__active_cache()
+
+            # Streaming mode: articles go straight from the response body into column buffers.
+            if self.stream and endpoint_tag in self.STREAM_ENDPOINTS:
+                self.dataframe = self.__request_stream(endpoint_tag, params, cache, call)
+            else:
+                self.dataframe = self.__request_payload(endpoint_tag, params, cache, call)
         
+        # Get saved data from the partitioned archive:
+        elif self.storage:
+            with call.phase("read"):
+                self.dataframe = self.storage.read(endpoint_tag, tickers=self.ticker)
+
+        # Get saved data for the held tickers only, located through the archive's ticker index:
+        elif self.by_ticker and endpoint_tag in self.INDEXED_ENDPOINTS and self.ticker:
+            with call.phase("read"):
+                self.dataframe = self.__read_indexed()
+
         # Get saved data:
         else:
-            self.dataframe = pd.read_csv(Path(self.url))
+            with call.phase("read"):
+                self.dataframe = pd.read_csv(Path(self.url))
 
         # Save dataframe to csv.
-        if self.save_csv and self.dataframe:
+        if self.save_csv and isinstance(self.dataframe, pd.DataFrame):
             self.to_csv(mode=self.save_csv, suffix="auto")
         
+    def __active_cache(self):
+        return self.cache if self.cache and self.cache.enabled else None
+
+    def fetch(self):
+        # Network half of request() for the staged pipeline (utils/pipeline.py): the raw payload
+        # is read from the cache or the API and held for parse(). Always reads the full body;
+        # DEBUG and storage reads happen in parse().
+        self.__payload = None
+
+        if self.__run_type.upper() not in ["DEBUG",]:
+            with profiling.stage("fetch"), instrument.call(type(self).__name__, self.__endpoint, "fetch") as call:
+                self.__payload = self.__fetch_payload(self.__endpoint, self.request_params(), self.__active_cache(), call)
+
+        return self
+
+    def parse(self):
+        # CPU half of request(): decode and frame the payload held by fetch(). Without one, this
+        # is a plain request().
+        if self.__payload is None:
+            self.request()
+            return self.dataframe
+
+        (payload, fetched), self.__payload = self.__payload, None
+
+        with profiling.stage("parse"), instrument.call(type(self).__name__, self.__endpoint, "parse") as call:
+            self.__executed = True
+            self.dataframe  = self.__load_payload(payload, fetched, self.__endpoint, self.request_params(),
+                                                  self.__active_cache(), call)
+            call.set(rows=len(self.__dataframe) if isinstance(self.__dataframe, pd.DataFrame) else None)
+
+        return self.dataframe
+
+    def __request_payload(self, endpoint_tag, params, cache, call):
+        # Full-body mode: the payload is read as text, decoded with json.loads and then framed.
+        payload, fetched = self.__fetch_payload(endpoint_tag, params, cache, call)
+        return self.__load_payload(payload, fetched, endpoint_tag, params, cache, call)
+
+    def __fetch_payload(self, endpoint_tag, params, cache, call):
+        # (payload text or None, whether it came from the API rather than the cache)
+        with call.phase("network"):
+            payload = cache.get(endpoint_tag, params, url=self.url) if cache else None
+            fetched = False
+            call.set(cache=("hit" if payload is not None else "miss") if cache else None)
+
+            if payload is None and not (cache and cache.offline):
+                try:
+                    response = http_session.get(self.url, params=params)
+                    call.set(status=response.status_code)
+                    response.raise_for_status()
+                    payload  = response.text
+                    fetched  = True
+                except (ConnectionError, Timeout, TooManyRedirects, HTTPError) as e:
+                    call.set(error=repr(e))
+                    print(e)
+
+        call.set(bytes=len(payload) if payload is not None else None)
+
+        return payload, fetched
+
+    def __load_payload(self, payload, fetched, endpoint_tag, params, cache, call):
+        try:
+            with call.phase("decode"):
+                self.__response = json.loads(payload) if payload is not None else None
+
+            # Only well-formed payloads are cached.
+            if fetched and cache:
+                cache.put(endpoint_tag, params, payload, url=self.url)
+        except ValueError as e:
+            print(e)
+
+        return self.json_to_dataframe()
+
+    def __request_stream(self, endpoint_tag, params, cache, call):
+        # Only the top-level fields besides "data" (e.g. "total_pages") are kept as the response.
+        # Network, decode and buffering overlap here and are timed together as "stream".
+        buffer = ColumnBuffer()
+        with call.phase("stream"):
+            header = json_stream.fetch_stream(self.url, params, endpoint_tag, buffer, cache=cache)
+
+        if header is None:
+            self.__response = None
+            return None
+
+        self.__response = header
+        return buffer.to_frame() if len(buffer) else None
+
+    def __read_indexed(self):
+        # The index catches up with the archive in memory only; reading never writes state.
+        return TickerIndex(self.url).read(self.ticker)
+
     def json_to_dataframe(self):
         endpoint_tag = self.__endpoint
         response     = self.response
 
-        if not isinstance(response["data"], (dict, list)):
+        if not response or not isinstance(response.get("data"), (dict, list)):
             return None
 
         switch_set_df = {
@@ -154,8 +330,19 @@ class CryptoNewsResponse():
             "ticker-stats":       lambda r: self.__parse_ticker_stats(),
             "ticker-top-mention": lambda r: self.__parse_ticker_top_mention(),
         }
-        
-        return switch_set_df.get(endpoint_tag)(response)
+
+        with profiling.stage("json_to_dataframe"), instrument.call(type(self).__name__, endpoint_tag, "json_to_dataframe") as call:
+            with call.phase("frame"):
+                df = switch_set_df.get(endpoint_tag)(response)
+            call.set(rows=len(df))
+
+        return df
+
+    def load_response(self, response):
+        # Use an already decoded response (cache, replay, benchmarks) in place of a request.
+        self.__executed = True
+        self.__response = response
+        self.dataframe  = self.json_to_dataframe()
 
     def __parse_ticker_stats(self):
         tickers  = self.ticker
@@ -203,20 +390,21 @@ class CryptoNewsResponse():
 
         return dates
 
-    def merge_df_responses(self, filename):
-        df_new    = self.dataframe
-        df_prev   = pd.read_csv(filename)
-        df_merged = pd.concat([df_prev, df_new], axis=0)
-
-        return df_merged
-
     def print_json_dump(self):
+        # Debug only; in streaming mode the response holds just the top-level fields besides "data".
         print(json.dumps(self.response, indent=4, sort_keys=True))
     
     def to_csv(self, mode="a", suffix=""):
         if not isinstance(self.dataframe, pd.DataFrame):
             return
 
+        filename = self.archive_filename(mode=mode, suffix=suffix)
+
+        with profiling.stage("persist"), instrument.call(type(self).__name__, self.__endpoint, "to_csv") as call:
+            with call.phase("persist"):
+                self.write_archive(self.dataframe, filename, mode=mode)
+
+    def archive_filename(self, mode="a", suffix=""):
         self.__catch_value_error(mode, "mode", [opt for opt in self.SAVE_CSV_OPTIONS if opt])
 
         # Set to data archive domain: os.path.join(os.getcwd(), "data")
@@ -238,19 +426,39 @@ class CryptoNewsResponse():
         endpoint      = prefix + endpoint + suffix + ext
 
         # Assign filename.
-        filename = os.path.join(domain, endpoint)
+        return os.path.join(domain, endpoint)
+
+    def write_archive(self, df, filename, mode="a"):
+        # Articles already in the archive (by hashed news_url) are dropped before writing.
+        index      = DedupIndex(filename) if "news_url" in df.columns else None
+        df, hashes = index.filter_new(df) if index is not None else (df, None)
 
         # If writing to file:
         # Write to file.
         if mode == "w" or not os.path.isfile(filename):
-            self.dataframe.to_csv(filename, index=False)
+            write_csv_atomic(df, filename)
 
         # If appending to file:
-        # Read the existing file, concatenate with new data, and write to file.
-        elif mode == "a":
-            self.dataframe = self.merge_df_responses(filename)
-            self.dataframe.to_csv(filename, index=False)
-            
+        # Append only the new rows.
+        elif mode == "a" and not df.empty:
+            append_csv(df, filename)
+
+        if index is not None:
+            index.add(hashes)
+            index.save()
+
+        # Index the appended rows by ticker while they are still in the page cache.
+        if "tickers" in df.columns and os.path.isfile(filename):
+            TickerIndex(filename).save()
+
+    def to_storage(self, storage=None):
+        # Write the response to a partitioned columnar archive (see utils/storage.py).
+        if not isinstance(self.dataframe, pd.DataFrame):
+            return []
+
+        storage = storage or self.storage
+        return storage.write(self.dataframe, self.__endpoint)
+
     @staticmethod
     def __catch_value_error(var, varname, opts):
         if var not in opts:
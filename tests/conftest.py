@@ -0,0 +1,13 @@
+import os
+import sys
+import tempfile
+
+# The project modules import each other from the repository root (as the scripts do with
+# sys.path.append('.')), so the tests run from anywhere.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def pytest_sessionstart(session):
+    # Modules derive their data/ paths (archives, .state, .cache) from the working directory when
+    # imported: the test modules import them from a scratch directory, never the repository's data/.
+    os.chdir(tempfile.mkdtemp(prefix="gcb-tests-"))
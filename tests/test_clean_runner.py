@@ -0,0 +1,88 @@
+import fcntl
+import os
+
+from datetime import datetime
+
+import pytest
+
+from utils import clean_runner
+
+
+QUOTES = (
+    "id,symbol,quote.USD.price,quote.USD.market_cap,quote.USD.last_updated\n"
+    "1,BTC,6.52040034,1000.5,2021-08-14T20:57:02.000Z\n"
+    "1027,ETH,0.506083644536178,,2021-08-14T20:58:00.000Z\n"
+)
+
+NEWS = (
+    "news_url,title,date,tickers,type\n"
+    "https://a,Up,\"Sat, 14 Aug 2021 10:00:00 -0400\",['BTC'],Article\n"
+    "https://b,Flat,\"Sat, 14 Aug 2021 11:00:00 -0400\",,Article\n"
+)
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    # Two dated partitions per endpoint plus a combined archive, which is never cleaned.
+    for day in ["20210814", "20210815"]:
+        (tmp_path / f"latest-quotes_data_{day}.csv").write_text(QUOTES)
+        (tmp_path / f"ticker-news_data_{day}.csv").write_text(NEWS)
+    (tmp_path / "latest-quotes_data_ALL.csv").write_text(QUOTES)
+
+    return tmp_path
+
+
+def run(data_dir, **kwargs):
+    report = clean_runner.run(data_dir=str(data_dir), workers=1, manifest_file=str(data_dir / ".state" / "manifest.json"),
+                              lock_file=str(data_dir / ".state" / "collector.lock"), **kwargs)
+    return dict(zip(report["partition"], report["status"]))
+
+
+def test_values_are_rewritten_as_collected(data_dir):
+    assert set(run(data_dir).values()) == {"cleaned"}
+
+    quotes = (data_dir / "latest-quotes_data_20210814.csv").read_text()
+    assert quotes == ("symbol,quote.USD.price,quote.USD.last_updated\n"
+                      "BTC,6.52040034,2021-08-14T20:57:02.000Z\n"
+                      "ETH,0.506083644536178,2021-08-14T20:58:00.000Z\n")
+
+    news = (data_dir / "ticker-news_data_20210814.csv").read_text()
+    assert news == "news_url,title,date,tickers\nhttps://a,Up,\"Sat, 14 Aug 2021 10:00:00 -0400\",['BTC']\n"
+
+    assert (data_dir / "latest-quotes_data_ALL.csv").read_text() == QUOTES
+
+
+def test_unchanged_partitions_are_skipped(data_dir):
+    run(data_dir)
+    cleaned = (data_dir / "latest-quotes_data_20210814.csv").read_text()
+
+    assert set(run(data_dir).values()) == {"skipped"}
+
+    # Touched but identical: still skipped. Appended to (in the cleaned columns): cleaned again.
+    os.utime(data_dir / "ticker-news_data_20210815.csv")
+    with open(data_dir / "latest-quotes_data_20210814.csv", "a") as f:
+        f.write("BTC,6.6,2021-08-14T21:02:00.000Z\n")
+
+    status = run(data_dir)
+    assert status.pop("latest-quotes_data_20210814.csv") == "cleaned"
+    assert set(status.values()) == {"skipped"}
+    assert (data_dir / "latest-quotes_data_20210814.csv").read_text() == cleaned + "BTC,6.6,2021-08-14T21:02:00.000Z\n"
+
+    assert set(run(data_dir, force=True).values()) == {"cleaned"}
+
+
+def test_todays_partitions_are_left_to_a_running_collector(data_dir):
+    today = datetime.now().strftime("%Y%m%d")
+    (data_dir / f"latest-quotes_data_{today}.csv").write_text(QUOTES)
+
+    (data_dir / ".state").mkdir()
+    with open(data_dir / ".state" / "collector.lock", "a+") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        status = run(data_dir, force=True)
+        fcntl.flock(lock, fcntl.LOCK_UN)
+
+    assert status.pop(f"latest-quotes_data_{today}.csv") == "in use"
+    assert set(status.values()) == {"cleaned"}
+    assert (data_dir / f"latest-quotes_data_{today}.csv").read_text() == QUOTES
+
+    assert run(data_dir)[f"latest-quotes_data_{today}.csv"] == "cleaned"
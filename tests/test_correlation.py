@@ -0,0 +1,111 @@
+import os
+import math
+
+import numpy  as np
+import pandas as pd
+import pytest
+
+from utils import correlation
+
+
+LAGS    = [-1, 0, 2, 5]
+WINDOWS = [7, 20]
+
+
+def inputs(days=120, tickers=40, seed=0):
+    # Sentiment features and returns with ~15% missing values each.
+    rng = np.random.default_rng(seed)
+    names = [f"T{i}" for i in range(tickers)]
+
+    def gaps(values):
+        return np.where(rng.random(values.shape) < 0.15, np.nan, values)
+
+    x = {
+        "Positive":        gaps(rng.integers(0, 50, (days, tickers)).astype(np.float64)),
+        "sentiment_score": gaps(rng.uniform(-1.5, 1.5, (days, tickers))),
+    }
+    y = gaps(rng.normal(0, 0.02, (days, tickers)))
+
+    return names, x, y
+
+
+def cube(names, x, y, cache_dir=None, workers=1):
+    return correlation.correlation_cube(names, x, y, LAGS, WINDOWS, min_fraction=0.5, workers=workers, cache_dir=cache_dir)
+
+
+def assert_same(a, b):
+    for feature in a:
+        np.testing.assert_allclose(a[feature][0], b[feature][0], rtol=1e-9, atol=1e-12, equal_nan=True)
+        np.testing.assert_array_equal(a[feature][1], b[feature][1])
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    # Days and tickers of every rolling_corr() call made in this process.
+    seen     = []
+    original = correlation.rolling_corr
+
+    def rolling_corr(x, y, *args, **kwargs):
+        seen.append(y.shape)
+        return original(x, y, *args, **kwargs)
+
+    monkeypatch.setattr(correlation, "rolling_corr", rolling_corr)
+    return seen
+
+
+def test_matches_pandas_rolling_corr():
+    names, x, y = inputs(tickers=3)
+    result      = cube(names, x, y)["sentiment_score"][0]
+
+    for i, lag in enumerate(LAGS):
+        for j, window in enumerate(WINDOWS):
+            for t in range(len(names)):
+                xs   = pd.Series(x["sentiment_score"][:, t]).shift(lag)
+                ys   = pd.Series(y[:, t])
+                both = xs.notna() & ys.notna()
+                want = xs.where(both).rolling(window, min_periods=max(math.ceil(0.5 * window), 3)).corr(ys.where(both))
+
+                np.testing.assert_allclose(result[i, j, :, t], want.to_numpy(), rtol=1e-7, atol=1e-9, equal_nan=True)
+
+
+def test_pooled_matches_single_process():
+    names, x, y = inputs()
+    assert_same(cube(names, x, y, workers=3), cube(names, x, y))
+
+
+def test_cache_reuses_unchanged_days_and_shards(tmp_path, calls):
+    names, x, y = inputs()
+    cache_dir   = str(tmp_path)
+    shards      = len({correlation.shard_of(name) for name in names})
+
+    cube(names, {f: v[:-10] for f, v in x.items()}, y[:-10], cache_dir)
+    assert len(calls) == shards * len(x)
+
+    # Warm: nothing is computed.
+    calls.clear()
+    cube(names, {f: v[:-10] for f, v in x.items()}, y[:-10], cache_dir)
+    assert calls == []
+
+    # Ten more days: each shard only computes a tail, and the result matches a cold run.
+    calls.clear()
+    result = cube(names, x, y, cache_dir)
+    assert len(calls) == shards * len(x)
+    assert all(days <= 10 + max(WINDOWS) + max(LAGS) + 1 for days, _ in calls)
+    assert_same(result, cube(names, x, y))
+
+    # A new ticker only recomputes the shard it hashes to.
+    calls.clear()
+    x["Positive"], x["sentiment_score"], y = (np.column_stack([v, v[:, 0]]) for v in [x["Positive"], x["sentiment_score"], y])
+    result = cube(names + ["NEW"], x, y, cache_dir)
+    assert len(calls) == len(x)
+    assert_same(result, cube(names + ["NEW"], x, y))
+
+
+def test_evict_keeps_the_cache_bounded(tmp_path):
+    names, x, y = inputs()
+    cube(names, x, y, str(tmp_path))
+
+    sizes = sorted(os.path.getsize(tmp_path / f) for f in os.listdir(tmp_path))
+    correlation.evict(str(tmp_path), max_bytes=sum(sizes[:3]))
+
+    assert sum(os.path.getsize(tmp_path / f) for f in os.listdir(tmp_path)) <= sum(sizes[:3])
@@ -0,0 +1,64 @@
+import numpy  as np
+import pandas as pd
+
+from utils.dedup_index import DedupIndex, dedup_archive, hash_keys
+
+
+def articles(*rows):
+    return pd.DataFrame(rows, columns=["news_url", "title", "date", "tickers"])
+
+
+def write(index, df):
+    # What news.py write_archive does: filter, append, record the hashes.
+    df, hashes = index.filter_new(df)
+    df.to_csv(index.archive, mode="a", header=not index.archive.exists(), index=False)
+    index.add(hashes)
+    index.save()
+    return df
+
+
+def test_articles_without_url_are_not_collapsed(tmp_path):
+    archive = tmp_path / "ticker-news_data_T.csv"
+    index   = DedupIndex(archive, state_dir=str(tmp_path / ".state"))
+
+    first = articles(
+        ["https://a", "Up",   "Sat, 14 Aug 2021 10:00:00 -0400", "['BTC']"],
+        [np.nan,      "Down", "Sat, 14 Aug 2021 11:00:00 -0400", "['BTC']"],
+        ["",          "Flat", "Sat, 14 Aug 2021 12:00:00 -0400", "['ETH']"],
+        [None,        None,   None,                              "['ETH']"],
+    )
+    assert len(write(index, first)) == 4
+
+    # Another ticker, another run: a repeated URL and a repeated URL-less article are dropped,
+    # new URL-less articles and rows with no identity at all are kept.
+    second = articles(
+        ["https://a", "Up",   "Sat, 14 Aug 2021 10:00:00 -0400", "['BTC']"],
+        [np.nan,      "Down", "Sat, 14 Aug 2021 11:00:00 -0400", "['BTC']"],
+        [" ",         "Away", "Sat, 14 Aug 2021 13:00:00 -0400", "['DOGE']"],
+        [None,        None,   None,                              "['DOGE']"],
+        ["https://b", "New",  "Sat, 14 Aug 2021 14:00:00 -0400", "['DOGE']"],
+    )
+    assert list(write(index, second)["title"].fillna("")) == ["Away", "", "New"]
+
+    # Null keys never reach the index, and a rebuild from the archive agrees with it.
+    assert not index.contains(hash_keys(["nan", "None", "", " "])).any()
+    assert len(index) == 5
+
+    rebuilt = DedupIndex(archive, state_dir=str(tmp_path / ".rebuilt"))
+    assert np.array_equal(np.sort(rebuilt.hashes), np.sort(index.hashes))
+
+
+def test_dedup_archive_keeps_articles_without_url(tmp_path):
+    archive = tmp_path / "ticker-news_data_T.csv"
+    articles(
+        ["https://a", "Up",   "d1", "['BTC']"],
+        ["https://a", "Up",   "d1", "['ETH']"],
+        [np.nan,      "Down", "d2", "['BTC']"],
+        [np.nan,      "Down", "d2", "['ETH']"],
+        [np.nan,      "Flat", "d3", "['ETH']"],
+        [np.nan,      None,   None, "['BTC']"],
+        [np.nan,      None,   None, "['ETH']"],
+    ).to_csv(archive, index=False)
+
+    assert dedup_archive(archive) == 3
+    assert list(pd.read_csv(archive)["tickers"]) == ["['BTC']", "['BTC']", "['ETH']", "['BTC']", "['ETH']"]
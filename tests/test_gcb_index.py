@@ -0,0 +1,91 @@
+import numpy  as np
+import pandas as pd
+import pytest
+
+from utils.gcb_index import OUTPUT_COLS, GCBIndex, compute_index, gcb_index, quote_matrices, sentiment_matrix
+
+
+GAP = 9
+
+
+def history(buckets=240, tickers=24, seed=0):
+    # Hourly latest-quotes snapshots with ~10% of them missing, and labelled news articles.
+    # Every GAP-th hour has neither snapshots nor articles.
+    rng   = np.random.default_rng(seed)
+    start = pd.Timestamp("2021-08-01", tz="UTC")
+    names = [f"T{i}" for i in range(tickers)]
+
+    steps  = rng.normal(0, 0.01, (buckets, tickers))
+    prices = 100 * np.exp(np.cumsum(steps, axis=0))
+    times  = start + pd.to_timedelta(np.arange(buckets), unit="h") + pd.Timedelta(minutes=5)
+    keep   = rng.random((buckets, tickers)) > 0.1
+    keep[np.arange(buckets) % GAP == GAP - 1] = False
+
+    rows, cols = np.nonzero(keep)
+    quotes_df  = pd.DataFrame({
+        "symbol":                 np.array(names)[cols],
+        "quote.USD.price":        prices[rows, cols],
+        "quote.USD.last_updated": times[rows].strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+        "num_market_pairs":       rng.integers(1, 500, tickers)[cols],
+    })
+
+    articles = buckets * 2
+    seconds  = rng.integers(0, buckets * 3600, articles)
+    seconds  = np.where(seconds // 3600 % GAP == GAP - 1, seconds - 3600, seconds)
+    news_df  = pd.DataFrame({
+        "date":      (start + pd.to_timedelta(seconds, unit="s")).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "tickers":   [str(list(rng.choice(names, 2, replace=False))) for _ in range(articles)],
+        "sentiment": rng.choice(["Positive", "Neutral", "Negative"], articles),
+    })
+
+    return quotes_df, news_df
+
+
+def matrices(quotes_df, news_df):
+    grid, tickers, prices, pairs = quote_matrices(quotes_df)
+    return grid, tickers, prices, pairs, sentiment_matrix(grid, tickers, news_df=news_df)
+
+
+def test_sharded_matches_single_process():
+    _, _, prices, pairs, sentiment = matrices(*history())
+
+    single  = compute_index(prices, pairs, sentiment, workers=1)
+    sharded = compute_index(prices, pairs, sentiment, workers=3)
+
+    for key in single:
+        np.testing.assert_allclose(sharded[key], single[key], rtol=1e-10, equal_nan=True)
+
+
+def test_append_matches_batch():
+    quotes_df, news_df = history()
+    grid, tickers, prices, pairs, sentiment = matrices(quotes_df, news_df)
+    batch = gcb_index(quotes_df, news_df=news_df)
+
+    half  = len(grid) // 2
+    index = GCBIndex.from_history(grid[:half], tickers, prices[:half], pairs[:half], sentiment[:half])
+    first = np.arange(len(tickers)) < len(tickers) // 2
+    nan   = np.full(len(tickers), np.nan)
+
+    for i in range(half, len(grid)):
+        # Hours without a snapshot are not appended; the index fills them in as the batch grid does.
+        if i % GAP == GAP - 1:
+            continue
+
+        # Every other bucket comes in two partial snapshots: the second one rewinds the first.
+        if i % 2:
+            index.append(grid[i], np.where(first, prices[i], nan), np.where(first, pairs[i], nan), np.where(first, sentiment[i], nan))
+            index.append(grid[i], np.where(first, nan, prices[i]), np.where(first, nan, pairs[i]), np.where(first, nan, sentiment[i]))
+        else:
+            index.append(grid[i], prices[i], pairs[i], sentiment[i])
+
+    live = index.frame
+    assert list(live.index) == list(batch.index)
+    np.testing.assert_allclose(live[OUTPUT_COLS].to_numpy(), batch[OUTPUT_COLS].to_numpy(), rtol=1e-9, atol=1e-12, equal_nan=True)
+
+
+def test_append_rejects_older_buckets():
+    index = GCBIndex(["A"])
+    index.append(pd.Timestamp("2021-08-02", tz="UTC"), [1.0], [1.0])
+
+    with pytest.raises(ValueError):
+        index.append(pd.Timestamp("2021-08-01", tz="UTC"), [1.0], [1.0])
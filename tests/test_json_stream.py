@@ -0,0 +1,52 @@
+import io
+import json
+
+import pandas as pd
+import pytest
+
+from market_response.crypto import CoinMarketCapResponse
+from utils                  import json_stream
+from utils.frame_builder    import ColumnBuffer, cmc_frame
+from utils.mock_server      import MockAPIServer, symbols
+from utils.synthetic        import cmc_payload, news_payload
+
+pytestmark = pytest.mark.skipif(json_stream.ijson is None, reason="streaming needs ijson")
+
+
+def symbol_lookup():
+    # CMC symbol lookups: "data" maps each symbol to a list of records; one has an empty object.
+    payload = cmc_payload(4, "latest-quotes", tokens=0.5)
+    records = list(payload["data"].values())
+    records[0]["platform"] = {}
+
+    return {**payload, "data": {"BTC": records[:1], "ALT": records[1:]}}
+
+
+@pytest.mark.parametrize("payload", [
+    cmc_payload(120, "latest-quotes", tokens=0.5),
+    cmc_payload(120, "latest-listings", tokens=0.5),
+    news_payload(60),
+    symbol_lookup(),
+], ids=["quotes", "listings", "news", "symbol-lookup"])
+@pytest.mark.parametrize("parse", [json_stream.read_records, json_stream.load_records], ids=["stream", "whole"])
+def test_parse_matches_the_full_body_frame(payload, parse):
+    buffer = ColumnBuffer()
+    header = parse(io.BytesIO(json.dumps(payload).encode()), buffer)
+
+    pd.testing.assert_frame_equal(buffer.to_frame(), cmc_frame(payload["data"]))
+    assert header == {key: value for key, value in payload.items() if key != "data"}
+
+
+@pytest.mark.parametrize("min_bytes", [0, json_stream.STREAM_MIN_BYTES], ids=["streamed", "whole"])
+def test_stream_mode_matches_full_mode(monkeypatch, min_bytes):
+    monkeypatch.setattr(json_stream, "STREAM_MIN_BYTES", min_bytes)
+
+    tickers = symbols(40)
+    frames  = []
+    with MockAPIServer(port=0) as srv:
+        for stream in [False, True]:
+            quotes = CoinMarketCapResponse(tickers, tickers, [str(i) for i in range(1, 41)], 40, "USD", "latest-quotes",
+                                           run_type="API", domain=srv.url, cache=False, stream=stream)
+            frames.append(quotes.dataframe)
+
+    pd.testing.assert_frame_equal(frames[1], frames[0])
@@ -0,0 +1,64 @@
+import itertools
+
+import pandas as pd
+import pytest
+
+from media_response.news import CryptoNewsResponse
+from utils               import response_cache
+from utils.mock_server   import MockAPIServer
+from utils.news_ingest   import WatermarkStore, ingest
+
+
+# The mock feed: TOTAL_PAGES pages of ITEMS articles per ticker, newest first.
+ITEMS       = 5
+TOTAL_PAGES = 6
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    # Archives go to tmp_path, with no response cache.
+    monkeypatch.setitem(CryptoNewsResponse.DOMAIN_SWITCH, "DEBUG", str(tmp_path))
+    monkeypatch.setattr(response_cache, "_cache", response_cache.ResponseCache(mode="off"))
+
+    with MockAPIServer(port=0, total_pages=TOTAL_PAGES) as srv:
+        yield srv
+
+
+def run(server, tmp_path, max_pages):
+    # One incremental pull of BTC into ticker-news_data_<test>.csv (index state is per archive).
+    store = WatermarkStore(str(tmp_path / "watermarks.json"))
+    ingest("BTC", items=ITEMS, max_pages=max_pages, suffix=tmp_path.name, store=store, run_type="TICKER-NEWS",
+           domain=server.url)
+
+    return pd.read_csv(tmp_path / f"ticker-news_data_{tmp_path.name}.csv"), WatermarkStore(store.path).get("ticker-news", "BTC")
+
+
+def test_watermark_waits_for_paging_to_reach_it(server, tmp_path):
+    # max_pages runs out before the end of the feed: the articles are kept, the watermark is not set.
+    df, (mark_date, _) = run(server, tmp_path, max_pages=2)
+    assert len(df) == 2 * ITEMS
+    assert mark_date is None
+
+    # The next run gets back to the end of the feed: everything is archived once.
+    df, (mark_date, mark_ids) = run(server, tmp_path, max_pages=TOTAL_PAGES + 1)
+    assert len(df) == df["news_url"].nunique() == TOTAL_PAGES * ITEMS
+    assert mark_ids == {str(df["news_id"].max())}
+
+    # Up to date: nothing new, watermark unchanged.
+    df, mark = run(server, tmp_path, max_pages=TOTAL_PAGES + 1)
+    assert len(df) == TOTAL_PAGES * ITEMS
+    assert mark == (mark_date, mark_ids)
+
+
+def test_failed_page_keeps_the_watermark(server, tmp_path, monkeypatch):
+    # Page 3 of the first run fails (400: not retried); pages 1-2 are archived, the watermark is not set.
+    calls = itertools.count(1)
+    monkeypatch.setattr(server, "draw_error", lambda: 400 if next(calls) == 3 else None)
+
+    df, (mark_date, _) = run(server, tmp_path, max_pages=TOTAL_PAGES + 1)
+    assert len(df) == 2 * ITEMS
+    assert mark_date is None
+
+    df, (mark_date, _) = run(server, tmp_path, max_pages=TOTAL_PAGES + 1)
+    assert len(df) == df["news_url"].nunique() == TOTAL_PAGES * ITEMS
+    assert mark_date is not None
@@ -0,0 +1,81 @@
+import threading
+
+import pandas as pd
+import pytest
+
+from market_response.crypto import CoinMarketCapResponse
+from utils.fetch            import execute, persist_batch
+from utils.mock_server      import MockAPIServer, symbols
+from utils.pipeline         import Pipeline
+
+
+def queries(url, groups=(4, 6, 4, 9)):
+    # latest-quotes queries against the mock server; equal sizes repeat a query (same query_key()).
+    tickers = symbols(max(groups))
+    return [
+        CoinMarketCapResponse(tickers[:n], tickers[:n], [str(i) for i in range(1, n + 1)], n, "USD", "latest-quotes",
+                              run_type="API", domain=url, cache=False, lazy=True)
+        for n in groups
+    ]
+
+
+def archives(directory):
+    return {path.name: pd.read_csv(path, dtype=str) for path in sorted(directory.iterdir())}
+
+
+@pytest.fixture
+def server():
+    with MockAPIServer(port=0) as srv:
+        yield srv
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    # Archives go to tmp_path instead of the repository's data/.
+    monkeypatch.setitem(CoinMarketCapResponse.DOMAIN_SWITCH, "DEBUG", str(tmp_path))
+    return tmp_path
+
+
+@pytest.mark.parametrize("suffix", ["T", lambda query: f"N{len(query.ticker)}"])
+def test_pipeline_matches_execute_and_persist_batch(server, data_dir, suffix):
+    # All queries into one archive ("T"), and one archive per query size; batch_rows=5 makes the
+    # writer flush mid-run.
+    (data_dir / "batch").mkdir()
+    (data_dir / "pipeline").mkdir()
+
+    CoinMarketCapResponse.DOMAIN_SWITCH["DEBUG"] = str(data_dir / "batch")
+    persist_batch(execute(queries(server.url)), suffix=suffix)
+
+    CoinMarketCapResponse.DOMAIN_SWITCH["DEBUG"] = str(data_dir / "pipeline")
+    pipeline = Pipeline(fetch_workers=2, parse_workers=2, queue_size=1, batch_rows=5, suffix=suffix)
+    pipeline.run(queries(server.url))
+
+    expected = archives(data_dir / "batch")
+    actual   = archives(data_dir / "pipeline")
+
+    assert list(actual) == list(expected)
+    for name in expected:
+        # Frames may reach the writer in any order; compare the rows, not their order.
+        key = list(expected[name].columns)
+        pd.testing.assert_frame_equal(actual[name].sort_values(key, ignore_index=True),
+                                      expected[name].sort_values(key, ignore_index=True))
+
+    assert pipeline.stats["persist"].errors == 0
+
+
+def test_failing_suffix_does_not_stop_the_pipeline(server, data_dir):
+    # Every archive name fails for the 6-coin query: it is counted and skipped, the rest persist
+    # (the repeated 4-coin query once, as both copies target the same file).
+    def suffix(query):
+        if len(query.ticker) == 6:
+            raise RuntimeError("no suffix")
+        return "T"
+
+    pipeline = Pipeline(fetch_workers=2, parse_workers=1, queue_size=1, suffix=suffix)
+    thread   = threading.Thread(target=pipeline.run, args=(queries(server.url),), daemon=True)
+    thread.start()
+    thread.join(timeout=30)
+
+    assert not thread.is_alive()
+    assert pipeline.stats["parse"].errors == 1
+    assert len(pd.read_csv(data_dir / "latest-quotes_data_T.csv")) == 4 + 9
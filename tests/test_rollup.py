@@ -0,0 +1,129 @@
+import os
+
+import numpy  as np
+import pandas as pd
+import pytest
+
+from datetime import datetime
+
+import app
+
+from market_response.crypto import CoinMarketCapResponse
+from utils                  import response_cache
+from utils.csv_archive      import append_csv
+from utils.mock_server      import MockAPIServer
+from utils.rollup           import RESOLUTIONS, Rollup, combine, set_archives, snapshot_bars
+
+
+def quotes(rows=3_000, symbols=12, days=20, seed=0):
+    # latest-quotes snapshots in random time order, as archived by the client.
+    rng   = np.random.default_rng(seed)
+    times = pd.Timestamp("2021-08-01", tz="UTC") + pd.to_timedelta(rng.integers(0, days * 86_400, rows), unit="s")
+
+    return pd.DataFrame({
+        "symbol":                  rng.choice([f"S{i}" for i in range(symbols)], rows),
+        "quote.USD.price":         rng.uniform(1, 100, rows).round(6),
+        "quote.USD.volume_24h":    rng.uniform(1e3, 1e6, rows).round(2),
+        "quote.USD.last_updated":  times.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+    })
+
+
+def expected(df, freq):
+    bars = combine(snapshot_bars(df, freq))
+    return bars.sort_values(["bucket", "symbol"], ignore_index=True)
+
+
+@pytest.mark.parametrize("batches", [1, 7])
+def test_incremental_matches_rebuild_and_resample(tmp_path, batches):
+    archive = str(tmp_path / "latest-quotes_data.csv")
+    df      = quotes()
+
+    rollup = None
+    for batch in np.array_split(np.arange(len(df)), batches):
+        append_csv(df.iloc[batch], archive)
+        rollup = Rollup(archive, rollup_dir=str(tmp_path / "rollups"), state_dir=str(tmp_path / "state"))
+        rollup.update()
+
+    rebuilt = Rollup(archive, rollup_dir=str(tmp_path / "rebuilt"), state_dir=str(tmp_path / "rebuilt_state"))
+    rebuilt.rebuild()
+
+    for res, freq in RESOLUTIONS.items():
+        incremental = rollup.read(res)
+        pd.testing.assert_frame_equal(incremental, rebuilt.read(res))
+
+        pd.testing.assert_frame_equal(incremental, expected(df, freq), check_dtype=False)
+
+
+def test_rewritten_archive_is_rolled_up_again(tmp_path):
+    archive = str(tmp_path / "latest-quotes_data.csv")
+    dirs    = {"rollup_dir": str(tmp_path / "rollups"), "state_dir": str(tmp_path / "state")}
+
+    append_csv(quotes(seed=1), archive)
+    Rollup(archive, **dirs).update()
+
+    df = quotes(rows=500, seed=2)
+    df.to_csv(archive, index=False)
+
+    rollup = Rollup(archive, **dirs)
+    rollup.update()
+
+    assert rollup.read("daily")["snapshots"].sum() == len(df)
+
+
+@pytest.fixture
+def collection(tmp_path, monkeypatch):
+    # app.collect_market() against the mock server, archiving to tmp_path, with no response cache.
+    monkeypatch.setitem(CoinMarketCapResponse.DOMAIN_SWITCH, "DEBUG", str(tmp_path))
+    monkeypatch.setattr(response_cache, "_cache", response_cache.ResponseCache(mode="off"))
+
+    with MockAPIServer(port=0) as srv:
+        monkeypatch.setitem(CoinMarketCapResponse.DOMAIN_SWITCH, "API", srv.url)
+        yield tmp_path
+
+
+def test_collect_market_rolls_up_its_daily_partitions(collection):
+    app.collect_market(run_type="API")
+    app.collect_market(run_type="API")
+
+    partition = collection / f"latest-quotes_data_{datetime.now():%Y%m%d}.csv"
+    df        = pd.read_csv(partition)
+    rollup    = Rollup(str(partition), rollup_dir=str(collection / "rollups"), state_dir=str(collection / ".state"),
+                       name="latest-quotes_data")
+
+    assert sorted(os.listdir(collection / "rollups")) == sorted(f"latest-quotes_data_{res}.csv" for res in RESOLUTIONS)
+    for res, freq in RESOLUTIONS.items():
+        pd.testing.assert_frame_equal(rollup.read(res), expected(df, freq), check_dtype=False)
+
+
+def test_partitions_and_archive_share_one_table_set(collection):
+    # Snapshots of one set reach the tables whichever archive of the set they were written to;
+    # the combined _ALL archive is not part of it.
+    client = CoinMarketCapResponse(["BTC"], ["bitcoin"], ["1"], 1, "USD", "latest-quotes", run_type="API", cache=False,
+                                   lazy=True)
+    write  = lambda df, suffix: client.write_archive(df, client.archive_filename(mode="a", suffix=suffix))
+    df     = quotes()
+    frames = {suffix: df.iloc[rows] for suffix, rows in zip(["20210814", "20210815", ""], np.array_split(np.arange(len(df)), 3))}
+
+    for suffix, df in frames.items():
+        write(df, suffix)
+
+    write(quotes(rows=100, seed=3), "ALL")
+
+    tables = {"rollup_dir": str(collection / "rollups"), "state_dir": str(collection / ".state")}
+    rollup = Rollup(set_archives(str(collection), CoinMarketCapResponse.ROLLUP_ARCHIVES["latest-quotes_data"]),
+                    name="latest-quotes_data", **tables)
+    other  = Rollup(str(collection / "latest-quotes_data_ALL.csv"), **tables)
+
+    assert len(rollup.archives) == 3
+    assert rollup.read("daily")["snapshots"].sum() == sum(len(df) for df in frames.values())
+    assert other.read("daily")["snapshots"].sum() == 100
+
+    # Appending to one partition updates the same tables; rewriting one rebuilds them.
+    write(quotes(rows=50, seed=4), "20210814")
+    assert Rollup(rollup.archives, name="latest-quotes_data", **tables).read("daily")["snapshots"].sum() == 3_000 + 50
+
+    pd.read_csv(rollup.archives[0]).iloc[:10].to_csv(rollup.archives[0], index=False)
+    write(quotes(rows=5, seed=5), "20210815")
+
+    sizes = [len(pd.read_csv(archive)) for archive in rollup.archives]
+    assert Rollup(rollup.archives, name="latest-quotes_data", **tables).read("daily")["snapshots"].sum() == sum(sizes)
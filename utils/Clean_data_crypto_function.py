@@ -3,21 +3,25 @@ sys.path.append('.')
 
 import pandas as pd
 
+from utils.csv_archive import write_csv_atomic
+from utils.profiling   import profiled
+from utils.schema      import apply_schema, read_csv
+
 
 def date_str_func(suffix):
     return f"./data/latest-quotes_data_{suffix}.csv"
 
 
-def data_pull(date_var):
-    data_crypto = pd.read_csv(date_str_func(date_var))
-    
-    data_crypto["max_supply"] = data_crypto["max_supply"].fillna(0).astype(int)
-    data_crypto["circulating_supply"]= data_crypto["circulating_supply"].fillna(0).astype(int)
-    data_crypto["total_supply"]= data_crypto["total_supply"].fillna(0).astype(int)
-    data_crypto["quote.USD.market_cap"]= data_crypto["quote.USD.market_cap"].fillna(0).astype(int)
-    data_crypto["quote.USD.fully_diluted_market_cap"]= data_crypto["quote.USD.fully_diluted_market_cap"].fillna(0).astype(int)
-    data_crypto["date_added"]= pd.to_datetime( data_crypto["date_added"],infer_datetime_format=True, utc=True)
-    data_crypto["quote.USD.last_updated"] = pd.to_datetime( data_crypto["quote.USD.last_updated"],infer_datetime_format=True, utc=True)
+def read_partition(date_var, storage):
+    # Read one day of quotes from the partitioned archive (see utils/storage.py).
+    day = pd.Timestamp(date_var, tz="UTC")
+    df  = storage.read("latest-quotes", start=day, end=day + pd.Timedelta(days=1) - pd.Timedelta(1, "ns"))
+
+    return apply_schema(df, "latest-quotes")
+
+
+def clean(data_crypto):
+    # Supply and market cap columns are dropped. Already cleaned frames pass through unchanged.
     data_crypto_df = data_crypto.drop(columns = ["id", 
                             "tags", 
                             'max_supply',
@@ -28,18 +32,27 @@ def data_pull(date_var):
                             'quote.USD.fully_diluted_market_cap',
                             'is_fiat',
                             'platform',
-                            'date_added'])
+                            'date_added'], errors="ignore")
     return data_crypto_df
 
 
+@profiled("clean_crypto")
+def data_pull(date_var, storage=None):
+    # The schema types the columns while parsing: categorical names/symbols, narrow numerics and
+    # UTC datetimes (date_added, quote.USD.last_updated).
+    data_crypto = read_partition(date_var, storage) if storage else read_csv(date_str_func(date_var), "latest-quotes")
+
+    return clean(data_crypto)
+
+
 def write_df(df, date_var):
-    df.to_csv(date_str_func(date_var), mode="w")
+    write_csv_atomic(df, date_str_func(date_var))
 
 
 if __name__ == "__main__":
-    for d in [21]:
-        date_var  = f"202108{d}"
-        crypto_df = data_pull(date_var)
+    # Every latest-quotes partition changed since its last clean, across a process pool (see
+    # utils/clean_runner.py for the options).
+    from utils import clean_runner
 
-        write_df(crypto_df, date_var)
+    print(clean_runner.run(["latest-quotes"]).to_string(index=False))
 
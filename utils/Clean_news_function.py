@@ -3,31 +3,50 @@ sys.path.append('.')
 
 import pandas as pd
 
+from utils.csv_archive import write_csv_atomic
+from utils.profiling   import profiled
+from utils.schema      import apply_schema, read_csv
+
 
 def date_str_func(suffix):
     return f"./data/ticker-news_data_{suffix}.csv"
 
 
-def data_pull(date_var):
-    filename         = date_str_func(date_var)
-    data_crypto_news = pd.read_csv(filename)
+def read_partition(date_var, storage):
+    # Read one day of articles from the partitioned archive (see utils/storage.py).
+    day = pd.Timestamp(date_var, tz="UTC")
+    df  = storage.read("ticker-news", start=day, end=day + pd.Timedelta(days=1) - pd.Timedelta(1, "ns"))
+
+    return apply_schema(df, "ticker-news")
+
+
+def clean(data_crypto_news):
+    # Articles tagged with at least one ticker, without the columns the analysis does not use.
+    # Already cleaned frames pass through unchanged.
     data_crypto_news = data_crypto_news[data_crypto_news["tickers"].notna()]
 
-    data_crypto_news["date"] = pd.to_datetime(data_crypto_news["date"],infer_datetime_format=True, utc=True)
-    data_crypto_news = data_crypto_news.drop_duplicates()
-    data_crypto_news = data_crypto_news.drop(columns= ['type','news_id','eventid'])
+    data_crypto_news = data_crypto_news.drop(columns= ['type','news_id','eventid'], errors="ignore")
 
     return data_crypto_news
 
 
+@profiled("clean_news")
+def data_pull(date_var, storage=None):
+    filename         = date_str_func(date_var)
+    # The schema parses "date" to UTC and types the repeated strings as categoricals.
+    data_crypto_news = read_partition(date_var, storage) if storage else read_csv(filename, "ticker-news")
+
+    return clean(data_crypto_news)
+
+
 def write_df(df, date_var):
-    df.to_csv(date_str_func(date_var), mode="w")
+    write_csv_atomic(df, date_str_func(date_var))
 
 
 if __name__ == "__main__":
-    for d in range(14, 22):
-        date_var       = f"202108{d}"
-        crypto_news_df = data_pull(date_var)
+    # Every ticker-news partition changed since its last clean, across a process pool (see
+    # utils/clean_runner.py for the options).
+    from utils import clean_runner
+
+    print(clean_runner.run(["ticker-news"]).to_string(index=False))
 
-        write_df(crypto_news_df, date_var)
-    
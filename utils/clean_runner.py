@@ -0,0 +1,231 @@
+import sys
+sys.path.append('.')
+
+import os
+import re
+import glob
+import json
+import time
+import fcntl
+import hashlib
+import argparse
+import tempfile
+import traceback
+
+import pandas as pd
+
+from datetime           import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from utils             import Clean_data_crypto_function, Clean_news_function
+from utils.csv_archive import write_csv_atomic
+
+
+# Batch cleaning of the daily archive partitions (ticker-news_data_<day>.csv,
+# latest-quotes_data_<day>.csv): every partition found is read, cleaned with its Clean_* module
+# and rewritten atomically, one partition per worker process. A manifest in data/.state keeps
+# the size, mtime and SHA-256 of each partition as it was left by its last clean, so partitions
+# that have not changed since are skipped.
+#   python utils/clean_runner.py [--endpoints ticker-news] [--workers 4] [--force]
+# Partitions are read as text and only rows and columns are dropped: the values are written back
+# exactly as collected (the schema narrows them on the read side only, see utils/schema.py).
+# While a collector holds its lock (see collector.py), today's partitions are still being
+# appended to and are left for a later run.
+
+STATE_DIR      = os.path.join(os.getcwd(), "data", ".state")
+MANIFEST_FILE  = os.path.join(STATE_DIR, "clean_manifest.json")
+COLLECTOR_LOCK = os.path.join(STATE_DIR, "collector.lock")
+DATA_DIR       = os.path.join(os.getcwd(), "data")
+
+# Endpoint tag: the Clean_* module cleaning its partitions.
+CLEANERS = {
+    "ticker-news":   Clean_news_function,
+    "latest-quotes": Clean_data_crypto_function,
+}
+
+# Partition suffixes: a day (20210814), optionally with the time of a mode="w" run
+# (20210814_093000). Combined archives such as _ALL are not partitions and are never cleaned.
+PARTITION_SUFFIX = re.compile(r"\d{8}(_\d{6})?")
+
+HASH_BLOCK = 1024 * 1024
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(HASH_BLOCK):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+
+def file_state(path):
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": file_digest(path)}
+
+
+class CleanManifest:
+    # State of each partition after its last clean, by absolute path.
+    def __init__(self, path=MANIFEST_FILE):
+        self.path  = path
+        self.files = {}
+
+        if os.path.isfile(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.files = json.load(f)
+
+    def unchanged(self, key, path):
+        # Size and mtime as recorded: unchanged without reading the file. Otherwise the content
+        # hash decides (e.g. a copy or touch that left the bytes alone), and the recorded mtime
+        # is refreshed when it matches.
+        entry = self.files.get(key)
+        if not entry:
+            return False
+
+        stat = os.stat(path)
+        if stat.st_size != entry["size"]:
+            return False
+        if stat.st_mtime_ns == entry["mtime_ns"]:
+            return True
+
+        if file_digest(path) != entry["sha256"]:
+            return False
+
+        entry["mtime_ns"] = stat.st_mtime_ns
+        return True
+
+    def set(self, key, endpoint, state):
+        self.files[key] = {"endpoint": endpoint, **state}
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        fd, tmp = tempfile.mkstemp(prefix=".tmp_", dir=os.path.dirname(self.path))
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self.files, f, indent=4, sort_keys=True)
+        os.replace(tmp, self.path)
+
+
+def partition_suffix(endpoint, path):
+    # What an archive's name adds to the endpoint's: the day of a partition (e.g. 20210814).
+    prefix, ext = os.path.basename(CLEANERS[endpoint].date_str_func("*")).split("*")
+    return os.path.basename(path)[len(prefix):-len(ext)]
+
+
+def discover(endpoints=CLEANERS, data_dir=DATA_DIR):
+    # (endpoint, path) of every partition of the endpoints in data_dir, by name.
+    partitions = []
+    for endpoint in endpoints:
+        if endpoint not in CLEANERS:
+            raise ValueError(f"Variable 'endpoints' must be one of the values in {list(CLEANERS)}." +
+                             f"'{endpoint}' is not valid.")
+
+        pattern = os.path.basename(CLEANERS[endpoint].date_str_func("*"))
+        for path in sorted(glob.glob(os.path.join(data_dir, pattern))):
+            if PARTITION_SUFFIX.fullmatch(partition_suffix(endpoint, path)):
+                partitions.append((endpoint, path))
+
+    return partitions
+
+
+def collector_running(lock_file=COLLECTOR_LOCK):
+    # True while a collector process holds its lock file.
+    if not os.path.isfile(lock_file):
+        return False
+
+    with open(lock_file, "r") as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_SH | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return True
+        fcntl.flock(f, fcntl.LOCK_UN)
+
+    return False
+
+
+def clean_partition(endpoint, path):
+    # Read, clean and atomically rewrite one partition; returns its row counts and the state of
+    # the cleaned file for the manifest. Every cell is read as the text it was written as (only
+    # empty cells are missing), so the rows kept are rewritten unchanged.
+    start = time.perf_counter()
+    df    = pd.read_csv(path, dtype=str, keep_default_na=False, na_values=[""])
+    rows  = len(df)
+    df    = CLEANERS[endpoint].clean(df)
+
+    write_csv_atomic(df, path)
+
+    return {"rows_in": rows, "rows_out": len(df), "seconds": time.perf_counter() - start, "state": file_state(path)}
+
+
+def _clean_partition(args):
+    return clean_partition(*args)
+
+
+def run(endpoints=CLEANERS, data_dir=DATA_DIR, workers=None, force=False, manifest_file=MANIFEST_FILE,
+        lock_file=COLLECTOR_LOCK):
+    # Clean every changed partition, workers at a time (all CPUs by default). Returns one row per
+    # partition: status ("cleaned", "skipped", "in use" or "failed"), rows in and out and seconds.
+    # Partitions "in use" (today's, while the collector runs) are not cleaned, even with force.
+    workers  = workers or os.cpu_count() or 1
+    manifest = CleanManifest(manifest_file)
+    results  = []
+    pending  = []
+    today    = datetime.now().strftime("%Y%m%d") if collector_running(lock_file) else None
+
+    for endpoint, path in discover(endpoints, data_dir):
+        key = os.path.abspath(path)
+        if partition_suffix(endpoint, path)[:8] == today:
+            results.append({"partition": os.path.basename(key), "endpoint": endpoint, "status": "in use"})
+        elif not force and manifest.unchanged(key, path):
+            results.append({"partition": os.path.basename(key), "endpoint": endpoint, "status": "skipped"})
+        else:
+            pending.append((key, endpoint, path))
+
+    def record(key, endpoint, done):
+        manifest.set(key, endpoint, done.pop("state"))
+        results.append({"partition": os.path.basename(key), "endpoint": endpoint, "status": "cleaned", **done})
+
+    def failed(key, endpoint):
+        traceback.print_exc()
+        results.append({"partition": os.path.basename(key), "endpoint": endpoint, "status": "failed"})
+
+    try:
+        if workers == 1 or len(pending) <= 1:
+            for key, endpoint, path in pending:
+                try:
+                    record(key, endpoint, _clean_partition((endpoint, path)))
+                except Exception:
+                    failed(key, endpoint)
+        else:
+            with ProcessPoolExecutor(max_workers=min(workers, len(pending))) as pool:
+                futures = {pool.submit(_clean_partition, (endpoint, path)): (key, endpoint) for key, endpoint, path in pending}
+                for future in as_completed(futures):
+                    try:
+                        record(*futures[future], future.result())
+                    except Exception:
+                        failed(*futures[future])
+
+    # Partitions cleaned before an interruption are not cleaned again on the next run.
+    finally:
+        manifest.save()
+
+    columns = ["partition", "endpoint", "status", "rows_in", "rows_out", "seconds"]
+    return pd.DataFrame(results, columns=columns).sort_values("partition", ignore_index=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--endpoints", nargs="+", default=list(CLEANERS), choices=list(CLEANERS))
+    parser.add_argument("--data-dir",  default=DATA_DIR)
+    parser.add_argument("--workers",   type=int)
+    parser.add_argument("--force",     action="store_true")
+    parser.add_argument("--lock-file", default=COLLECTOR_LOCK)
+    args = parser.parse_args()
+
+    start  = time.perf_counter()
+    report = run(args.endpoints, args.data_dir, args.workers, args.force, lock_file=args.lock_file)
+
+    print(report.to_string(index=False))
+    print(f"{(report['status'] == 'cleaned').sum()} cleaned, {(report['status'] == 'skipped').sum()} skipped, " +
+          f"{(report['status'] == 'in use').sum()} in use, {(report['status'] == 'failed').sum()} failed " +
+          f"in {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,282 @@
+import sys
+sys.path.append('.')
+
+import os
+import json
+import hashlib
+import tempfile
+
+import numpy  as np
+import pandas as pd
+
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.gcb_index import quote_matrices, returns_matrix
+from utils.timezone  import to_utc_datetime
+
+
+CACHE_DIR = os.path.join(os.getcwd(), "data", ".cache", "correlation")
+
+# Daily ticker-stats columns correlated with returns.
+FEATURES = ["Positive", "Negative", "sentiment_score"]
+
+# Lags in days (sentiment of day t - lag against the return of day t; negative lags look at
+# sentiment after the return) and rolling window sizes in days.
+LAGS    = [0, 1, 2, 3, 5, 7]
+WINDOWS = [7, 14, 30, 60]
+
+# Fraction of a window that must hold (sentiment, return) pairs for its correlation to count.
+MIN_FRACTION = 0.5
+
+# Tickers are spread over this many shards by a stable hash of their symbol, so adding or
+# dropping a ticker only changes the shard it hashes to.
+SHARDS = 16
+
+# Size bound of the shard cache; least recently used entries are dropped beyond it.
+MAX_CACHE_BYTES = 256 * 1024**2
+
+
+def daily_inputs(quotes_df, stats_df, features=FEATURES, tickers=None):
+    # (dates, tickers, {feature: date x ticker}, date x ticker returns) on one daily grid.
+    # Returns are close-to-close over the daily buckets of the quote snapshots.
+    grid, quote_tickers, prices, _ = quote_matrices(quotes_df, "D")
+    returns = pd.DataFrame(returns_matrix(prices), index=grid, columns=quote_tickers)
+
+    stats = stats_df.assign(date=to_utc_datetime(stats_df["date"]).dt.floor("D"), ticker=stats_df["ticker"].astype(str))
+    stats = stats[stats["date"].notna()].drop_duplicates(subset=["date", "ticker"], keep="last")
+
+    tickers = sorted(set(quote_tickers) & set(stats["ticker"])) if tickers is None else sorted(tickers)
+    dates   = pd.date_range(min(grid.min(), stats["date"].min()), max(grid.max(), stats["date"].max()), freq="D")
+
+    x = {
+        feature: stats.pivot(index="date", columns="ticker", values=feature).reindex(index=dates, columns=tickers).to_numpy(dtype=np.float64)
+        for feature in features
+    }
+    y = returns.reindex(index=dates, columns=tickers).to_numpy(dtype=np.float64)
+
+    return dates, tickers, x, y
+
+
+def shift(values, lag):
+    # values[t - lag] at row t, NaN where that falls outside the history.
+    out = np.full(values.shape, np.nan)
+    if lag >= 0:
+        out[lag:] = values[:len(values) - lag]
+    else:
+        out[:lag] = values[-lag:]
+
+    return out
+
+
+def rolling_corr(x, y, lags=LAGS, windows=WINDOWS, min_fraction=MIN_FRACTION):
+    # Rolling Pearson correlation of x lagged against y, for every lag, window, day and ticker.
+    # x and y are (days x tickers); the result is (lags x windows x days x tickers), together
+    # with the number of pairs behind each value. Each lag takes six cumulative sums over the
+    # pairs where both sides are known (count, sums, squares, products); every window is then a
+    # difference of two rows of them.
+    days, tickers = y.shape
+    corr   = np.full((len(lags), len(windows), days, tickers), np.nan)
+    counts = np.zeros((len(lags), len(windows), days, tickers), dtype=np.int32)
+
+    ends = np.arange(1, days + 1)
+    zero = np.zeros((1, tickers))
+
+    for i, lag in enumerate(lags):
+        xs    = shift(x, lag)
+        valid = np.isfinite(xs) & np.isfinite(y)
+        a     = np.where(valid, xs, 0.0)
+        b     = np.where(valid, y, 0.0)
+
+        cums = [np.concatenate([zero, np.cumsum(v, axis=0)]) for v in (valid.astype(np.float64), a, b, a * a, b * b, a * b)]
+
+        for j, window in enumerate(windows):
+            starts = np.maximum(ends - window, 0)
+            n, sa, sb, saa, sbb, sab = (c[ends] - c[starts] for c in cums)
+
+            with np.errstate(divide="ignore", invalid="ignore"):
+                cov = n * sab - sa * sb
+                var = (n * saa - sa * sa) * (n * sbb - sb * sb)
+                r   = cov / np.sqrt(var)
+
+            enough       = (n >= max(min_fraction * window, 3)) & (var > 0)
+            corr[i, j]   = np.where(enough, np.clip(r, -1, 1), np.nan)
+            counts[i, j] = n
+
+    return corr, counts
+
+
+def shard_of(ticker, shards=SHARDS):
+    digest = hashlib.blake2b(str(ticker).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little") % shards
+
+
+def shard_key(tickers, features, lags, windows, min_fraction):
+    # Cache key of one shard: its tickers and the correlation settings, not the data. The entry
+    # records which input rows its result was computed from (see row_digests).
+    return hashlib.sha256(json.dumps({
+        "tickers":      list(tickers),
+        "features":     list(features),
+        "lags":         list(lags),
+        "windows":      list(windows),
+        "min_fraction": min_fraction,
+    }, sort_keys=True).encode()).hexdigest()
+
+
+def row_digests(x, y):
+    # One 16 byte digest per day over every feature and the returns of the shard's tickers.
+    rows = np.ascontiguousarray(np.concatenate([x[feature] for feature in x] + [y], axis=1))
+    return np.array([np.frombuffer(hashlib.blake2b(row.tobytes(), digest_size=16).digest(), dtype=np.uint8) for row in rows]).reshape(len(rows), 16)
+
+
+def common_rows(a, b):
+    # Length of the common prefix of two row digest arrays.
+    n    = min(len(a), len(b))
+    same = (a[:n] == b[:n]).all(axis=1)
+
+    return n if same.all() else int(np.argmin(same))
+
+
+def shard_corr(tickers, x, y, lags=LAGS, windows=WINDOWS, min_fraction=MIN_FRACTION, cache_dir=CACHE_DIR):
+    # {feature: (corr, counts)} for one shard of tickers, reusing the cached result where it can.
+    # The value of day t depends on the input rows up to t + max(-lag) only, so every day up to
+    # that margin before the first changed input row is taken from the cache. The rest is
+    # computed from a slice starting one longest window (plus lag) before it: appending days
+    # costs those days, not the whole history.
+    path    = os.path.join(cache_dir, shard_key(tickers, x, lags, windows, min_fraction) + ".npz") if cache_dir else None
+    digests = row_digests(x, y)
+    saved   = {}
+    keep    = 0
+
+    if path and os.path.isfile(path):
+        with np.load(path) as entry:
+            saved = {key: entry[key] for key in entry.files}
+
+        os.utime(path)
+        same = common_rows(saved["rows"], digests)
+        if same == len(digests) == len(saved["rows"]):
+            return {feature: (saved[f"{feature}_corr"], saved[f"{feature}_counts"]) for feature in x}
+
+        keep = max(same - max(-min(lags), 0), 0)
+
+    start  = max(keep - max(windows) - max(max(lags), 0), 0)
+    result = {}
+    for feature, values in x.items():
+        corr, counts = rolling_corr(values[start:], y[start:], lags, windows, min_fraction)
+        if keep:
+            corr   = np.concatenate([saved[f"{feature}_corr"][:, :, :keep],   corr[:, :, keep - start:]],   axis=2)
+            counts = np.concatenate([saved[f"{feature}_counts"][:, :, :keep], counts[:, :, keep - start:]], axis=2)
+        result[feature] = (corr, counts)
+
+    if path:
+        os.makedirs(cache_dir, exist_ok=True)
+
+        arrays = {"rows": digests}
+        for feature, (corr, counts) in result.items():
+            arrays[f"{feature}_corr"]   = corr
+            arrays[f"{feature}_counts"] = counts
+
+        fd, tmp = tempfile.mkstemp(prefix=".tmp_", suffix=".npz", dir=cache_dir)
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, path)
+
+    return result
+
+
+def evict(cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+    # Drop least recently used shard entries until the cache fits in max_bytes.
+    if not cache_dir or not os.path.isdir(cache_dir):
+        return
+
+    entries = []
+    for filename in os.listdir(cache_dir):
+        if filename.endswith(".npz") and not filename.startswith(".tmp_"):
+            stat = os.stat(os.path.join(cache_dir, filename))
+            entries.append((stat.st_atime, stat.st_size, os.path.join(cache_dir, filename)))
+
+    size = sum(entry[1] for entry in entries)
+    for _, entry_size, path in sorted(entries):
+        if size <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            size -= entry_size
+        except FileNotFoundError:
+            pass
+
+
+def _shard_corr(args):
+    return shard_corr(*args)
+
+
+def correlation_cube(tickers, x, y, lags=LAGS, windows=WINDOWS, min_fraction=MIN_FRACTION, workers=1, cache_dir=CACHE_DIR):
+    # {feature: (corr, counts)} over all tickers (last axis), computed shard by shard. Shards are
+    # spread over a process pool when workers > 1.
+    workers = workers or os.cpu_count() or 1
+    shards  = {}
+    for i, ticker in enumerate(tickers):
+        shards.setdefault(shard_of(ticker), []).append(i)
+
+    columns = [np.array(cols) for _, cols in sorted(shards.items())]
+    args    = [
+        ([tickers[i] for i in cols], {feature: values[:, cols] for feature, values in x.items()},
+         y[:, cols], lags, windows, min_fraction, cache_dir)
+        for cols in columns
+    ]
+
+    if workers == 1 or len(args) <= 1:
+        parts = [_shard_corr(arg) for arg in args]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_shard_corr, args))
+
+    evict(cache_dir)
+
+    # Shard columns back into ticker order.
+    order = np.argsort(np.concatenate(columns))
+
+    return {
+        feature: tuple(np.concatenate([part[feature][k] for part in parts], axis=-1)[..., order] for k in range(2))
+        for feature in x
+    }
+
+
+def to_frame(dates, tickers, cube, lags=LAGS, windows=WINDOWS):
+    # Long (date, ticker, feature, lag, window, corr, pairs) rows, without the undefined ones.
+    frames = []
+    for feature, (corr, counts) in cube.items():
+        idx = np.nonzero(np.isfinite(corr))
+        frames.append(pd.DataFrame({
+            "date":    dates[idx[2]],
+            "ticker":  np.asarray(tickers)[idx[3]],
+            "feature": feature,
+            "lag":     np.asarray(lags)[idx[0]],
+            "window":  np.asarray(windows)[idx[1]],
+            "corr":    corr[idx],
+            "pairs":   counts[idx],
+        }))
+
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=["date", "ticker", "feature", "lag", "window", "corr", "pairs"])
+
+
+def lagged_correlations(quotes_df, stats_df, lags=LAGS, windows=WINDOWS, features=FEATURES, tickers=None,
+                        min_fraction=MIN_FRACTION, workers=1, cache_dir=CACHE_DIR):
+    # Rolling, lagged correlations between daily sentiment (ticker-stats) and daily returns (quote
+    # archive) for every ticker found in both.
+    dates, tickers, x, y = daily_inputs(quotes_df, stats_df, features, tickers)
+    cube = correlation_cube(tickers, x, y, lags, windows, min_fraction, workers, cache_dir)
+
+    return to_frame(dates, tickers, cube, lags, windows)
+
+
+if __name__ == "__main__":
+    # Usage: python utils/correlation.py
+    #   Mean correlation across tickers and days per (feature, lag, window) for the archives.
+    quotes_df = pd.read_csv("./data/latest-quotes_data_ALL.csv")
+    stats_df  = pd.read_csv("./data/ticker-stats_last7days.csv")
+
+    df = lagged_correlations(quotes_df, stats_df, windows=[3, 5, 7], min_fraction=0.5)
+    if df.empty:
+        print("Not enough overlapping days of sentiment and returns.")
+    else:
+        print(df.groupby(["feature", "lag", "window"])["corr"].agg(["mean", "count"]).round(3).to_string())
@@ -0,0 +1,80 @@
+import os
+import tempfile
+
+import pandas as pd
+
+
+CHUNKSIZE = 50_000
+
+
+def read_header(filename):
+    # Only the header row is parsed; the archive body is never loaded.
+    return list(pd.read_csv(filename, nrows=0).columns)
+
+
+def append_csv(df, filename):
+    # Append only the new rows of df to an existing CSV archive.
+    #   - Same (or subset of) columns: rows are aligned to the archive header and appended in place.
+    #   - New columns: the archive is re-streamed in chunks into a temp file with the widened
+    #     header and atomically renamed over the original.
+    if not os.path.isfile(filename) or os.path.getsize(filename) == 0:
+        write_csv_atomic(df, filename)
+        return
+
+    header  = read_header(filename)
+    new_col = [col for col in df.columns if col not in header]
+
+    if new_col:
+        widen_csv(df, filename, header + new_col)
+    else:
+        append_rows(df.reindex(columns=header), filename)
+
+
+def append_rows(df, filename):
+    size = os.path.getsize(filename)
+
+    try:
+        with open(filename, "a+b") as f:
+            # Guard against an archive whose last line has no trailing newline.
+            f.seek(size - 1)
+            if f.read(1) not in (b"\n", b"\r"):
+                f.write(os.linesep.encode())
+
+        df.to_csv(filename, mode="a", header=False, index=False)
+
+    # Roll the archive back to its previous size if the append fails part way through.
+    except BaseException:
+        with open(filename, "r+b") as f:
+            f.truncate(size)
+        raise
+
+
+def widen_csv(df, filename, columns):
+    def write(tmp):
+        # Existing rows are copied as raw text so their formatting is left untouched.
+        for chunk in pd.read_csv(filename, chunksize=CHUNKSIZE, dtype=str, keep_default_na=False):
+            chunk.reindex(columns=columns).to_csv(tmp, mode="a", header=not os.path.getsize(tmp), index=False)
+
+        df.reindex(columns=columns).to_csv(tmp, mode="a", header=not os.path.getsize(tmp), index=False)
+
+    replace_atomic(filename, write)
+
+
+def write_csv_atomic(df, filename):
+    replace_atomic(filename, lambda tmp: df.to_csv(tmp, index=False))
+
+
+def replace_atomic(filename, write_func):
+    # Write to a temp file in the same directory, then rename over the target so readers never
+    # see a partially written archive.
+    dirname = os.path.dirname(os.path.abspath(filename))
+    fd, tmp = tempfile.mkstemp(prefix=".tmp_", suffix=".csv", dir=dirname)
+    os.close(fd)
+
+    try:
+        write_func(tmp)
+        os.replace(tmp, filename)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
@@ -0,0 +1,158 @@
+import sys
+sys.path.append('.')
+
+import os
+import hashlib
+import tempfile
+
+import numpy  as np
+import pandas as pd
+
+from utils.csv_archive import replace_atomic
+
+
+STATE_DIR = os.path.join(os.getcwd(), "data", ".state")
+KEY_COL   = "news_url"
+CHUNKSIZE = 50_000
+
+# Identity of an article without a key (missing or blank news_url): these columns together.
+# Articles with neither are never deduplicated and never enter the index.
+FALLBACK_COLS = ["title", "date"]
+
+
+def hash_keys(values):
+    # 64-bit blake2b digest per identity: 8 bytes per article, ~8 MB per million rows.
+    return np.fromiter(
+        (int.from_bytes(hashlib.blake2b(str(v).encode(), digest_size=8).digest(), "little") for v in values),
+        dtype=np.uint64,
+        count=len(values),
+    )
+
+
+def present(values):
+    # Rows holding a value: not missing and not blank.
+    return values.notna() & (values.astype(str).str.strip() != "")
+
+
+def identities(df, key=KEY_COL, fallback=FALLBACK_COLS):
+    # Identity of each row: its key, else its fallback columns (prefixed, so they cannot collide
+    # with a key), else None.
+    ids = df[key].astype(object).where(present(df[key]), None) if key in df.columns else pd.Series(None, index=df.index, dtype=object)
+
+    if set(fallback) <= set(df.columns):
+        usable = ids.isna() & np.logical_and.reduce([present(df[col]) for col in fallback])
+        if usable.any():
+            ids[usable] = "|".join(fallback) + ":" + df.loc[usable, fallback].astype(str).agg("|".join, axis=1)
+
+    return ids
+
+
+class DedupIndex:
+    # Sorted array of hashed article identities for one archive file, persisted next to the
+    # other collection state. The archive size recorded with the index detects archives that
+    # were changed behind its back; the index is then rebuilt from the archive.
+    def __init__(self, archive, key=KEY_COL, state_dir=STATE_DIR):
+        self.archive = archive
+        self.key     = key
+        self.path    = os.path.join(state_dir, os.path.basename(archive) + ".dedup.npz")
+        self.hashes  = np.empty(0, dtype=np.uint64)
+
+        self.load()
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def load(self):
+        size = os.path.getsize(self.archive) if os.path.isfile(self.archive) else 0
+
+        if os.path.isfile(self.path):
+            with np.load(self.path) as saved:
+                if int(saved["archive_size"]) == size:
+                    self.hashes = saved["hashes"]
+                    return
+
+        self.rebuild()
+
+    def rebuild(self):
+        self.hashes = np.empty(0, dtype=np.uint64)
+
+        if os.path.isfile(self.archive) and os.path.getsize(self.archive):
+            header = pd.read_csv(self.archive, nrows=0).columns
+            if self.key not in header:
+                return
+
+            usecols = [col for col in [self.key] + FALLBACK_COLS if col in header]
+            for chunk in pd.read_csv(self.archive, usecols=usecols, dtype=str, chunksize=CHUNKSIZE):
+                self.add(hash_keys(identities(chunk, self.key).dropna().values))
+
+    def contains(self, hashes):
+        if not len(self.hashes):
+            return np.zeros(len(hashes), dtype=bool)
+
+        pos = np.searchsorted(self.hashes, hashes)
+        pos = np.minimum(pos, len(self.hashes) - 1)
+
+        return self.hashes[pos] == hashes
+
+    def add(self, hashes):
+        self.hashes = np.union1d(self.hashes, hashes).astype(np.uint64)
+
+    def filter_new(self, df):
+        # Rows of df whose identity is neither in the archive nor repeated earlier in df, and the
+        # hashes to add to the index. Rows without an identity are all kept and never hashed.
+        if self.key not in df.columns or df.empty:
+            return df, np.empty(0, dtype=np.uint64)
+
+        ids      = identities(df, self.key)
+        known    = ids.notna().values
+        hashes   = hash_keys(ids[known].values)
+        _, first = np.unique(hashes, return_index=True)
+
+        new        = np.zeros(len(hashes), dtype=bool)
+        new[first] = True
+        new       &= ~self.contains(hashes)
+
+        mask        = ~known
+        mask[known] = new
+
+        return df[mask], hashes[new]
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        size = os.path.getsize(self.archive) if os.path.isfile(self.archive) else 0
+
+        fd, tmp = tempfile.mkstemp(prefix=".tmp_", suffix=".npz", dir=os.path.dirname(self.path))
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, hashes=self.hashes, archive_size=np.int64(size))
+        os.replace(tmp, self.path)
+
+
+def dedup_archive(archive, key=KEY_COL):
+    # One-shot cleanup of an archive written before the index existed: keeps the first row of
+    # every identity, rewrites the file atomically and saves a fresh index.
+    index = DedupIndex(archive, key=key)
+    index.hashes = np.empty(0, dtype=np.uint64)
+
+    def write(tmp):
+        for chunk in pd.read_csv(archive, chunksize=CHUNKSIZE, dtype=str, keep_default_na=False):
+            chunk, hashes = index.filter_new(chunk)
+            index.add(hashes)
+            chunk.to_csv(tmp, mode="a", header=not os.path.getsize(tmp), index=False)
+
+    replace_atomic(archive, write)
+    index.save()
+
+    return len(index)
+
+
+if __name__ == "__main__":
+    # Usage: python utils/dedup_index.py [news archive csv files...]
+    #   Defaults to every data/ticker-news_data*.csv archive.
+    data_dir = os.path.join(os.getcwd(), "data")
+    files    = sys.argv[1:] or sorted(
+        os.path.join(data_dir, f) for f in os.listdir(data_dir) if f.startswith("ticker-news_data")
+    )
+
+    for filename in files:
+        rows = dedup_archive(filename)
+        print(f"Deduplicated : {filename} ({rows} unique articles)")
@@ -0,0 +1,75 @@
+import pandas as pd
+
+from collections        import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+MAX_WORKERS = 4
+
+
+def fetch_all(jobs, max_workers=MAX_WORKERS, raise_errors=True):
+    # Run zero-argument jobs (e.g. functools.partial(CryptoNewsResponse, ...)) on a thread pool.
+    # At most max_workers requests are in flight; results come back in job order regardless of
+    # completion order.
+    jobs = list(jobs)
+    if not jobs:
+        return []
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(jobs))) as executor:
+        futures = [executor.submit(job) for job in jobs]
+
+    results = []
+    for future in futures:
+        try:
+            results.append(future.result())
+        except Exception as e:
+            if raise_errors:
+                raise
+            print(e)
+            results.append(None)
+
+    return results
+
+
+def execute(queries, max_workers=MAX_WORKERS, raise_errors=True):
+    # Run lazily built queries (lazy=True) in bulk. Identical queries (same query_key()) are
+    # fetched once and the result is shared. Returns the queries in the order given.
+    queries = list(queries)
+    unique  = OrderedDict()
+    for query in queries:
+        if not query.executed:
+            unique.setdefault(query.query_key(), []).append(query)
+
+    leaders = [group[0] for group in unique.values()]
+    fetch_all([leader.request for leader in leaders], max_workers=max_workers, raise_errors=raise_errors)
+
+    for group in unique.values():
+        for query in group[1:]:
+            query.copy_result(group[0])
+
+    return queries
+
+
+def persist_batch(responses, mode="a", suffix=""):
+    # Write a batch of client responses with one archive write per target file.
+    # suffix can be a string or a function of the response (e.g. lambda r: r.date).
+    # Deduplicated queries (see execute()) share one frame; it is written once per target file,
+    # not once per query.
+    batches = OrderedDict()
+    seen    = set()
+    for response in responses:
+        if response is None or not isinstance(response.dataframe, pd.DataFrame) or response.dataframe.empty:
+            continue
+
+        filename = response.archive_filename(mode=mode, suffix=suffix(response) if callable(suffix) else suffix)
+        if (filename, id(response.dataframe)) in seen:
+            continue
+
+        seen.add((filename, id(response.dataframe)))
+        batches.setdefault(filename, []).append(response)
+
+    for filename, batch in batches.items():
+        df = pd.concat([response.dataframe for response in batch], axis=0, ignore_index=True)
+        batch[0].write_archive(df, filename, mode=mode)
+
+    return list(batches.keys())
@@ -0,0 +1,71 @@
+import pandas as pd
+
+
+def flatten(record, prefix="", out=None):
+    # {"quote": {"USD": {"price": 1}}} -> {"quote.USD.price": 1}; lists are kept as values,
+    # matching pd.json_normalize.
+    out = {} if out is None else out
+
+    for key, value in record.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict) and value:
+            flatten(value, name + ".", out)
+        else:
+            out[name] = value
+
+    return out
+
+
+class ColumnBuffer:
+    # Accumulates flat records straight into per-column lists. Columns are ordered by first
+    # appearance; records missing a column get None in that row.
+    def __init__(self):
+        self.columns = {}
+        self.rows    = 0
+
+    def __len__(self):
+        return self.rows
+
+    def append(self, record):
+        rows    = self.rows
+        columns = self.columns
+
+        for key, value in flatten(record).items():
+            col = columns.get(key)
+            if col is None:
+                col = columns[key] = [None] * rows
+            elif len(col) < rows:
+                col.extend([None] * (rows - len(col)))
+            col.append(value)
+
+        self.rows += 1
+
+    def extend(self, records):
+        for record in records:
+            self.append(record)
+
+    def to_frame(self):
+        for col in self.columns.values():
+            if len(col) < self.rows:
+                col.extend([None] * (self.rows - len(col)))
+
+        return pd.DataFrame(self.columns)
+
+
+def cmc_records(data):
+    # CoinMarketCap "data" comes as a dict keyed by id/symbol (v1) whose values are records or,
+    # for symbol lookups, lists of records; listings return a plain list of records.
+    values = data.values() if isinstance(data, dict) else data
+
+    for value in values:
+        if isinstance(value, list):
+            yield from value
+        else:
+            yield value
+
+
+def cmc_frame(data):
+    buffer = ColumnBuffer()
+    buffer.extend(cmc_records(data))
+
+    return buffer.to_frame()
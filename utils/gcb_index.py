@@ -0,0 +1,388 @@
+import sys
+sys.path.append('.')
+
+import os
+
+import numpy  as np
+import pandas as pd
+
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.rollup       import bucket_start
+from utils.ticker_index import split_tickers
+from utils.timezone     import to_utc_datetime
+
+
+SYMBOL_COL = "symbol"
+TIME_COL   = "quote.USD.last_updated"
+PRICE_COL  = "quote.USD.price"
+PAIRS_COL  = "num_market_pairs"
+
+# Grid step per bucket frequency (bucket labels follow utils/rollup.py).
+FREQS = {
+    "h": pd.Timedelta(hours=1),
+    "D": pd.Timedelta(days=1),
+    "W": pd.Timedelta(days=7),
+}
+
+WINDOW      = 24
+MIN_PERIODS = 6
+BASE_LEVEL  = 1000.0
+
+# The GCB score of a ticker is a weighted mix of its price momentum (rolling mean / std of
+# returns, squashed to [-1, 1] with tanh) and its rolling news sentiment (scaled to [-1, 1]).
+# The index weighs tickers by their number of market pairs and reports the score in [-100, 100].
+WEIGHTS = {
+    "momentum":  0.5,
+    "sentiment": 0.5,
+}
+
+# News labels are put on the ticker-stats sentiment_score scale.
+SENTIMENT_SCALE  = 1.5
+SENTIMENT_LABELS = {"Positive": SENTIMENT_SCALE, "Neutral": 0.0, "Negative": -SENTIMENT_SCALE}
+
+# Variances below this are treated as a flat price (no momentum either way).
+VAR_EPS = 1e-14
+
+OUTPUT_COLS = ["returns", "level", "momentum", "sentiment", "gcb"]
+
+
+def quote_matrices(quotes_df, freq="h", tickers=None):
+    # (grid, tickers, prices, pairs) from CoinMarketCap quote rows: one row per bucket of a
+    # regular grid, one column per ticker, holding the last snapshot in or before the bucket.
+    times = to_utc_datetime(quotes_df[TIME_COL]).astype("datetime64[ns, UTC]")
+    df    = pd.DataFrame({
+        "bucket": bucket_start(times, freq).array,
+        "time":   times.array,
+        "symbol": quotes_df[SYMBOL_COL].astype(str).values,
+        "price":  pd.to_numeric(quotes_df[PRICE_COL], errors="coerce").values,
+        "pairs":  pd.to_numeric(quotes_df[PAIRS_COL], errors="coerce").values if PAIRS_COL in quotes_df.columns else np.nan,
+    })
+    df = df[df["bucket"].notna()].sort_values("time", kind="stable")
+    df = df.drop_duplicates(subset=["bucket", "symbol"], keep="last")
+
+    tickers = sorted(df["symbol"].unique()) if tickers is None else list(tickers)
+    grid    = pd.date_range(df["bucket"].min(), df["bucket"].max(), freq=FREQS[freq])
+
+    prices = df.pivot(index="bucket", columns="symbol", values="price").reindex(index=grid, columns=tickers).ffill()
+    pairs  = df.pivot(index="bucket", columns="symbol", values="pairs").reindex(index=grid, columns=tickers).ffill()
+
+    return grid, tickers, prices.to_numpy(dtype=np.float64), pairs.to_numpy(dtype=np.float64)
+
+
+def sentiment_observations(stats_df=None, news_df=None):
+    # (time, ticker, score) rows from ticker-stats frames (daily sentiment_score) and/or news
+    # frames (one labelled article per ticker it mentions).
+    frames = []
+
+    if stats_df is not None and not stats_df.empty:
+        frames.append(pd.DataFrame({
+            "time":   to_utc_datetime(stats_df["date"]).astype("datetime64[ns, UTC]").array,
+            "ticker": stats_df["ticker"].astype(str).values,
+            "score":  pd.to_numeric(stats_df["sentiment_score"], errors="coerce").values,
+        }))
+
+    if news_df is not None and not news_df.empty:
+        news = news_df[news_df["tickers"].notna()]
+        news = pd.DataFrame({
+            "time":   to_utc_datetime(news["date"]).astype("datetime64[ns, UTC]").array,
+            "ticker": split_tickers(news["tickers"]).values,
+            "score":  news["sentiment"].astype(str).map(SENTIMENT_LABELS).values,
+        })
+        frames.append(news.explode("ticker"))
+
+    if not frames:
+        return pd.DataFrame(columns=["time", "ticker", "score"])
+
+    df = pd.concat(frames, ignore_index=True)
+    return df[df["time"].notna() & df["ticker"].notna() & df["score"].notna()]
+
+
+def sentiment_matrix(grid, tickers, freq="h", stats_df=None, news_df=None):
+    # Mean sentiment per bucket and ticker on the quote grid; NaN where nothing was published.
+    obs = sentiment_observations(stats_df, news_df)
+    obs = obs.assign(bucket=bucket_start(obs["time"].astype("datetime64[ns, UTC]"), freq))
+
+    means = obs.groupby(["bucket", "ticker"])["score"].mean().unstack("ticker")
+    if means.empty:
+        return np.full((len(grid), len(tickers)), np.nan)
+
+    return means.reindex(index=grid, columns=tickers).to_numpy(dtype=np.float64)
+
+
+def returns_matrix(prices):
+    returns     = np.full(prices.shape, np.nan)
+    returns[1:] = prices[1:] / prices[:-1] - 1
+
+    return returns
+
+
+def rolling_sums(values, window):
+    # (count, sum, sum of squares) of the finite values in each trailing window, along axis 0.
+    valid  = np.isfinite(values)
+    x      = np.where(valid, values, 0.0)
+    zero   = np.zeros((1,) + values.shape[1:])
+
+    cums   = [np.concatenate([zero, np.cumsum(a, axis=0)]) for a in (valid.astype(np.float64), x, x * x)]
+    ends   = np.arange(1, len(values) + 1)
+    starts = np.maximum(ends - window, 0)
+
+    return tuple(c[ends] - c[starts] for c in cums)
+
+
+def momentum(count, total, squares, min_periods=MIN_PERIODS):
+    # tanh(mean / std) of the window's returns; NaN until min_periods returns are in the window.
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = total / count
+        var  = squares / count - mean * mean
+        m    = np.where(var > VAR_EPS, np.tanh(mean / np.sqrt(np.where(var > VAR_EPS, var, 1.0))), 0.0)
+
+    return np.where(count >= min_periods, m, np.nan)
+
+
+def sentiment_mean(count, total):
+    # Window mean sentiment; neutral (0) when nothing was published in the window.
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(count > 0, total / np.where(count > 0, count, 1.0), 0.0)
+
+
+def partial_sums(returns, moment, sentiment, pairs):
+    # Pair-weighted sums over the last axis (tickers). They add up across ticker shards, which is
+    # what lets the full history be computed in parallel.
+    w     = np.where(np.isfinite(pairs) & (pairs > 0), pairs, 0.0)
+    rv    = np.isfinite(returns)
+    mv    = np.isfinite(moment)
+    score = WEIGHTS["momentum"] * moment + WEIGHTS["sentiment"] * np.clip(sentiment / SENTIMENT_SCALE, -1, 1)
+
+    return {
+        "w_returns":   (w * rv).sum(axis=-1),
+        "returns":     (w * np.where(rv, returns, 0.0)).sum(axis=-1),
+        "w_scores":    (w * mv).sum(axis=-1),
+        "momentum":    (w * np.where(mv, moment, 0.0)).sum(axis=-1),
+        "sentiment":   (w * np.where(mv, sentiment, 0.0)).sum(axis=-1),
+        "gcb":         (w * np.where(mv, score, 0.0)).sum(axis=-1),
+    }
+
+
+def summarize(sums):
+    # Index returns and weighted means from (summed) partials; NaN where no ticker qualified.
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = np.where(sums["w_returns"] > 0, sums["returns"] / sums["w_returns"], 0.0)
+        scores  = {key: np.where(sums["w_scores"] > 0, sums[key] / sums["w_scores"], np.nan) for key in ["momentum", "sentiment", "gcb"]}
+
+    scores["gcb"] = scores["gcb"] * 100
+    return returns, scores
+
+
+def shard_partials(prices, pairs, sentiment, window=WINDOW, min_periods=MIN_PERIODS):
+    # Partial sums of one block of ticker columns over the whole history.
+    returns = returns_matrix(prices)
+    moment  = momentum(*rolling_sums(returns, window), min_periods=min_periods)
+    count, total, _ = rolling_sums(sentiment, window)
+
+    return partial_sums(returns, moment, sentiment_mean(count, total), pairs)
+
+
+def _shard_partials(args):
+    return shard_partials(*args)
+
+
+def compute_index(prices, pairs, sentiment, window=WINDOW, min_periods=MIN_PERIODS, workers=1):
+    # Full-history index from time x ticker matrices. Tickers are independent up to the final
+    # weighted sums, so with workers > 1 the columns are split into shards computed in parallel.
+    workers = workers or os.cpu_count() or 1
+    shards  = np.array_split(np.arange(prices.shape[1]), max(min(workers, prices.shape[1]), 1))
+    args    = [(prices[:, cols], pairs[:, cols], sentiment[:, cols], window, min_periods) for cols in shards]
+
+    if workers == 1 or len(args) == 1:
+        parts = [_shard_partials(arg) for arg in args]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_shard_partials, args))
+
+    sums            = {key: sum(part[key] for part in parts) for key in parts[0]}
+    returns, scores = summarize(sums)
+
+    return {
+        "returns": returns,
+        "level":   BASE_LEVEL * np.cumprod(1 + returns),
+        **scores,
+    }
+
+
+def gcb_index(quotes_df, stats_df=None, news_df=None, freq="h", window=WINDOW, min_periods=MIN_PERIODS, workers=1):
+    # GCB index over the whole history of quote snapshots (e.g. latest-quotes_data_ALL.csv) with
+    # ticker-stats and/or news sentiment: one row per bucket.
+    grid, tickers, prices, pairs = quote_matrices(quotes_df, freq)
+    sentiment = sentiment_matrix(grid, tickers, freq, stats_df, news_df)
+
+    return pd.DataFrame(compute_index(prices, pairs, sentiment, window, min_periods, workers), index=grid)[OUTPUT_COLS]
+
+
+def bucket_of(time, freq):
+    time = pd.Timestamp(time)
+    time = time.tz_localize("UTC") if time.tzinfo is None else time.tz_convert("UTC")
+
+    return bucket_start(pd.Series([time]), freq).iloc[0]
+
+
+class GCBIndex:
+    # Live index over a fixed ticker universe. The last `window` returns and sentiment values of
+    # every ticker sit in a ring buffer next to their running sums, so appending a bucket costs
+    # O(tickers) whatever the length of the history:
+    #   - a later bucket evicts the oldest row of the window and adds the new one (skipped
+    #     buckets are filled in with unchanged prices, as on the batch grid);
+    #   - the current bucket again (a later snapshot of it) rewinds one step and redoes it with
+    #     the merged values.
+    def __init__(self, tickers, freq="h", window=WINDOW, min_periods=MIN_PERIODS):
+        n = len(tickers)
+
+        self.tickers     = list(tickers)
+        self.freq        = freq
+        self.window      = window
+        self.min_periods = min_periods
+
+        self.time       = None
+        self.prices     = np.full(n, np.nan)
+        self.base       = np.full(n, np.nan)
+        self.pairs      = np.full(n, np.nan)
+        self.level      = BASE_LEVEL
+        self.base_level = BASE_LEVEL
+        self.pos        = -1
+
+        self.ret_ring  = np.full((window, n), np.nan)
+        self.sent_ring = np.full((window, n), np.nan)
+        self.evicted   = (np.full(n, np.nan), np.full(n, np.nan))
+        self.ret_sums  = [np.zeros(n), np.zeros(n), np.zeros(n)]
+        self.sent_sums = [np.zeros(n), np.zeros(n)]
+        self.rows      = []
+
+    @classmethod
+    def from_history(cls, grid, tickers, prices, pairs, sentiment, freq="h", window=WINDOW, min_periods=MIN_PERIODS, workers=1):
+        # Seed a live index with the batch result over the history (see compute_index).
+        index = cls(tickers, freq, window, min_periods)
+        out   = compute_index(prices, pairs, sentiment, window, min_periods, workers)
+
+        index.rows = [dict(time=time, **{key: float(out[key][i]) for key in OUTPUT_COLS}) for i, time in enumerate(grid)]
+
+        # One row more than the window, so the last push knows what it evicted.
+        returns = returns_matrix(prices)
+        for i in range(max(len(grid) - window - 1, 0), len(grid)):
+            index.__push(returns[i], sentiment[i])
+
+        last             = len(grid) - 1
+        index.time       = grid[last]
+        index.prices     = prices[last].copy()
+        index.base       = prices[last - 1].copy() if last else np.full(len(tickers), np.nan)
+        index.pairs      = pairs[last].copy()
+        index.level      = out["level"][last]
+        index.base_level = out["level"][last - 1] if last else BASE_LEVEL
+
+        return index
+
+    @property
+    def frame(self):
+        return pd.DataFrame(self.rows, columns=["time"] + OUTPUT_COLS).set_index("time")
+
+    def append(self, time, prices, pairs, sentiment=None):
+        # Add one bucket's snapshot: prices/pairs/sentiment are arrays aligned with self.tickers,
+        # NaN where a ticker is missing (its last price and pair count carry over).
+        n         = len(self.tickers)
+        time      = bucket_of(time, self.freq)
+        prices    = np.asarray(prices, dtype=np.float64)
+        pairs     = np.asarray(pairs, dtype=np.float64)
+        sentiment = np.full(n, np.nan) if sentiment is None else np.asarray(sentiment, dtype=np.float64)
+
+        if self.time is not None and time < self.time:
+            raise ValueError(f"Bucket '{time}' is older than the last one appended ('{self.time}').")
+
+        if self.time is not None and time == self.time:
+            prices    = np.where(np.isfinite(prices), prices, self.prices)
+            pairs     = np.where(np.isfinite(pairs), pairs, self.pairs)
+            sentiment = np.where(np.isfinite(sentiment), sentiment, self.sent_ring[self.pos % self.window])
+            self.__rewind()
+
+        elif self.time is not None:
+            # Buckets without a snapshot: prices unchanged, nothing published.
+            step = FREQS[self.freq]
+            for _ in range(int((time - self.time) / step) - 1):
+                self.__step(self.time + step, np.full(n, np.nan), np.full(n, np.nan), np.full(n, np.nan))
+
+        return self.__step(time, prices, pairs, sentiment)
+
+    def append_quotes(self, quotes_df, stats_df=None, news_df=None):
+        # Append the buckets covered by a quote frame (e.g. one latest-quotes response).
+        grid, _, prices, pairs = quote_matrices(quotes_df, self.freq, self.tickers)
+        sentiment = sentiment_matrix(grid, self.tickers, self.freq, stats_df, news_df)
+
+        for i, time in enumerate(grid):
+            self.append(time, prices[i], pairs[i], sentiment[i])
+
+        return self.frame.iloc[-len(grid):]
+
+    def __step(self, time, prices, pairs, sentiment):
+        self.base       = self.prices
+        self.base_level = self.level
+        self.prices     = np.where(np.isfinite(prices), prices, self.prices)
+        self.pairs      = np.where(np.isfinite(pairs), pairs, self.pairs)
+        self.time       = time
+
+        returns = self.prices / self.base - 1
+        self.__push(returns, sentiment)
+
+        moment      = momentum(*self.ret_sums, min_periods=self.min_periods)
+        ret, scores = summarize(partial_sums(returns, moment, sentiment_mean(*self.sent_sums), self.pairs))
+        self.level  = self.base_level * (1 + ret)
+
+        row = {"time": time, "returns": float(ret), "level": float(self.level), **{key: float(val) for key, val in scores.items()}}
+        self.rows.append(row)
+
+        return row
+
+    def __push(self, returns, sentiment):
+        # Evict the oldest row of the window, then add the new one in its slot.
+        self.pos += 1
+        slot      = self.pos % self.window
+
+        self.evicted = (self.ret_ring[slot].copy(), self.sent_ring[slot].copy())
+        self.__add(self.ret_ring[slot], self.sent_ring[slot], -1)
+
+        self.ret_ring[slot]  = returns
+        self.sent_ring[slot] = sentiment
+        self.__add(returns, sentiment, 1)
+
+    def __rewind(self):
+        # Undo the last step: its row leaves the window and the row it evicted comes back.
+        slot = self.pos % self.window
+
+        self.__add(self.ret_ring[slot], self.sent_ring[slot], -1)
+        self.ret_ring[slot], self.sent_ring[slot] = self.evicted
+        self.__add(self.ret_ring[slot], self.sent_ring[slot], 1)
+
+        self.pos   -= 1
+        self.prices = self.base
+        self.level  = self.base_level
+        self.rows.pop()
+
+    def __add(self, returns, sentiment, sign):
+        rv = np.isfinite(returns)
+        sv = np.isfinite(sentiment)
+        r  = np.where(rv, returns, 0.0)
+        s  = np.where(sv, sentiment, 0.0)
+
+        self.ret_sums[0]  += sign * rv
+        self.ret_sums[1]  += sign * r
+        self.ret_sums[2]  += sign * r * r
+        self.sent_sums[0] += sign * sv
+        self.sent_sums[1] += sign * s
+
+
+if __name__ == "__main__":
+    # Usage: python utils/gcb_index.py [freq]
+    #   GCB index of the quote archive, with the ticker-stats and news archives as sentiment.
+    freq      = sys.argv[1] if len(sys.argv) > 1 else "h"
+    quotes_df = pd.read_csv("./data/latest-quotes_data_ALL.csv")
+    stats_df  = pd.read_csv("./data/ticker-stats_last7days.csv")
+    news_df   = pd.read_csv("./data/ticker-news_data_ALL.csv")
+
+    print(gcb_index(quotes_df, stats_df, news_df, freq=freq).dropna().round(4).to_string())
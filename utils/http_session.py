@@ -0,0 +1,98 @@
+import random
+import threading
+
+from requests          import Session
+from requests.adapters import HTTPAdapter
+from urllib3.util      import Retry
+
+
+# Connect timeout slightly above a TCP retransmit window; read timeout sized for large listings.
+CONNECT_TIMEOUT = 3.05
+READ_TIMEOUT    = 30
+TIMEOUT         = (CONNECT_TIMEOUT, READ_TIMEOUT)
+
+# Retry policy for transient failures: connection errors and 429/5xx responses.
+RETRY_TOTAL       = 5
+RETRY_BACKOFF     = 0.5                   # 0.5s, 1s, 2s, 4s, ... before jitter.
+RETRY_BACKOFF_MAX = 30
+RETRY_JITTER      = 0.5                   # Up to +50% random jitter on every backoff.
+RETRY_STATUSES    = [429, 500, 502, 503, 504]
+
+# Keep-alive connection pool size per host. Anything else uses DEFAULT_POOL_SIZE.
+DEFAULT_POOL_SIZE = 4
+POOL_SIZES = {
+    "https://pro-api.coinmarketcap.com":     4,
+    "https://sandbox-api.coinmarketcap.com": 4,
+    "https://cryptonews-api.com":            8,
+}
+
+_session      = None
+_session_lock = threading.Lock()
+
+
+class JitterRetry(Retry):
+    # Exponential backoff with random jitter so concurrent workers do not retry in lockstep.
+    # A server supplied Retry-After header still takes precedence (respect_retry_after_header).
+    def get_backoff_time(self):
+        backoff = super().get_backoff_time()
+        return min(RETRY_BACKOFF_MAX, backoff * (1 + random.uniform(0, RETRY_JITTER)))
+
+
+def retry_policy():
+    return JitterRetry(
+        total=RETRY_TOTAL,
+        backoff_factor=RETRY_BACKOFF,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=["GET"],
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+
+
+def new_session(pool_sizes=POOL_SIZES, default_pool_size=DEFAULT_POOL_SIZE):
+    session = Session()
+
+    # Fallback adapters, then one adapter per known host (requests picks the longest prefix).
+    for prefix in ["http://", "https://"]:
+        session.mount(prefix, HTTPAdapter(pool_connections=default_pool_size, pool_maxsize=default_pool_size,
+                                          max_retries=retry_policy()))
+
+    for prefix, size in pool_sizes.items():
+        session.mount(prefix, HTTPAdapter(pool_connections=1, pool_maxsize=size, max_retries=retry_policy()))
+
+    return session
+
+
+def get_session():
+    # Process wide session shared by every client so connections (and TLS handshakes) are reused.
+    global _session
+
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = new_session()
+
+    return _session
+
+
+def set_session(session):
+    # Replace the shared session, e.g. with new_session(default_pool_size=...) for a load test.
+    global _session
+
+    with _session_lock:
+        if _session is not None and _session is not session:
+            _session.close()
+        _session = session
+
+
+def reset_session():
+    global _session
+
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+
+
+def get(url, params=None, headers=None, timeout=TIMEOUT, **kwargs):
+    return get_session().get(url, params=params, headers=headers, timeout=timeout, **kwargs)
@@ -0,0 +1,254 @@
+import os
+import json
+import math
+import time
+import threading
+
+import pandas as pd
+
+from datetime import datetime, timezone
+
+
+# Per-call instrumentation of the API clients. A call is one request(), or a json_to_dataframe()
+# or to_csv() made outside of one; its record splits the wall time into phases and carries the
+# payload bytes, row count and the CMC credit count:
+#   {"ts", "source", "endpoint", "op", "wall_s", "network_s", "decode_s", "frame_s",
+#    "persist_s", "bytes", "rows", "credit_count", "api_elapsed_ms", "status", "cache", "error"}
+# Phases that did not happen are left out. Records go to every configured sink.
+
+METRICS_DIR = os.path.join(os.getcwd(), "data", ".metrics")
+JSONL_FILE  = os.path.join(METRICS_DIR, "calls.jsonl")
+
+# Sinks, overridable with the GCB_INSTRUMENT environment variable as a comma separated list
+# ("jsonl", "histogram"), or "off". The JSONL file can be moved with GCB_INSTRUMENT_FILE.
+SINK_OPTIONS  = ["jsonl", "histogram"]
+DEFAULT_SINKS = "off"
+
+# Histogram buckets grow by this factor, so quantiles are within ~10% of the true value.
+GROWTH = 2 ** 0.25
+
+# Record fields kept as histograms.
+HISTOGRAM_FIELDS = ["wall_s", "network_s", "decode_s", "frame_s", "persist_s", "read_s", "stream_s",
+                    "bytes", "rows", "credit_count", "api_elapsed_ms"]
+
+_instrument      = None
+_instrument_lock = threading.Lock()
+
+
+class NullCall:
+    # Stand-in for a Call when instrumentation is off: every method is a no-op.
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def phase(self, name):
+        return self
+
+    def set(self, **fields):
+        pass
+
+
+NULL_CALL = NullCall()
+
+
+class Phase:
+    def __init__(self, record, key):
+        self.record = record
+        self.key    = key
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self.record[self.key] = self.record.get(self.key, 0.0) + time.perf_counter() - self.start
+        return False
+
+
+class Call:
+    # One instrumented call. Calls opened while another is running on the same thread (e.g.
+    # json_to_dataframe() inside request()) add their phases to the outer record.
+    def __init__(self, instrument, source, endpoint, op):
+        self.instrument = instrument
+        self.record     = {"source": source, "endpoint": endpoint, "op": op}
+        self.depth      = 0
+
+    def __enter__(self):
+        if self.depth == 0:
+            self.instrument.local.call = self
+            self.start = time.perf_counter()
+        self.depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.depth -= 1
+        if self.depth == 0:
+            self.instrument.local.call = None
+            self.record["wall_s"] = time.perf_counter() - self.start
+            self.record["ts"]     = datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+            if exc is not None:
+                self.record["error"] = repr(exc)
+            self.instrument.emit(self.record)
+        return False
+
+    def phase(self, name):
+        return Phase(self.record, name + "_s")
+
+    def set(self, **fields):
+        self.record.update({k: v for k, v in fields.items() if v is not None})
+
+
+class JsonlSink:
+    # One JSON record per line, appended as each call ends.
+    def __init__(self, path=JSONL_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def emit(self, record):
+        line = json.dumps(record, default=str) + "\n"
+        with self.lock, open(self.path, "a") as f:
+            f.write(line)
+
+
+class Histogram:
+    # Log-bucketed distribution of non-negative values with exact count, sum, min and max.
+    def __init__(self):
+        self.count   = 0
+        self.sum     = 0.0
+        self.min     = math.inf
+        self.max     = -math.inf
+        self.buckets = {}
+
+    def add(self, value):
+        bucket = math.floor(math.log(value, GROWTH)) if value > 0 else None
+
+        self.count += 1
+        self.sum   += value
+        self.min    = min(self.min, value)
+        self.max    = max(self.max, value)
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+
+    def quantile(self, q):
+        # Upper edge of the bucket holding the q-th value, clipped to the observed range.
+        rank = q * self.count
+        seen = 0
+        for bucket in sorted(self.buckets, key=lambda b: -math.inf if b is None else b):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                edge = 0.0 if bucket is None else GROWTH ** (bucket + 1)
+                return min(max(edge, self.min), self.max)
+
+        return self.max
+
+
+class HistogramSink:
+    # In-process registry: one histogram per (source, endpoint, op, field).
+    def __init__(self, fields=HISTOGRAM_FIELDS):
+        self.fields     = fields
+        self.histograms = {}
+        self.lock       = threading.Lock()
+
+    def emit(self, record):
+        key = (record["source"], record["endpoint"], record["op"])
+        with self.lock:
+            for field in self.fields:
+                value = record.get(field)
+                if isinstance(value, (int, float)) and value >= 0:
+                    self.histograms.setdefault(key + (field,), Histogram()).add(value)
+
+    def summary(self):
+        # One row per histogram: count, mean, p50, p95, max and total.
+        with self.lock:
+            rows = [
+                {
+                    "source": source, "endpoint": endpoint, "op": op, "field": field,
+                    "count":  h.count,
+                    "mean":   h.sum / h.count,
+                    "p50":    h.quantile(0.50),
+                    "p95":    h.quantile(0.95),
+                    "max":    h.max,
+                    "total":  h.sum,
+                }
+                for (source, endpoint, op, field), h in self.histograms.items()
+            ]
+
+        return pd.DataFrame(rows, columns=["source", "endpoint", "op", "field", "count", "mean", "p50", "p95", "max", "total"])
+
+    def clear(self):
+        with self.lock:
+            self.histograms = {}
+
+
+class Instrument:
+    # Hands out calls and fans their records out to the sinks. With no sinks, call() returns the
+    # shared no-op NULL_CALL, so instrumented code costs one method call and a truth test.
+    def __init__(self, sinks=()):
+        self.sinks = list(sinks)
+        self.local = threading.local()
+
+    @property
+    def enabled(self):
+        return bool(self.sinks)
+
+    def call(self, source, endpoint, op):
+        if not self.sinks:
+            return NULL_CALL
+
+        return getattr(self.local, "call", None) or Call(self, source, endpoint, op)
+
+    def emit(self, record):
+        for sink in self.sinks:
+            sink.emit(record)
+
+    def sink(self, kind):
+        # The first configured sink of a type, e.g. instrument.sink(HistogramSink).summary().
+        return next((sink for sink in self.sinks if isinstance(sink, kind)), None)
+
+
+def from_env():
+    sinks = [s.strip() for s in os.getenv("GCB_INSTRUMENT", DEFAULT_SINKS).lower().split(",") if s.strip()]
+    sinks = [] if sinks == ["off"] else sinks
+
+    for sink in sinks:
+        if sink not in SINK_OPTIONS:
+            raise ValueError(f"Variable 'GCB_INSTRUMENT' must be one of the values in {SINK_OPTIONS + ['off']}." +
+                             f"'{sink}' is not valid.")
+
+    switch = {
+        "jsonl":     lambda: JsonlSink(os.getenv("GCB_INSTRUMENT_FILE", JSONL_FILE)),
+        "histogram": lambda: HistogramSink(),
+    }
+
+    return Instrument([switch[sink]() for sink in sinks])
+
+
+def get_instrument():
+    # Process wide instrument shared by every client; sinks come from GCB_INSTRUMENT.
+    global _instrument
+
+    if _instrument is None:
+        with _instrument_lock:
+            if _instrument is None:
+                _instrument = from_env()
+
+    return _instrument
+
+
+def set_instrument(instrument):
+    global _instrument
+
+    with _instrument_lock:
+        _instrument = instrument
+
+
+def call(source, endpoint, op):
+    return get_instrument().call(source, endpoint, op)
+
+
+def read_jsonl(path=JSONL_FILE):
+    # The records of a JSONL sink as a DataFrame.
+    return pd.read_json(path, lines=True) if os.path.isfile(path) else pd.DataFrame()
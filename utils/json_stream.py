@@ -0,0 +1,201 @@
+import sys
+sys.path.append('.')
+
+import os
+import json
+
+from contextlib import nullcontext
+
+from requests.exceptions import ConnectionError, HTTPError, Timeout, TooManyRedirects
+from urllib3.exceptions  import HTTPError as StreamError
+
+from utils               import http_session
+from utils.frame_builder import cmc_records
+
+# Optional dependency: only the streaming parse mode needs ijson.
+try:
+    import ijson
+    from ijson.common import ObjectBuilder
+except ImportError:
+    ijson = None
+
+
+CHUNK_SIZE = 64 * 1024
+
+# Streaming trades time for memory. Measured on latest-listings payloads (benchmarks/suite.py,
+# yajl2_c backend, one core), against json.loads + ColumnBuffer: at 5,000 coins (4.7 MB of JSON)
+# it takes 0.21 vs 0.18 s with a 40% lower peak (9.8 vs 15.9 MB, most of it the frame itself);
+# at 500 coins 1.4x the time for a 15% lower peak; at 50 coins it is slower and peaks higher
+# (the parser's own buffers). Bodies smaller than this many bytes as read (on the wire, or the
+# cache entry on disk) are parsed whole instead.
+STREAM_MIN_BYTES = 512 * 1024
+
+
+def require():
+    if ijson is None:
+        raise ImportError("The streaming parse mode requires the 'ijson' package (pip install ijson).")
+
+
+class TeeReader:
+    # File-like wrapper that copies every chunk read from raw into sink (e.g. a cache entry).
+    def __init__(self, raw, sink=None):
+        self.raw  = raw
+        self.sink = sink
+
+    def read(self, size=-1):
+        chunk = self.raw.read(size)
+        if self.sink and chunk:
+            self.sink.write(chunk)
+
+        return chunk
+
+    def drain(self):
+        # Read (and copy) whatever is left after the parser stopped, e.g. trailing whitespace.
+        while self.read(CHUNK_SIZE):
+            pass
+
+
+def read_records(fp, buffer, records_key="data", header=None):
+    # Parse the records under the top-level records_key from a binary stream straight into the
+    # columns of a ColumnBuffer (utils/frame_builder.py). Records are the objects in a "data"
+    # list, the values of a "data" dict, or the objects in a list held by a "data" dict (CMC
+    # symbol lookups). Each scalar goes into the column named by its path within the record, as
+    # flatten() names them; only lists (e.g. "tags") and the other top-level keys ("status",
+    # "total_pages", collected into header) are built as objects.
+    header  = {} if header is None else header
+    columns = buffer.columns
+    nested  = records_key + "."
+    cut     = None                  # In a record: length of its path prefix, plus the dot.
+    depth   = 0
+    empty   = None                  # Path of a map opened by the previous event.
+    builder = None
+    target  = None
+    nesting = 0
+
+    for prefix, event, value in ijson.parse(fp, use_float=True):
+        if builder is not None:
+            builder.event(event, value)
+
+            if event in ("start_map", "start_array"):
+                nesting += 1
+            elif event in ("end_map", "end_array"):
+                nesting -= 1
+
+            if nesting:
+                continue
+
+            prefix, value, builder = target, builder.value, None
+            if cut is None:
+                header[prefix] = value
+                continue
+
+        elif cut is None:
+            if event == "start_map" and prefix.startswith(nested):
+                cut, depth = len(prefix) + 1, 1
+            elif prefix and "." not in prefix and prefix != records_key:
+                if event in ("start_map", "start_array"):
+                    builder, target, nesting = ObjectBuilder(), prefix, 1
+                    builder.event(event, value)
+                else:
+                    header[prefix] = value
+            continue
+
+        elif event == "map_key":
+            continue
+
+        elif event == "start_map":
+            depth += 1
+            empty  = prefix
+            continue
+
+        elif event == "end_map":
+            depth -= 1
+            if depth == 0:
+                buffer.rows += 1
+                cut = empty = None
+                continue
+            if empty is None:
+                continue
+
+            # An empty object is kept as a value, as flatten() keeps it.
+            prefix, value = empty, {}
+
+        elif event == "start_array":
+            builder, target, nesting, empty = ObjectBuilder(), prefix, 1, None
+            builder.event(event, value)
+            continue
+
+        empty = None
+        rows  = buffer.rows
+        col   = columns.get(prefix[cut:])
+        if col is None:
+            col = columns[prefix[cut:]] = [None] * rows
+        elif len(col) < rows:
+            col.extend([None] * (rows - len(col)))
+        col.append(value)
+
+    return header
+
+
+def load_records(fp, buffer, records_key="data", header=None):
+    # Whole-body counterpart of read_records() for small payloads: one json.loads, then the
+    # records are appended to the buffer.
+    header  = {} if header is None else header
+    payload = json.loads(fp.read())
+
+    header.update({key: value for key, value in payload.items() if key != records_key})
+    buffer.extend(cmc_records(payload.get(records_key) or []))
+
+    return header
+
+
+def consume(fp, size, buffer, records_key="data", header=None):
+    # Stream the body only when it is at least STREAM_MIN_BYTES (size unknown: streamed).
+    if size is not None and size < STREAM_MIN_BYTES:
+        return load_records(fp, buffer, records_key, header)
+
+    return read_records(fp, buffer, records_key, header)
+
+
+def fetch_stream(url, params, endpoint_tag, buffer, headers=None, cache=None, records_key="data"):
+    # Parse a JSON response into a ColumnBuffer without building the full object tree.
+    # A fresh cache entry is parsed straight from disk; otherwise the response body is parsed as
+    # it arrives and teed into a new cache entry, which is only kept if the parse completes.
+    # Returns the header dict, or None when no payload could be read.
+    header = {}
+    path   = cache.lookup(endpoint_tag, params, url=url) if cache else None
+
+    if path:
+        try:
+            with open(path, "rb") as f:
+                consume(f, os.fstat(f.fileno()).st_size, buffer, records_key, header)
+            return header
+        except FileNotFoundError:
+            # Evicted between lookup and open.
+            header = {}
+        except (ijson.JSONError, ValueError) as e:
+            print(e)
+            return None
+
+    if cache and cache.offline:
+        return None
+
+    try:
+        response = http_session.get(url, params=params, headers=headers, stream=True)
+        response.raise_for_status()
+
+        # Let urllib3 undo gzip/deflate so the parser (and the cache) see the JSON text.
+        response.raw.decode_content = True
+
+        # Content-Length counts the bytes on the wire (gzipped, when the server compressed them).
+        size = response.headers.get("Content-Length")
+
+        with response, (cache.writer(endpoint_tag, params, url=url) if cache else nullcontext()) as sink:
+            reader = TeeReader(response.raw, sink)
+            consume(reader, int(size) if size else None, buffer, records_key, header)
+            reader.drain()
+    except (ConnectionError, Timeout, TooManyRedirects, HTTPError, StreamError, ijson.JSONError, ValueError) as e:
+        print(e)
+        return None
+
+    return header
@@ -0,0 +1,159 @@
+import sys
+sys.path.append('.')
+
+import os
+import re
+
+import pandas as pd
+
+from collections        import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.csv_archive   import read_header, write_csv_atomic
+from utils.search_string import LOCATIONS, REGIONS
+
+
+TEXT_COLS = ["title", "text"]
+KEEP_COLS = ["news_url", "date", "tickers"]
+CHUNKSIZE = 20_000
+SEPARATOR = ","
+
+
+def trie_pattern(words):
+    # One regex for all words, shaped as a character trie: "New (?:Delhi|York(?: City)?)" instead
+    # of "New York|New York City|New Delhi". The regex engine walks the text once and never
+    # retries the alternatives from scratch; greedy optional suffixes make the longest name win.
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def pattern(node):
+        alts = [re.escape(char) + pattern(child) for char, child in sorted(node.items()) if char]
+        if not alts:
+            return ""
+
+        body = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return pattern(trie)
+
+
+class LocationTagger:
+    # Tags text with the place names (whole words, case sensitive) and regions it mentions.
+    def __init__(self, locations=LOCATIONS, regions=REGIONS):
+        self.regions = regions
+        self.order   = {region: i for i, region in enumerate(dict.fromkeys(regions.values()))}
+        self.pattern = re.compile(r"\b" + trie_pattern(locations) + r"\b")
+
+    def tag(self, text):
+        # (locations, regions) mentioned in text, each joined with SEPARATOR in order of appearance
+        # and region order respectively; empty strings when nothing matches.
+        found = list(dict.fromkeys(self.pattern.findall(text)))
+        if not found:
+            return "", ""
+
+        regions = sorted({self.regions[name] for name in found}, key=self.order.get)
+        return SEPARATOR.join(found), SEPARATOR.join(regions)
+
+    def tag_texts(self, texts):
+        return [self.tag(text) for text in texts]
+
+    def tag_frame(self, df, text_cols=TEXT_COLS):
+        # df with "locations" and "regions" columns added, scanning the text columns together.
+        texts = article_texts(df, text_cols)
+        tags  = self.tag_texts(texts)
+
+        locations, regions = zip(*tags) if tags else ([], [])
+        return df.assign(locations=list(locations), regions=list(regions))
+
+
+def article_texts(df, text_cols=TEXT_COLS):
+    cols = [df[col].fillna("").astype(str) for col in text_cols if col in df.columns]
+    if not cols:
+        return [""] * len(df)
+
+    texts = cols[0]
+    for col in cols[1:]:
+        texts = texts + "\n" + col
+
+    return texts.tolist()
+
+
+# Per-process tagger for the pool workers; compiled once per worker instead of once per chunk.
+_tagger = None
+
+
+def _init_worker(locations, regions):
+    global _tagger
+    _tagger = LocationTagger(locations, regions)
+
+
+def _tag_texts(texts):
+    return _tagger.tag_texts(texts)
+
+
+def regions_filename(archive):
+    # ticker-news_data_ALL.csv -> ticker-news_regions_ALL.csv
+    dirname, basename = os.path.split(archive)
+    name, ext         = os.path.splitext(basename)
+    name              = name.replace("_data", "_regions", 1) if "_data" in name else name + "_regions"
+
+    return os.path.join(dirname, name + ext)
+
+
+def tag_archive(archive, out=None, workers=None, chunksize=CHUNKSIZE, locations=LOCATIONS, regions=REGIONS):
+    # Tag every article of a news CSV archive and write (news_url, date, tickers, locations,
+    # regions) next to it. Chunks are read in the main process and tagged by a process pool; at
+    # most two chunks per worker are in flight, so memory stays bounded on any archive size.
+    out     = out or regions_filename(archive)
+    workers = workers or os.cpu_count() or 1
+    header  = read_header(archive)
+    usecols = [col for col in KEEP_COLS + TEXT_COLS if col in header]
+    chunks  = pd.read_csv(archive, usecols=usecols, chunksize=chunksize)
+
+    frames = []
+    def collect(chunk, tags):
+        locations, regions = zip(*tags) if tags else ([], [])
+        frames.append(chunk[[col for col in KEEP_COLS if col in chunk.columns]].assign(
+            locations=list(locations), regions=list(regions),
+        ))
+
+    if workers == 1:
+        tagger = LocationTagger(locations, regions)
+        for chunk in chunks:
+            collect(chunk, tagger.tag_texts(article_texts(chunk)))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(locations, regions)) as pool:
+            pending = deque()
+            for chunk in chunks:
+                pending.append((chunk, pool.submit(_tag_texts, article_texts(chunk))))
+
+                if len(pending) >= 2 * workers:
+                    chunk, future = pending.popleft()
+                    collect(chunk, future.result())
+
+            while pending:
+                chunk, future = pending.popleft()
+                collect(chunk, future.result())
+
+    df = pd.concat(frames, axis=0, ignore_index=True) if frames else pd.DataFrame(columns=KEEP_COLS + ["locations", "regions"])
+    write_csv_atomic(df, out)
+
+    return df
+
+
+if __name__ == "__main__":
+    # Usage: python utils/location_tagger.py [news archive csv files...]
+    #   Backfills region tags for every data/ticker-news_data*.csv archive.
+    data_dir = os.path.join(os.getcwd(), "data")
+    files    = sys.argv[1:] or sorted(
+        os.path.join(data_dir, f) for f in os.listdir(data_dir) if f.startswith("ticker-news_data")
+    )
+
+    for filename in files:
+        df     = tag_archive(filename)
+        tagged = (df["regions"].fillna("") != "").sum()
+        print(f"Tagged : {filename} -> {regions_filename(filename)} ({tagged} of {len(df)} articles mention a location)")
@@ -6,32 +6,80 @@ import pandas as pd
 from datetime import datetime
 from market_response.crypto import CoinMarketCapResponse
 from media_response.news    import CryptoNewsResponse
+from utils.profiling        import profiled
+from utils.ticker_index     import split_tickers
+from utils.timezone         import to_utc_datetime
 
 
-STATS_TIME_COL = "quote.USD.last_updated"
-NEWS_TIME_COL  = "date"
+STATS_TIME_COL   = "quote.USD.last_updated"
+STATS_TICKER_COL = "symbol"
+NEWS_TIME_COL    = "date"
+NEWS_TICKERS_COL = "tickers"
+TICKER_COL       = "ticker"
 
+# How old the preceding quote snapshot may be for an article to be matched to it.
+TOLERANCE = pd.Timedelta(hours=1)
 
-def merge_df(stats_df, news_df):
-    stats_df = stats_df.drop_duplicates()
-    news_df  = news_df.drop_duplicates()
-    news_df  = news_df[news_df["tickers"].notna()]
-    
-    breakpoint()
-    stats_df[STATS_TIME_COL] = pd.to_datetime(stats_df[STATS_TIME_COL], infer_datetime_format=True, utc=True).round("H")
-    news_df[NEWS_TIME_COL]   = pd.to_datetime(news_df[ NEWS_TIME_COL],  infer_datetime_format=True, utc=True).round("H")
 
-    stats_df.set_index(STATS_TIME_COL, inplace=True)
-    news_df.set_index( NEWS_TIME_COL,  inplace=True)
+def explode_tickers(news_df):
+    # One row per (article, ticker); articles without tickers are dropped.
+    news_df = news_df[news_df[NEWS_TICKERS_COL].notna()]
+    news_df = news_df.assign(**{TICKER_COL: split_tickers(news_df[NEWS_TICKERS_COL]).values})
+    news_df = news_df.explode(TICKER_COL)
 
-    stats_df.index.name = "datetime"
-    news_df.index.name  = "datetime"
+    return news_df[news_df[TICKER_COL].notna()]
 
-    merged_df = pd.concat([stats_df, news_df])
 
-    breakpoint()
+def as_utc(values):
+    # Both sides of the as-of key need the same datetime resolution.
+    return to_utc_datetime(values).astype("datetime64[ns, UTC]")
 
-    print("hi")
+
+def align_news_to_quotes(news_df, quotes_df, tolerance=TOLERANCE, quote_cols=None,
+                         news_time_col=NEWS_TIME_COL, quotes_time_col=STATS_TIME_COL, quotes_ticker_col=STATS_TICKER_COL):
+    # Attach to every (article, ticker) the nearest quote snapshot of that ticker taken at or
+    # before the article's publication time, at most `tolerance` earlier. Articles with no such
+    # snapshot keep NaN quote columns. Both sides are sorted once and matched with a single
+    # as-of sweep per ticker (pd.merge_asof), so the cost is O((n + m) log(n + m)).
+    news   = explode_tickers(news_df)
+    quotes = quotes_df if quote_cols is None else quotes_df[[quotes_ticker_col, quotes_time_col, *quote_cols]]
+
+    news   = news.assign(**{
+        TICKER_COL:      news[TICKER_COL].astype(str),
+        news_time_col:   as_utc(news[news_time_col]),
+    })
+    quotes = quotes.assign(**{
+        TICKER_COL:      quotes[quotes_ticker_col].astype(str),
+        quotes_time_col: as_utc(quotes[quotes_time_col]),
+    })
+
+    news   = news[news[news_time_col].notna()].sort_values(news_time_col, kind="stable")
+    quotes = quotes[quotes[quotes_time_col].notna()]
+
+    # The same snapshot archived twice would only duplicate matches.
+    quotes = quotes.drop_duplicates(subset=[TICKER_COL, quotes_time_col], keep="last")
+    quotes = quotes.sort_values(quotes_time_col, kind="stable")
+
+    if quotes_ticker_col != TICKER_COL:
+        quotes = quotes.drop(columns=[quotes_ticker_col])
+
+    merged = pd.merge_asof(
+        news.reset_index(drop=True),
+        quotes.reset_index(drop=True),
+        left_on=news_time_col,
+        right_on=quotes_time_col,
+        by=TICKER_COL,
+        tolerance=tolerance,
+        direction="backward",
+        suffixes=("", "_quote"),
+    )
+
+    return merged
+
+
+@profiled("merge_df")
+def merge_df(stats_df, news_df, tolerance=TOLERANCE):
+    return align_news_to_quotes(news_df, stats_df, tolerance=tolerance)
 
 
 if __name__ == "__main__":
@@ -62,9 +110,11 @@ if __name__ == "__main__":
     news_endpoint = "ticker-news"   # Define the type of data to collect (ARCHIVE_FILES).
     run_type      = "DEBUG"         # Uses ../data/debug_<endpoint>_data.csv (we want this for testing).
 
-    news_df = pd.DataFrame()
-    for ticker in tickers:
-        news_data = CryptoNewsResponse(ticker, news_endpoint, items=items, rank_days=rank_days, run_type=run_type)
-        news_df   = pd.concat([news_df, news_data.dataframe])
+    news_data = CryptoNewsResponse(tickers, news_endpoint, items=items, rank_days=rank_days, run_type=run_type)
+    news_df   = news_data.dataframe
+
+    merged_df = merge_df(crypto_df, news_df)
+    matched   = merged_df[STATS_TIME_COL].notna()
 
-    merge_df(crypto_df, news_df)
+    print(f"Articles x tickers : {len(merged_df)} ({matched.sum()} matched to a quote within {TOLERANCE})")
+    print(merged_df.loc[matched, [NEWS_TIME_COL, TICKER_COL, STATS_TIME_COL, "quote.USD.percent_change_24h"]].head(10))
@@ -0,0 +1,269 @@
+import sys
+sys.path.append('.')
+
+import re
+import gzip
+import json
+import time
+import random
+import argparse
+import threading
+
+from collections  import OrderedDict
+from http.server  import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from utils.synthetic import cmc_coin, cmc_payload, news_payload, stats_payload, top_mention_payload
+
+
+# Local stand-in for the CoinMarketCap and Crypto News APIs. Point a client at it with
+# domain=server.url (run_type "API"/"SANDBOX" or any Crypto News run type); responses are
+# synthetic payloads from utils/synthetic.py with the real field names and nesting.
+
+HOST = "127.0.0.1"
+PORT = 8000
+
+# Seconds added to every response: LATENCY plus up to JITTER at random.
+LATENCY = 0.0
+JITTER  = 0.0
+
+# Share of requests answered with an error instead of data, and the statuses drawn from. 429 and
+# 503 carry a Retry-After header of RETRY_AFTER seconds, like the real rate limiters.
+ERROR_RATE     = 0.0
+ERROR_STATUSES = [429, 500, 502, 503]
+RETRY_AFTER    = 1
+
+# Pages served for ticker-news before the "data" list comes back empty.
+TOTAL_PAGES = 10
+
+# Rendered bodies kept per (route, params, encoding), so serving a large payload costs the server
+# no JSON encoding or compression after the first request.
+BODY_CACHE_SIZE = 64
+
+# Bodies at least this large are gzipped when the client accepts it.
+GZIP_MIN_BYTES = 1024
+
+ERROR_MESSAGES = {
+    429: "You've exceeded your API Key's HTTP request rate limit. Rate limits reset every minute.",
+    500: "An internal server error occurred.",
+    502: "Bad gateway.",
+    503: "The service is temporarily unavailable.",
+}
+
+
+def symbols(n, seed=0):
+    # The tracked coins first, then generated tickers.
+    rng = random.Random(seed)
+    return [cmc_coin(i, rng)[2] for i in range(n)]
+
+
+def split(value):
+    return [v for v in (value or "").split(",") if v]
+
+
+def quotes_latest(params, size, total_pages, seed):
+    coins = size or len(split(params.get("id"))) or 100
+    return cmc_payload(coins, "latest-quotes", currency=params.get("convert", "USD"), seed=seed)
+
+
+def listings_latest(params, size, total_pages, seed):
+    coins = size or int(params.get("limit", 100))
+    return cmc_payload(coins, "latest-listings", currency=params.get("convert", "USD"), seed=seed)
+
+
+def ticker_news(params, size, total_pages, seed):
+    items   = size or int(params.get("items", 50))
+    page    = int(params.get("page", 1))
+    tickers = split(params.get("tickers")) or symbols(6)
+
+    if page > total_pages:
+        return {"data": [], "total_pages": total_pages}
+
+    return news_payload(items, tickers, page=page, total_pages=total_pages, seed=seed)
+
+
+def ticker_stats(params, size, total_pages, seed):
+    days    = re.fullmatch("last([0-9]+)days", params.get("date", ""))
+    tickers = symbols(size, seed) if size else split(params.get("tickers")) or symbols(6)
+
+    return stats_payload(tickers, days=int(days.groups()[0]) if days else 1, seed=seed)
+
+
+def ticker_top_mention(params, size, total_pages, seed):
+    return top_mention_payload(count=size or 50, seed=seed)
+
+
+ROUTES = {
+    "/v1/cryptocurrency/quotes/latest":   quotes_latest,
+    "/v1/cryptocurrency/listings/latest": listings_latest,
+    "/api/v1":                            ticker_news,
+    "/api/v1/stat":                       ticker_stats,
+    "/api/v1/top-mention":                ticker_top_mention,
+}
+
+# Parameters that do not change the payload.
+IGNORED_PARAMS = ["token"]
+
+
+class MockAPIHandler(BaseHTTPRequestHandler):
+    # Keep-alive, so the pooled client session reuses its connections as it would with the real hosts.
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        url    = urlsplit(self.path)
+        route  = url.path.rstrip("/")
+        params = {k: v[-1] for k, v in parse_qs(url.query).items() if k not in IGNORED_PARAMS}
+
+        server.delay()
+
+        if route not in ROUTES:
+            return self.send_json(404, {"status": {"error_code": 404, "error_message": f"No route for {url.path}."}}, route)
+
+        status = server.draw_error()
+        if status:
+            headers = {"Retry-After": str(server.retry_after)} if status in [429, 503] else {}
+            return self.send_json(status, {"status": {"error_code": status, "error_message": ERROR_MESSAGES.get(status, "")}}, route, headers)
+
+        body, encoding = server.body(route, params, "gzip" in self.headers.get("Accept-Encoding", ""))
+        self.send_body(200, body, route, {"Content-Encoding": encoding} if encoding else {})
+
+    def send_json(self, status, payload, route, headers={}):
+        self.send_body(status, json.dumps(payload).encode(), route, headers)
+
+    def send_body(self, status, body, route, headers={}):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+        self.server.count(route, status, len(body))
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class MockAPIServer(ThreadingHTTPServer):
+    # One thread per connection. size fixes the number of records per response (coins, articles
+    # or tickers); by default it follows the request (len(id), limit, items, tickers).
+    daemon_threads = True
+
+    def __init__(self, host=HOST, port=PORT, size=None, latency=LATENCY, jitter=JITTER, error_rate=ERROR_RATE,
+                 error_statuses=ERROR_STATUSES, retry_after=RETRY_AFTER, total_pages=TOTAL_PAGES,
+                 compress=True, seed=0, verbose=False):
+        super().__init__((host, port), MockAPIHandler)
+
+        self.size           = size
+        self.latency        = latency
+        self.jitter         = jitter
+        self.error_rate     = error_rate
+        self.error_statuses = error_statuses
+        self.retry_after    = retry_after
+        self.total_pages    = total_pages
+        self.compress       = compress
+        self.seed           = seed
+        self.verbose        = verbose
+        self.__thread       = None
+        self.__rng          = random.Random(seed)
+        self.__lock         = threading.Lock()
+        self.__bodies       = OrderedDict()
+        self.__stats        = {}
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        # Serve from a background thread (in-process load tests); see __main__ for a standalone server.
+        self.__thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.__thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def delay(self):
+        with self.__lock:
+            seconds = self.latency + self.__rng.uniform(0, self.jitter)
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def draw_error(self):
+        with self.__lock:
+            if self.error_rate and self.__rng.random() < self.error_rate:
+                return self.__rng.choice(self.error_statuses)
+        return None
+
+    def body(self, route, params, accept_gzip=False):
+        # (body, content encoding) for a data response, rendered (and compressed) once per key.
+        compress = self.compress and accept_gzip
+        key      = (route, tuple(sorted(params.items())), compress)
+
+        with self.__lock:
+            if key in self.__bodies:
+                self.__bodies.move_to_end(key)
+                return self.__bodies[key]
+
+        body = json.dumps(ROUTES[route](params, self.size, self.total_pages, self.seed)).encode()
+        body = (gzip.compress(body, compresslevel=5), "gzip") if compress and len(body) >= GZIP_MIN_BYTES else (body, None)
+
+        with self.__lock:
+            self.__bodies[key] = body
+            while len(self.__bodies) > BODY_CACHE_SIZE:
+                self.__bodies.popitem(last=False)
+
+        return body
+
+    def count(self, route, status, nbytes):
+        with self.__lock:
+            stats = self.__stats.setdefault(route, {"requests": 0, "errors": 0, "bytes": 0})
+            stats["requests"] += 1
+            stats["errors"]   += status >= 400
+            stats["bytes"]    += nbytes
+
+    def stats(self):
+        # {route: {"requests", "errors", "bytes"}} served so far; bytes as sent on the wire.
+        with self.__lock:
+            return {route: dict(stats) for route, stats in self.__stats.items()}
+
+
+if __name__ == "__main__":
+    # Usage: python utils/mock_server.py [--port 8000] [--size 5000] [--latency 0.2] [--error-rate 0.05]
+    #   Then e.g. CoinMarketCapResponse(..., run_type="API", domain="http://127.0.0.1:8000", cache=False).
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host",        default=HOST)
+    parser.add_argument("--port",        type=int,   default=PORT)
+    parser.add_argument("--size",        type=int)
+    parser.add_argument("--latency",     type=float, default=LATENCY)
+    parser.add_argument("--jitter",      type=float, default=JITTER)
+    parser.add_argument("--error-rate",  type=float, default=ERROR_RATE)
+    parser.add_argument("--retry-after", type=int,   default=RETRY_AFTER)
+    parser.add_argument("--total-pages", type=int,   default=TOTAL_PAGES)
+    parser.add_argument("--no-gzip",     action="store_true")
+    parser.add_argument("--verbose",     action="store_true")
+    args = parser.parse_args()
+
+    server = MockAPIServer(args.host, args.port, size=args.size, latency=args.latency, jitter=args.jitter,
+                           error_rate=args.error_rate, retry_after=args.retry_after, total_pages=args.total_pages,
+                           compress=not args.no_gzip, verbose=args.verbose)
+
+    print(f"Serving  : {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps(server.stats(), indent=4))
@@ -0,0 +1,153 @@
+import sys
+sys.path.append('.')
+
+import os
+import json
+import tempfile
+
+import pandas as pd
+
+from media_response.news import CryptoNewsResponse
+from utils.timezone      import to_utc_datetime
+
+
+STATE_DIR      = os.path.join(os.getcwd(), "data", ".state")
+WATERMARK_FILE = os.path.join(STATE_DIR, "news_watermarks.json")
+
+MAX_PAGES = 10
+
+
+class WatermarkStore:
+    # Persisted high-water mark per (endpoint, ticker): the newest article date seen and the
+    # news_ids published at exactly that date (several articles can share a timestamp).
+    def __init__(self, path=WATERMARK_FILE):
+        self.path  = path
+        self.marks = {}
+
+        if os.path.isfile(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.marks = json.load(f)
+
+    @staticmethod
+    def key(endpoint, ticker):
+        return f"{endpoint}|{ticker}"
+
+    def get(self, endpoint, ticker):
+        mark = self.marks.get(self.key(endpoint, ticker))
+        if not mark:
+            return None, set()
+
+        return pd.Timestamp(mark["date"]), set(mark["news_ids"])
+
+    def set(self, endpoint, ticker, date, news_ids):
+        self.marks[self.key(endpoint, ticker)] = {
+            "date":     date.isoformat(),
+            "news_ids": sorted(str(i) for i in news_ids),
+        }
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        fd, tmp = tempfile.mkstemp(prefix=".tmp_", dir=os.path.dirname(self.path))
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self.marks, f, indent=4, sort_keys=True)
+        os.replace(tmp, self.path)
+
+
+def unseen(df, mark_date, mark_ids):
+    # Boolean mask of articles newer than the watermark.
+    dates = to_utc_datetime(df["date"])
+    ids   = df["news_id"].astype(str) if "news_id" in df.columns else pd.Series("", index=df.index)
+
+    if mark_date is None:
+        return pd.Series(True, index=df.index)
+
+    return (dates > mark_date) | ((dates == mark_date) & ~ids.isin(mark_ids))
+
+
+def advance(df, mark_date, mark_ids):
+    # New watermark after ingesting df.
+    dates = to_utc_datetime(df["date"])
+    if dates.isna().all():
+        return mark_date, mark_ids
+
+    newest = dates.max()
+    if mark_date is not None and newest < mark_date:
+        return mark_date, mark_ids
+
+    ids = set(df.loc[dates == newest, "news_id"].astype(str)) if "news_id" in df.columns else set()
+    if newest == mark_date:
+        ids |= mark_ids
+
+    return newest, ids
+
+
+def fetch_ticker(ticker, endpoint, mark_date, mark_ids, items, max_pages, **kwargs):
+    # Page newest-first and stop at the first page that reaches already ingested articles.
+    # Returns (client, unseen articles, complete): complete when paging reached the watermark or
+    # the end of the feed, not when it ran out of pages or a page failed. In the latter cases,
+    # unseen articles older than the last page fetched may remain.
+    frames   = []
+    seen     = set()
+    complete = False
+    for page in range(1, max_pages + 1):
+        news = CryptoNewsResponse(ticker, endpoint, items=items, page=page, rank_days=None, sortby=None, **kwargs)
+        df   = news.dataframe
+
+        # A failed request leaves no response; a page past the end of the feed has no articles.
+        if not isinstance(news.response, dict):
+            break
+        if not isinstance(df, pd.DataFrame) or df.empty:
+            complete = True
+            break
+
+        mask = unseen(df, mark_date, mark_ids)
+        if "news_url" in df.columns:
+            mask &= ~df["news_url"].isin(seen)
+            seen |= set(df["news_url"])
+
+        frames.append(df[mask])
+
+        if not mask.all() or len(df) < items:
+            complete = True
+            break
+
+    if not frames:
+        return None, pd.DataFrame(), complete
+
+    return news, pd.concat(frames, axis=0, ignore_index=True), complete
+
+
+def ingest(tickers, endpoint="ticker-news", items=50, max_pages=MAX_PAGES, suffix="ALL", store=None, **kwargs):
+    # Incremental pull: only articles newer than each ticker's watermark are fetched and appended
+    # to the <endpoint>_<suffix>.csv archive. Watermarks advance only after the archive write, and
+    # only for tickers whose paging got back to the watermark (or the end of the feed). Otherwise
+    # the watermark stays where it was and the next run pages over the same range again; the
+    # archive's dedup index drops the articles this run already wrote.
+    store   = store or WatermarkStore()
+    tickers = [tickers] if isinstance(tickers, str) else list(tickers)
+
+    results  = {}
+    complete = {}
+    writer   = None
+    for ticker in tickers:
+        mark_date, mark_ids        = store.get(endpoint, ticker)
+        news, df, complete[ticker] = fetch_ticker(ticker, endpoint, mark_date, mark_ids, items, max_pages, **kwargs)
+
+        results[ticker] = df
+        writer          = writer or news
+
+        if not complete[ticker]:
+            print(f"{endpoint} {ticker}: paging stopped before the watermark ({mark_date}); it is kept for the next run.")
+
+    frames = [df for df in results.values() if not df.empty]
+    if frames:
+        writer.write_archive(pd.concat(frames, axis=0, ignore_index=True), writer.archive_filename(mode="a", suffix=suffix))
+
+    for ticker, df in results.items():
+        if not df.empty and complete[ticker]:
+            mark_date, mark_ids = store.get(endpoint, ticker)
+            store.set(endpoint, ticker, *advance(df, mark_date, mark_ids))
+    store.save()
+
+    return results
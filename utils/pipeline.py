@@ -0,0 +1,239 @@
+import time
+import queue
+import threading
+import traceback
+
+import pandas as pd
+
+from collections import OrderedDict
+
+from utils import Clean_data_crypto_function, Clean_news_function
+
+
+# Staged collection: fetch workers -> parse/clean workers -> one persist writer, joined by
+# bounded queues. While one query waits on the network, another is being decoded and framed,
+# and archive writes are batched per target file. A full queue blocks the stage feeding it
+# (backpressure), so at most QUEUE_SIZE payloads or frames wait between two stages.
+
+FETCH_WORKERS = 4
+PARSE_WORKERS = 2
+QUEUE_SIZE    = 8
+
+# The persist writer flushes a file's pending frames once they reach this many rows, and
+# whatever is left when the inputs run out.
+BATCH_ROWS = 50_000
+
+# Per endpoint tag: the Clean_* cleaner applied between parse and persist when clean=True.
+CLEANERS = {
+    "ticker-news":   Clean_news_function.clean,
+    "latest-quotes": Clean_data_crypto_function.clean,
+}
+
+DONE = object()
+
+
+class StageStats:
+    # Items and rows through one stage, the time its workers spent working (busy_s) and the time
+    # they spent blocked on a full downstream queue (blocked_s).
+    def __init__(self, name, workers):
+        self.name      = name
+        self.workers   = workers
+        self.items     = 0
+        self.rows      = 0
+        self.errors    = 0
+        self.busy_s    = 0.0
+        self.blocked_s = 0.0
+        self.lock      = threading.Lock()
+
+    def add(self, busy_s=0.0, blocked_s=0.0, items=0, rows=0, errors=0):
+        with self.lock:
+            self.busy_s    += busy_s
+            self.blocked_s += blocked_s
+            self.items     += items
+            self.rows      += rows
+            self.errors    += errors
+
+
+def rows(df):
+    return len(df) if isinstance(df, pd.DataFrame) else 0
+
+
+class Pipeline:
+    def __init__(self, fetch_workers=FETCH_WORKERS, parse_workers=PARSE_WORKERS, queue_size=QUEUE_SIZE,
+                 batch_rows=BATCH_ROWS, clean=False, mode="a", suffix=""):
+        # suffix names the target archive like persist_batch(): a string or a function of the query.
+        self.fetch_workers = fetch_workers
+        self.parse_workers = parse_workers
+        self.queue_size    = queue_size
+        self.batch_rows    = batch_rows
+        self.clean         = clean
+        self.mode          = mode
+        self.suffix        = suffix
+        self.stats         = {}
+        self.wall_s        = 0.0
+        self.__followers   = {}
+
+    def run(self, queries):
+        # Fetch, parse (and clean) and persist lazily built queries; returns them in the order
+        # given. Identical queries (same query_key()) are fetched once and share the result,
+        # which is persisted once to each distinct archive among them (as persist_batch() does).
+        queries = list(queries)
+        unique  = OrderedDict()
+        for query in queries:
+            unique.setdefault(query.query_key(), []).append(query)
+
+        self.__followers = {id(group[0]): group[1:] for group in unique.values()}
+
+        inbox    = queue.Queue()
+        parsing  = queue.Queue(maxsize=self.queue_size)
+        writing  = queue.Queue(maxsize=self.queue_size)
+        self.stats = {
+            "fetch":   StageStats("fetch",   self.fetch_workers),
+            "parse":   StageStats("parse",   self.parse_workers),
+            "persist": StageStats("persist", 1),
+        }
+
+        for group in unique.values():
+            inbox.put(group[0])
+
+        start   = time.perf_counter()
+        fetch   = [threading.Thread(target=self.__fetch,   args=(inbox, parsing)) for _ in range(self.fetch_workers)]
+        parse   = [threading.Thread(target=self.__parse,   args=(parsing, writing)) for _ in range(self.parse_workers)]
+        persist = [threading.Thread(target=self.__persist, args=(writing,))]
+
+        for thread in fetch + parse + persist:
+            thread.start()
+
+        # Shut the stages down in order: each one drains its queue before the next is told to stop.
+        for threads, upstream in [(fetch, inbox), (parse, parsing), (persist, writing)]:
+            for _ in threads:
+                upstream.put(DONE)
+            for thread in threads:
+                thread.join()
+
+        self.wall_s = time.perf_counter() - start
+
+        return queries
+
+    def __fetch(self, inbox, parsing):
+        stats = self.stats["fetch"]
+        while (query := inbox.get()) is not DONE:
+            start = time.perf_counter()
+            try:
+                query.fetch()
+                stats.add(busy_s=time.perf_counter() - start, items=1)
+            except Exception:
+                traceback.print_exc()
+                stats.add(busy_s=time.perf_counter() - start, errors=1)
+                continue
+
+            stats.add(blocked_s=self.__put(parsing, query))
+
+    def __parse(self, parsing, writing):
+        stats = self.stats["parse"]
+        while (query := parsing.get()) is not DONE:
+            start = time.perf_counter()
+            try:
+                df = query.parse()
+
+                cleaner = CLEANERS.get(query.endpoint_tag) if self.clean else None
+                if cleaner and rows(df):
+                    df = cleaner(df)
+
+                stats.add(busy_s=time.perf_counter() - start, items=1, rows=rows(df))
+            except Exception:
+                traceback.print_exc()
+                stats.add(busy_s=time.perf_counter() - start, errors=1)
+                continue
+
+            for follower in self.__followers.get(id(query), []):
+                follower.copy_result(query)
+
+            if rows(df):
+                for filename, member in self.__targets([query] + self.__followers.get(id(query), []), stats).items():
+                    stats.add(blocked_s=self.__put(writing, (filename, member, df)))
+
+    def __targets(self, members, stats):
+        # Archive of each query sharing one frame, first query per file: the frame is written once
+        # per target file, not once per query (as persist_batch() does). A query whose archive
+        # name cannot be built (e.g. a failing suffix function) counts as an error and is not
+        # persisted; the others still are.
+        targets = OrderedDict()
+        for member in members:
+            try:
+                filename = member.archive_filename(mode=self.mode, suffix=self.suffix(member) if callable(self.suffix) else self.suffix)
+            except Exception:
+                traceback.print_exc()
+                stats.add(errors=1)
+                continue
+
+            targets.setdefault(filename, member)
+
+        return targets
+
+    def __persist(self, writing):
+        # The only thread writing archives: frames for the same file are concatenated and written
+        # with one write_archive() call per batch. Write errors are counted in the stage stats and
+        # never stop the writer, so the stages upstream cannot block on a queue nobody drains.
+        stats   = self.stats["persist"]
+        batches = OrderedDict()
+        written = set()
+
+        while (item := writing.get()) is not DONE:
+            filename, query, df = item
+
+            batch = batches.setdefault(filename, [query, []])
+            batch[1].append(df)
+
+            if sum(len(frame) for frame in batch[1]) >= self.batch_rows:
+                self.__write(filename, *batches.pop(filename), written, stats)
+
+        for filename, (query, frames) in batches.items():
+            self.__write(filename, query, frames, written, stats)
+
+    def __write(self, filename, query, frames, written, stats):
+        # Later batches for a file opened with mode="w" are appended to it, not written over it.
+        start = time.perf_counter()
+        try:
+            df = pd.concat(frames, axis=0, ignore_index=True)
+            query.write_archive(df, filename, mode="a" if filename in written else self.mode)
+            written.add(filename)
+            stats.add(busy_s=time.perf_counter() - start, items=len(frames), rows=len(df))
+        except Exception:
+            traceback.print_exc()
+            stats.add(busy_s=time.perf_counter() - start, errors=len(frames))
+
+    @staticmethod
+    def __put(q, item):
+        # Seconds spent waiting for room in a full queue.
+        start = time.perf_counter()
+        q.put(item)
+        return time.perf_counter() - start
+
+    def report(self):
+        # Per stage: items, rows, errors, busy and blocked seconds, throughput over the run's wall
+        # time and utilization (busy time over the workers' available time).
+        wall = self.wall_s or float("nan")
+        return pd.DataFrame([
+            {
+                "stage":       stats.name,
+                "workers":     stats.workers,
+                "items":       stats.items,
+                "rows":        stats.rows,
+                "errors":      stats.errors,
+                "busy_s":      round(stats.busy_s, 3),
+                "blocked_s":   round(stats.blocked_s, 3),
+                "items_per_s": round(stats.items / wall, 1),
+                "rows_per_s":  round(stats.rows / wall),
+                "utilization": round(stats.busy_s / (wall * stats.workers), 2),
+            }
+            for stats in self.stats.values()
+        ])
+
+
+def run_pipeline(queries, **kwargs):
+    # Pipeline(**kwargs).run(queries), returning (queries, per stage report).
+    pipeline = Pipeline(**kwargs)
+    queries  = pipeline.run(queries)
+
+    return queries, pipeline.report()
@@ -4,18 +4,27 @@ import plotly.graph_objects as go
 
 from pathlib import Path
 
+from utils.profiling import profiled
 
+
+RANK_COLS        = ["mentions", "positive", "negative", "neutral",
+                    "total_mentions", "total_positive", "total_negative", "total_neutral"]
+ORDINAL_SUFFIXES = np.array(["th", "st", "nd", "rd"])
+
+
+@profiled("plot.stats_bar")
 def stats_bar(df):
     df["sentiment_score"].name = "this_sentiment_score"
 
     df.columns = [str(col.lower()).replace(" ", "_") for col in df.columns]
     df["mentions"] = df.loc[:, ["positive", "negative", "neutral"]].sum(axis=1)
 
-    for ticker in df["ticker"].unique():
-        df.loc[df["ticker"]==ticker, "total_mentions"] = df.loc[df["ticker"]==ticker, "mentions"].sum()
-        df.loc[df["ticker"]==ticker, "total_positive"] = df.loc[df["ticker"]==ticker, "positive"].sum()
-        df.loc[df["ticker"]==ticker, "total_negative"] = df.loc[df["ticker"]==ticker, "negative"].sum()
-        df.loc[df["ticker"]==ticker, "total_neutral"]  = df.loc[df["ticker"]==ticker, "neutral" ].sum()
+    # Per-ticker totals broadcast back to every row in one grouped pass.
+    totals = df.groupby("ticker", observed=True)[["mentions", "positive", "negative", "neutral"]].transform("sum")
+    df["total_mentions"] = totals["mentions"]
+    df["total_positive"] = totals["positive"]
+    df["total_negative"] = totals["negative"]
+    df["total_neutral"]  = totals["neutral"]
 
     df = df.sort_values(["ticker", "date"], ascending=True)
     customdata, hovertemplate = get_custom_data(df)
@@ -32,8 +41,8 @@ def stats_bar(df):
     
 
 def get_custom_data(df):    
-    # Organize custom data for the hover display
-    rank_dict = {key: get_rank(df[key]) for key in df.columns}
+    # Organize custom data for the hover display (only the displayed counts are ranked)
+    rank_dict = {key: ordinals(get_rank(df[key])) for key in RANK_COLS}
 
     # Organize custom data for a rate change bar chart
     custom_data = np.stack((
@@ -44,20 +53,20 @@ def get_custom_data(df):
         df["negative"],                                         #3
         df["neutral"],                                          #4
         
-        [ordinal(n) for n in rank_dict["mentions"]],            #5
-        [ordinal(n) for n in rank_dict["positive"]],            #6
-        [ordinal(n) for n in rank_dict["negative"]],            #7
-        [ordinal(n) for n in rank_dict["neutral"]],             #8
+        rank_dict["mentions"],                                  #5
+        rank_dict["positive"],                                  #6
+        rank_dict["negative"],                                  #7
+        rank_dict["neutral"],                                   #8
 
         df["total_mentions"],                                   #9
         df["total_positive"],                                   #10
         df["total_negative"],                                   #11
         df["total_neutral"],                                    #12
         
-        [ordinal(n) for n in rank_dict["total_mentions"]],      #13
-        [ordinal(n) for n in rank_dict["total_positive"]],      #14
-        [ordinal(n) for n in rank_dict["total_negative"]],      #15
-        [ordinal(n) for n in rank_dict["total_neutral"]],       #16
+        rank_dict["total_mentions"],                            #13
+        rank_dict["total_positive"],                            #14
+        rank_dict["total_negative"],                            #15
+        rank_dict["total_neutral"],                             #16
     ), axis=-1)
 
     hover_template = """
@@ -137,7 +146,9 @@ def set_layout(df, fig):
 
 
 def parse_date(df):
-    date_strs  = [df["date"].min(), df["date"].max()]
+    # "date" may be the raw "YYYY-MM-DD" label or a parsed UTC datetime.
+    dates      = pd.to_datetime(df["date"])
+    date_strs  = [dates.min().strftime("%Y-%m-%d"), dates.max().strftime("%Y-%m-%d")]
 
     return " to ".join(date_strs)
 
@@ -146,5 +157,9 @@ def get_rank(ds: pd.Series):
     return ds.rank(ascending=False).values.astype(int)
 
 
-def ordinal(n: int):
-    return "%d%s" % (n,"tsnrhtdd"[(n//10%10!=1)*(n%10<4)*n%10::4])
+def ordinals(n: np.ndarray):
+    # Ordinal labels of an array of ranks: 1 -> "1st", 12 -> "12th", 23 -> "23rd".
+    n      = np.asarray(n, dtype=np.int64)
+    suffix = np.where((n // 10 % 10 != 1) & (n % 10 < 4), n % 10, 0)
+
+    return np.char.add(n.astype(str), ORDINAL_SUFFIXES[suffix])
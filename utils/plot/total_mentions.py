@@ -4,7 +4,14 @@ import plotly.graph_objects as go
 
 from pathlib import Path
 
+from utils.profiling import profiled
 
+
+RANK_COLS        = ["total_mentions", "positive_mentions", "negative_mentions", "neutral_mentions", "sentiment_score"]
+ORDINAL_SUFFIXES = np.array(["th", "st", "nd", "rd"])
+
+
+@profiled("plot.mentions_bar")
 def mentions_bar(df, tickers=[]):
     df         = df[df["ticker"].isin(tickers)]
     df         = df.sort_values("ticker", ascending=True)
@@ -27,8 +34,8 @@ def mentions_bar(df, tickers=[]):
     
 
 def get_custom_data(df):    
-    # Organize custom data for the hover display
-    rank_dict = {key: get_rank(df[key]) for key in df.columns}
+    # Organize custom data for the hover display (only the displayed values are ranked)
+    rank_dict = {key: ordinals(get_rank(df[key])) for key in RANK_COLS}
 
     # Organize custom data for a rate change bar chart
     custom_data = np.stack((
@@ -40,13 +47,13 @@ def get_custom_data(df):
         df['negative_mentions'],                              #4
         df['neutral_mentions'],                               #5
         
-        [ordinal(n) for n in rank_dict["total_mentions"]],    #6
-        [ordinal(n) for n in rank_dict["positive_mentions"]], #7
-        [ordinal(n) for n in rank_dict["negative_mentions"]], #8
-        [ordinal(n) for n in rank_dict["neutral_mentions"]],  #9
+        rank_dict["total_mentions"],                          #6
+        rank_dict["positive_mentions"],                       #7
+        rank_dict["negative_mentions"],                       #8
+        rank_dict["neutral_mentions"],                        #9
         
         df["sentiment_score"],                                #10
-        [ordinal(n) for n in rank_dict["sentiment_score"]],   #11
+        rank_dict["sentiment_score"],                         #11
     ), axis=-1)
 
     hover_template = """
@@ -123,5 +130,9 @@ def get_rank(ds: pd.Series):
     return ds.rank(ascending=False).values.astype(int)
 
 
-def ordinal(n: int):
-    return "%d%s" % (n,"tsnrhtdd"[(n//10%10!=1)*(n%10<4)*n%10::4])
+def ordinals(n: np.ndarray):
+    # Ordinal labels of an array of ranks: 1 -> "1st", 12 -> "12th", 23 -> "23rd".
+    n      = np.asarray(n, dtype=np.int64)
+    suffix = np.where((n // 10 % 10 != 1) & (n % 10 < 4), n % 10, 0)
+
+    return np.char.add(n.astype(str), ORDINAL_SUFFIXES[suffix])
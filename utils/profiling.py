@@ -0,0 +1,331 @@
+import sys
+sys.path.append('.')
+
+import os
+import json
+import time
+import runpy
+import atexit
+import pstats
+import cProfile
+import argparse
+import functools
+import threading
+import tracemalloc
+
+from datetime import datetime
+
+
+# Opt-in CPU and allocation profiling per pipeline stage (fetch, json_to_dataframe, the Clean_*
+# cleaners, merge_df, plot building). Activate it with:
+#   GCB_PROFILE=1 (or a directory)           profile this process and write the report at exit,
+#   python app.py --profile [DIR]            the same for one app.py run,
+#   python utils/profiling.py script.py ...  run any script under the profiler.
+# Each stage gets a cProfile profile (<stage>.prof, readable with pstats or snakeviz) and a
+# tracemalloc peak and top allocation sites; report.json/report.txt name the top hotspots and
+# the peak-memory stage.
+
+ROOT        = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROFILE_DIR = os.path.join(os.getcwd(), "data", ".metrics", "profiles")
+
+# Rows per stage (and overall) in the report.
+TOP_FUNCTIONS   = 10
+TOP_ALLOCATIONS = 10
+
+# Frames kept per traced allocation; 1 groups allocations by source line.
+TRACE_FRAMES = 1
+
+_profiler      = None
+_profiler_read = False
+_profiler_lock = threading.Lock()
+
+
+class NullStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+NULL_STAGE = NullStage()
+
+
+class StageStats:
+    def __init__(self, name):
+        self.name        = name
+        self.calls       = 0
+        self.wall_s      = 0.0
+        self.peak_bytes  = 0
+        self.profile     = cProfile.Profile()
+        self.allocations = {}
+
+
+class Stage:
+    # One pass through a stage. A stage entered inside another pauses the outer one, so CPU time
+    # and allocations belong to the innermost stage. Only one thread at a time is CPU profiled
+    # (cProfile is per thread); stages on other threads still get wall time and memory. The
+    # tracemalloc peak is process wide, so concurrent stages see each other's allocations.
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name     = name
+
+    def __enter__(self):
+        profiler   = self.profiler
+        self.stack = profiler.stack()
+        self.stats = profiler.stats(self.name)
+        self.cpu   = profiler.claim()
+
+        if self.stack:
+            self.stack[-1].pause()
+        self.stack.append(self)
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACE_FRAMES)
+
+        self.peak     = 0
+        self.snapshot = tracemalloc.take_snapshot()
+        self.resume()
+        self.start    = time.perf_counter()
+
+        return self
+
+    def __exit__(self, *args):
+        wall = time.perf_counter() - self.start
+        self.pause()
+
+        snapshot = tracemalloc.take_snapshot()
+        for stat in snapshot.compare_to(self.snapshot, "lineno")[:TOP_ALLOCATIONS]:
+            site = str(stat.traceback)
+            self.stats.allocations[site] = self.stats.allocations.get(site, 0) + stat.size_diff
+
+        self.stats.calls      += 1
+        self.stats.wall_s     += wall
+        self.stats.peak_bytes  = max(self.stats.peak_bytes, self.peak)
+
+        self.stack.pop()
+        if self.stack:
+            self.stack[-1].resume()
+        else:
+            self.profiler.release()
+
+        return False
+
+    def pause(self):
+        if self.cpu:
+            self.stats.profile.disable()
+
+        current, peak = tracemalloc.get_traced_memory()
+        self.peak     = max(self.peak, peak - self.base)
+
+    def resume(self):
+        tracemalloc.reset_peak()
+        self.base = tracemalloc.get_traced_memory()[0]
+
+        if self.cpu:
+            try:
+                self.stats.profile.enable()
+            except ValueError:
+                # Another profiler (e.g. python -m cProfile) owns the thread.
+                self.cpu = False
+
+
+class Profiler:
+    def __init__(self, out_dir=None):
+        self.out_dir = out_dir or os.path.join(PROFILE_DIR, datetime.now().strftime("%Y%m%d_%H%M%S"))
+        self.stages  = {}
+        self.owner   = None
+        self.lock    = threading.Lock()
+        self.local   = threading.local()
+
+    def stage(self, name):
+        return Stage(self, name)
+
+    def stack(self):
+        if not hasattr(self.local, "stack"):
+            self.local.stack = []
+        return self.local.stack
+
+    def stats(self, name):
+        with self.lock:
+            return self.stages.setdefault(name, StageStats(name))
+
+    def claim(self):
+        # True if this thread may use cProfile: no other thread is inside a profiled stage.
+        with self.lock:
+            if self.owner in [None, threading.get_ident()]:
+                self.owner = threading.get_ident()
+                return True
+            return False
+
+    def release(self):
+        with self.lock:
+            if self.owner == threading.get_ident():
+                self.owner = None
+
+    def report(self, top=TOP_FUNCTIONS):
+        stages   = []
+        hotspots = []
+        for stats in self.stages.values():
+            functions = hot_functions(stats.profile)
+            hotspots += [{**function, "stage": stats.name} for function in functions]
+
+            allocations = sorted(stats.allocations.items(), key=lambda item: -item[1])[:top]
+            stages.append({
+                "stage":       stats.name,
+                "calls":       stats.calls,
+                "wall_s":      round(stats.wall_s, 4),
+                "cpu_s":       round(sum(function["tottime"] for function in functions), 4),
+                "peak_mb":     round(stats.peak_bytes / 1024**2, 2),
+                "hotspots":    functions[:top],
+                "allocations": [{"site": site, "retained_kb": round(size / 1024, 1)} for site, size in allocations],
+            })
+
+        peak = max(stages, key=lambda stage: stage["peak_mb"], default=None)
+
+        return {
+            "stages":      stages,
+            "peak_stage":  peak and {"stage": peak["stage"], "peak_mb": peak["peak_mb"]},
+            "hotspots":    sorted(hotspots, key=lambda function: -function["tottime"])[:top],
+        }
+
+    def write(self):
+        # <stage>.prof per stage plus report.json and report.txt; returns the report text.
+        os.makedirs(self.out_dir, exist_ok=True)
+
+        for stats in self.stages.values():
+            if stats.profile.getstats():
+                stats.profile.dump_stats(os.path.join(self.out_dir, f"{stats.name}.prof"))
+
+        report = self.report()
+        text   = format_report(report)
+
+        with open(os.path.join(self.out_dir, "report.json"), "w") as f:
+            json.dump(report, f, indent=2)
+        with open(os.path.join(self.out_dir, "report.txt"), "w") as f:
+            f.write(text)
+
+        return text
+
+
+def short_path(filename):
+    # Project files relative to the repository, installed ones relative to their site-packages
+    # or standard library directory.
+    if filename.startswith(ROOT + os.sep):
+        return os.path.relpath(filename, ROOT)
+
+    for marker in ["site-packages" + os.sep, os.sep + "lib" + os.sep]:
+        if marker in filename:
+            return filename.rsplit(marker, 1)[1]
+
+    return filename
+
+
+def hot_functions(profile):
+    # Functions of a profile by own (tottime) CPU time, heaviest first.
+    if not profile.getstats():
+        return []
+
+    functions = []
+    for (filename, line, name), (_, calls, tottime, cumtime, _) in pstats.Stats(profile).stats.items():
+        functions.append({
+            "function": f"{short_path(filename)}:{line}({name})",
+            "calls":    calls,
+            "tottime":  round(tottime, 4),
+            "cumtime":  round(cumtime, 4),
+        })
+
+    return sorted(functions, key=lambda function: -function["tottime"])
+
+
+def format_report(report):
+    lines = [f"{'Stage':<24} {'calls':>6} {'wall_s':>9} {'cpu_s':>9} {'peak_mb':>9}"]
+    for stage in report["stages"]:
+        lines.append(f"{stage['stage']:<24} {stage['calls']:>6} {stage['wall_s']:>9.3f} {stage['cpu_s']:>9.3f} {stage['peak_mb']:>9.2f}")
+
+    if report["peak_stage"]:
+        lines.append(f"\nPeak memory : {report['peak_stage']['stage']} ({report['peak_stage']['peak_mb']} MB)")
+
+    lines.append("\nTop hotspots (own CPU time):")
+    for function in report["hotspots"]:
+        lines.append(f"  {function['tottime']:>8.3f}s  {function['function']}  [{function['stage']}]")
+
+    return "\n".join(lines) + "\n"
+
+
+def enable(out_dir=None):
+    # Start profiling stages in this process; the report is written when the process exits.
+    global _profiler, _profiler_read
+
+    with _profiler_lock:
+        if _profiler is None:
+            _profiler = Profiler(out_dir)
+            atexit.register(finish)
+        _profiler_read = True
+
+    return _profiler
+
+
+def finish():
+    # Write the report of the active profiler, if any, and stop profiling.
+    global _profiler
+
+    with _profiler_lock:
+        profiler, _profiler = _profiler, None
+
+    if profiler is None:
+        return
+
+    tracemalloc.stop()
+    if profiler.stages:
+        print(profiler.write())
+        print(f"Profiles : {profiler.out_dir}")
+
+
+def get_profiler():
+    # The active profiler, or None. GCB_PROFILE ("1"/"on" or an output directory) enables it.
+    global _profiler_read
+
+    if not _profiler_read:
+        setting        = os.getenv("GCB_PROFILE", "").strip()
+        _profiler_read = True
+
+        if setting.lower() not in ["", "0", "off", "false"]:
+            enable(None if setting.lower() in ["1", "on", "true"] else setting)
+
+    return _profiler
+
+
+def stage(name):
+    # Context manager around one pipeline stage; a shared no-op when profiling is off.
+    profiler = _profiler if _profiler_read else get_profiler()
+    return profiler.stage(name) if profiler else NULL_STAGE
+
+
+def profiled(name):
+    # Decorator form of stage().
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+if __name__ == "__main__":
+    # Usage: python utils/profiling.py [--out DIR] script.py [args ...]
+    #   Runs script.py as __main__ with every stage profiled, then prints the report.
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--out")
+    parser.add_argument("script")
+    parser.add_argument("args", nargs=argparse.REMAINDER)
+    args = parser.parse_args()
+
+    # The project modules import utils.profiling, not this __main__ copy of it.
+    from utils import profiling
+
+    profiling.enable(args.out)
+    sys.argv = [args.script] + args.args
+    runpy.run_path(args.script, run_name="__main__")
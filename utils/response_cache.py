@@ -0,0 +1,190 @@
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+
+from contextlib import contextmanager
+
+
+CACHE_DIR = os.path.join(os.getcwd(), "data", ".cache", "http")
+
+# Cache mode, overridable with the GCB_HTTP_CACHE environment variable:
+#   "on":      serve fresh entries from disk, store new responses.
+#   "off":     always hit the network.
+#   "offline": replay stored responses regardless of age, never touch the network or the cache.
+MODE_OPTIONS = ["on", "off", "offline"]
+DEFAULT_MODE = "on"
+
+# Seconds an entry stays fresh, per endpoint tag.
+DEFAULT_TTL = 300
+TTLS = {
+    "metadata":           24 * 3600,
+    "latest-listings":    300,
+    "latest-quotes":      60,
+    "ticker-news":        600,
+    "ticker-stats":       3600,
+    "ticker-top-mention": 3600,
+}
+
+MAX_BYTES = 256 * 1024**2
+
+# Parameters that never take part in the cache key.
+EXCLUDED_PARAMS = ["token"]
+
+_cache      = None
+_cache_lock = threading.Lock()
+
+
+class ResponseCache:
+    # Raw response payloads on disk, one file per (url, endpoint tag, params) key.
+    # Entry age is the file mtime (TTL); last use is the file atime (LRU eviction).
+    def __init__(self, root=CACHE_DIR, mode=DEFAULT_MODE, ttls=TTLS, default_ttl=DEFAULT_TTL, max_bytes=MAX_BYTES):
+        if mode not in MODE_OPTIONS:
+            raise ValueError(f"Variable 'mode' must be one of the values in {MODE_OPTIONS}." +
+                             f"'{mode}' is not valid.")
+
+        self.root        = root
+        self.mode        = mode
+        self.ttls        = ttls
+        self.default_ttl = default_ttl
+        self.max_bytes   = max_bytes
+        self.__size      = None
+        self.__lock      = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.mode != "off"
+
+    @property
+    def offline(self):
+        return self.mode == "offline"
+
+    @staticmethod
+    def key(endpoint_tag, params, url=""):
+        params = {k: str(v) for k, v in params.items() if k not in EXCLUDED_PARAMS}
+        key    = json.dumps({"url": url, "endpoint": endpoint_tag, "params": params}, sort_keys=True)
+
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.root, key[:2], key + ".json")
+
+    def lookup(self, endpoint_tag, params, url=""):
+        # Path of a usable entry, or None. Offline replay ignores the TTL.
+        if not self.enabled:
+            return None
+
+        path = self.path(self.key(endpoint_tag, params, url))
+        try:
+            mtime = os.path.getmtime(path)
+            if not self.offline and time.time() - mtime > self.ttls.get(endpoint_tag, self.default_ttl):
+                return None
+
+            # Mark as recently used for LRU eviction; keep mtime (entry age) untouched.
+            if not self.offline:
+                os.utime(path, (time.time(), mtime))
+
+            return path
+        except FileNotFoundError:
+            return None
+
+    def get(self, endpoint_tag, params, url=""):
+        path = self.lookup(endpoint_tag, params, url)
+        try:
+            if path:
+                with open(path, "r", encoding="utf-8") as f:
+                    return f.read()
+        except FileNotFoundError:
+            pass
+
+        return None
+
+    def put(self, endpoint_tag, params, payload, url=""):
+        with self.writer(endpoint_tag, params, url) as f:
+            if f:
+                f.write(payload.encode("utf-8"))
+
+    @contextmanager
+    def writer(self, endpoint_tag, params, url=""):
+        # Binary file handle for a new entry (None when the cache is read-only or off). The entry
+        # only becomes visible if the with-block completes without error.
+        if self.mode != "on":
+            yield None
+            return
+
+        path = self.path(self.key(endpoint_tag, params, url))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        fd, tmp = tempfile.mkstemp(prefix=".tmp_", dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                yield f
+        except BaseException:
+            os.remove(tmp)
+            raise
+
+        old_size = os.path.getsize(path) if os.path.exists(path) else 0
+        os.replace(tmp, path)
+
+        with self.__lock:
+            if self.__size is not None:
+                self.__size += os.path.getsize(path) - old_size
+
+        self.evict()
+
+    def evict(self):
+        # Drop least recently used entries until the cache fits in max_bytes.
+        with self.__lock:
+            if self.__size is None:
+                self.__size = sum(size for _, size, _ in self.__entries())
+
+            if self.__size <= self.max_bytes:
+                return
+
+            for path, size, _ in sorted(self.__entries(), key=lambda entry: entry[2]):
+                if self.__size <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    self.__size -= size
+                except FileNotFoundError:
+                    pass
+
+    def clear(self):
+        with self.__lock:
+            for path, _, _ in self.__entries():
+                os.remove(path)
+            self.__size = 0
+
+    def __entries(self):
+        # (path, size, atime) of every cache entry.
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if filename.endswith(".json"):
+                    path = os.path.join(dirpath, filename)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    yield path, stat.st_size, stat.st_atime
+
+
+def get_cache():
+    # Process wide cache shared by every client; mode comes from GCB_HTTP_CACHE.
+    global _cache
+
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache(mode=os.getenv("GCB_HTTP_CACHE", DEFAULT_MODE).lower())
+
+    return _cache
+
+
+def set_cache(cache):
+    global _cache
+
+    with _cache_lock:
+        _cache = cache
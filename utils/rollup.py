@@ -0,0 +1,392 @@
+import sys
+sys.path.append('.')
+
+import io
+import os
+import re
+import tempfile
+
+import numpy  as np
+import pandas as pd
+
+from utils.csv_archive  import replace_atomic
+from utils.ticker_index import STATE_DIR, CHUNK_SIZE, record_ends
+from utils.timezone     import to_utc_datetime
+
+
+ROLLUP_DIR = os.path.join(os.getcwd(), "data", "rollups")
+SYMBOL_COL = "symbol"
+TIME_COL   = "quote.{currency}.last_updated"
+PRICE_COL  = "quote.{currency}.price"
+VOLUME_COL = "quote.{currency}.volume_24h"
+
+# Bar size per rollup table. Buckets are labelled by their start (UTC); weeks start on Monday.
+RESOLUTIONS = {
+    "hourly": "h",
+    "daily":  "D",
+    "weekly": "W",
+}
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+BAR_COLS    = ["bucket", "symbol", "open", "high", "low", "close", "volume", "snapshots", "open_time", "close_time"]
+
+
+def bucket_start(times, freq):
+    # Start of the bucket each timestamp falls in.
+    if freq == "W":
+        days = times.dt.floor("D")
+        return days - pd.to_timedelta(days.dt.weekday, unit="D")
+
+    return times.dt.floor(freq)
+
+
+def combine(bars):
+    # Merge bars of the same (bucket, symbol) into one. Bars may come in any order: the open is
+    # the price at the earliest open_time, close and volume are taken at the latest close_time.
+    # A single snapshot is a bar with open == high == low == close, so the same merge builds new
+    # bars from snapshots and folds them into bars already in the table.
+    keys = ["bucket", "symbol"]
+
+    # All three groupbys sort by key, so their results line up row for row.
+    first = bars.sort_values("open_time", kind="stable").groupby(keys)
+    last  = bars.sort_values("close_time", kind="stable").groupby(keys)
+    grp   = bars.groupby(keys)
+
+    merged = first[["open", "open_time"]].first()
+    closes = last[["close", "close_time", "volume"]].last()
+
+    merged = merged.assign(
+        high       = grp["high"].max().array,
+        low        = grp["low"].min().array,
+        close      = closes["close"].array,
+        close_time = closes["close_time"].array,
+        volume     = closes["volume"].array,
+        snapshots  = grp["snapshots"].sum().array,
+    )
+
+    return merged.reset_index()[BAR_COLS]
+
+
+def snapshot_bars(df, freq, currency="USD"):
+    # One single-snapshot bar per quote row with a time and a price. "volume" is the 24h traded
+    # volume reported with the snapshot; a bar keeps the one reported at its close.
+    time_col, price_col, volume_col = (col.format(currency=currency) for col in [TIME_COL, PRICE_COL, VOLUME_COL])
+
+    times  = to_utc_datetime(df[time_col]).astype("datetime64[ns, UTC]")
+    prices = pd.to_numeric(df[price_col], errors="coerce")
+    volume = pd.to_numeric(df[volume_col], errors="coerce") if volume_col in df.columns else np.nan
+    keep   = times.notna() & prices.notna() & df[SYMBOL_COL].notna()
+
+    bars = pd.DataFrame({
+        "bucket":     bucket_start(times, freq),
+        "symbol":     df[SYMBOL_COL].astype(str),
+        "open":       prices,
+        "high":       prices,
+        "low":        prices,
+        "close":      prices,
+        "volume":     volume,
+        "snapshots":  1,
+        "open_time":  times,
+        "close_time": times,
+    })
+
+    return bars[keep.values]
+
+
+def read_bars(data):
+    # Bars back from their CSV form (path or bytes); times are stored as naive UTC.
+    df = pd.read_csv(io.BytesIO(data) if isinstance(data, bytes) else data, dtype={"symbol": str})
+
+    for col in ["bucket", "open_time", "close_time"]:
+        df[col] = to_utc_datetime(df[col], TIME_FORMAT).astype("datetime64[ns, UTC]")
+
+    return df
+
+
+class Rollup:
+    # Materialized OHLCV tables built from latest-quotes CSV archives, one CSV per resolution:
+    #   <rollup_dir>/<name>_<resolution>.csv, rows sorted by (bucket, symbol).
+    # The archives of one table set are its sources (e.g. an archive and its daily partitions);
+    # like the ticker index, the rollup remembers how far into each source it got, so on update
+    # only the appended snapshots are read, and a source that appears later is read from its start.
+    # New snapshots are turned into bars and merged into the affected buckets; since tables are
+    # sorted by bucket, only the rows from the first affected bucket on are rewritten (the byte
+    # offset of every bucket is kept in the state file). A rewritten or removed source, or a table
+    # changed behind the rollup's back, triggers a rebuild from the sources.
+    TAIL = 64
+
+    def __init__(self, archives, resolutions=RESOLUTIONS, currency="USD", rollup_dir=ROLLUP_DIR, state_dir=STATE_DIR,
+                 name=None):
+        # archives: one archive or the archives of a table set; name defaults to the first one's.
+        self.archives    = [archives] if isinstance(archives, str) else sorted(archives)
+        self.resolutions = resolutions
+        self.currency    = currency
+        self.rollup_dir  = rollup_dir
+        self.name        = name or os.path.splitext(os.path.basename(self.archives[0]))[0]
+        self.path        = os.path.join(state_dir, self.name + ".rollup.npz")
+
+        self.load()
+
+    def table_path(self, resolution):
+        return os.path.join(self.rollup_dir, f"{self.name}_{resolution}.csv")
+
+    def reset(self):
+        # Per source (absolute path): its header, the bytes rolled up and the last TAIL of them.
+        self.sources = {}
+        self.buckets = {res: np.empty(0, dtype=np.int64) for res in self.resolutions}
+        self.offsets = {res: np.empty(0, dtype=np.int64) for res in self.resolutions}
+        self.sizes   = {res: 0 for res in self.resolutions}
+
+        for res in self.resolutions:
+            if os.path.isfile(self.table_path(res)):
+                os.remove(self.table_path(res))
+
+    def load(self):
+        if not os.path.isfile(self.path):
+            self.reset()
+            return
+
+        with np.load(self.path) as saved:
+            self.sources = {
+                str(source): {
+                    "header": saved[f"source{i}_header"].tobytes(),
+                    "size":   int(saved[f"source{i}_size"]),
+                    "tail":   saved[f"source{i}_tail"].tobytes(),
+                }
+                for i, source in enumerate(saved["sources"])
+            }
+            self.buckets = {res: saved[f"{res}_buckets"] for res in self.resolutions if f"{res}_buckets" in saved}
+            self.offsets = {res: saved[f"{res}_offsets"] for res in self.resolutions if f"{res}_offsets" in saved}
+            self.sizes   = {res: int(saved[f"{res}_size"]) for res in self.resolutions if f"{res}_size" in saved}
+
+        if not self.valid():
+            self.reset()
+
+    def valid(self):
+        # Sources: each still in the set, with the same header and the same bytes just before the
+        # rolled up size. Tables: every resolution present and exactly as large as the last write
+        # left it.
+        archives = {os.path.abspath(archive) for archive in self.archives}
+        for archive, source in self.sources.items():
+            if archive not in archives or not os.path.isfile(archive) or os.path.getsize(archive) < source["size"]:
+                return False
+
+            with open(archive, "rb") as f:
+                if f.read(len(source["header"])) != source["header"]:
+                    return False
+
+                f.seek(source["size"] - len(source["tail"]))
+                if f.read(len(source["tail"])) != source["tail"]:
+                    return False
+
+        for res in self.resolutions:
+            if res not in self.sizes:
+                return False
+            if self.sizes[res] != (os.path.getsize(self.table_path(res)) if os.path.isfile(self.table_path(res)) else 0):
+                return False
+
+        return True
+
+    def rebuild(self):
+        self.reset()
+        return self.update()
+
+    def update(self):
+        # Roll up whatever was appended to the sources; returns {resolution: buckets touched}.
+        touched = {res: 0 for res in self.resolutions}
+
+        for archive in self.archives:
+            if not os.path.isfile(archive):
+                continue
+
+            source = self.sources.setdefault(os.path.abspath(archive), {"header": b"", "size": 0, "tail": b""})
+            with open(archive, "rb") as f:
+                f.seek(source["size"])
+                buf = b""
+
+                while True:
+                    chunk = f.read(CHUNK_SIZE)
+                    buf  += chunk
+                    ends  = record_ends(buf)
+
+                    # At EOF, a final record without a trailing newline still counts.
+                    if not chunk and buf.strip() and (not len(ends) or ends[-1] != len(buf)):
+                        ends = np.append(ends, len(buf))
+
+                    if len(ends):
+                        for res, count in self.__roll_block(source, buf[:ends[-1]], ends).items():
+                            touched[res] += count
+                        buf = buf[ends[-1]:]
+
+                    if not chunk:
+                        break
+
+                f.seek(max(source["size"] - self.TAIL, 0))
+                source["tail"] = f.read(min(self.TAIL, source["size"]))
+
+        self.save()
+        return touched
+
+    def __roll_block(self, source, block, ends):
+        start = 0
+        if not source["header"]:
+            source["header"] = block[:ends[0]]
+            start            = int(ends[0])
+
+        source["size"] += len(block)
+
+        if not block[start:].strip():
+            return {}
+
+        needed = [col.format(currency=self.currency) for col in [SYMBOL_COL, TIME_COL, PRICE_COL, VOLUME_COL]]
+        df     = pd.read_csv(io.BytesIO(source["header"] + block[start:]), usecols=lambda col: col in needed)
+        if not set(needed[:3]) <= set(df.columns):
+            return {}
+
+        return {res: self.__merge(res, snapshot_bars(df, freq, self.currency)) for res, freq in self.resolutions.items()}
+
+    def __merge(self, res, new):
+        # Fold new bars into the table, rewriting it from the first affected bucket on.
+        if new.empty:
+            return 0
+
+        new     = combine(new)
+        path    = self.table_path(res)
+        buckets = self.buckets[res]
+        first   = new["bucket"].min().value
+        pos     = int(np.searchsorted(buckets, first))
+        offset  = int(self.offsets[res][pos]) if pos < len(buckets) else self.sizes[res]
+
+        os.makedirs(self.rollup_dir, exist_ok=True)
+
+        if not self.sizes[res]:
+            header = ",".join(BAR_COLS).encode() + b"\n"
+            bars   = new
+        else:
+            with open(path, "rb") as f:
+                header = f.readline()
+                f.seek(offset)
+                rest   = f.read()
+
+            bars = combine(pd.concat([read_bars(header + rest), new], ignore_index=True)) if rest.strip() else new
+
+        body = self.__to_csv(bars)
+
+        def write(tmp):
+            with open(tmp, "wb") as f:
+                f.write(header + body)
+
+        if not self.sizes[res]:
+            offset = len(header)
+            replace_atomic(path, write)
+        else:
+            with open(path, "r+b") as f:
+                f.truncate(offset)
+                f.seek(offset)
+                f.write(body)
+
+        # Byte offset of each bucket's first row from offset on.
+        starts  = np.concatenate([[0], record_ends(body)[:-1]]) + offset
+        values  = bars["bucket"].values.view(np.int64)
+        changes = np.flatnonzero(np.r_[True, values[1:] != values[:-1]])
+
+        self.buckets[res] = np.concatenate([buckets[:pos], values[changes]])
+        self.offsets[res] = np.concatenate([self.offsets[res][:pos], starts[changes]])
+        self.sizes[res]   = offset + len(body)
+
+        return int(new["bucket"].nunique())
+
+    @staticmethod
+    def __to_csv(bars):
+        # Times are written as naive UTC: formatting tz-aware columns is ~10x slower.
+        times = {col: bars[col].dt.tz_localize(None) for col in ["bucket", "open_time", "close_time"]}
+        return bars.assign(**times).to_csv(index=False, header=False, lineterminator="\n", date_format=TIME_FORMAT).encode()
+
+    def read(self, resolution, symbols=None, start=None, end=None):
+        # Bars of one resolution, optionally for some symbols and buckets starting within
+        # [start, end]. The bucket offsets let a date range be read with a single seek.
+        path = self.table_path(resolution)
+        if not self.sizes.get(resolution):
+            return pd.DataFrame(columns=BAR_COLS)
+
+        buckets = self.buckets[resolution]
+        lo      = 0 if start is None else int(np.searchsorted(buckets, to_utc_datetime(pd.Series([start])).astype("datetime64[ns, UTC]").iloc[0].value))
+        hi      = len(buckets) if end is None else int(np.searchsorted(buckets, to_utc_datetime(pd.Series([end])).astype("datetime64[ns, UTC]").iloc[0].value, side="right"))
+        offsets = np.r_[self.offsets[resolution], self.sizes[resolution]]
+
+        with open(path, "rb") as f:
+            header = f.readline()
+            f.seek(offsets[lo])
+            body   = f.read(max(int(offsets[hi] - offsets[lo]), 0))
+
+        bars = read_bars(header + body)
+        if symbols is not None:
+            symbols = [symbols] if isinstance(symbols, str) else symbols
+            bars    = bars[bars["symbol"].isin(symbols)].reset_index(drop=True)
+
+        return bars
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        arrays = {"sources": np.array(list(self.sources), dtype=str)}
+        for i, source in enumerate(self.sources.values()):
+            arrays[f"source{i}_header"] = np.frombuffer(source["header"], dtype=np.uint8)
+            arrays[f"source{i}_size"]   = np.int64(source["size"])
+            arrays[f"source{i}_tail"]   = np.frombuffer(source["tail"], dtype=np.uint8)
+        for res in self.resolutions:
+            arrays[f"{res}_buckets"] = self.buckets[res]
+            arrays[f"{res}_offsets"] = self.offsets[res]
+            arrays[f"{res}_size"]    = np.int64(self.sizes[res])
+
+        fd, tmp = tempfile.mkstemp(prefix=".tmp_", suffix=".npz", dir=os.path.dirname(self.path))
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, self.path)
+
+
+def set_archives(directory, pattern):
+    # The archives of a table set: files in directory whose name matches its pattern, by name.
+    return sorted(os.path.join(directory, f) for f in os.listdir(directory) if re.fullmatch(pattern, f))
+
+
+def set_rollup(archive, sets):
+    # Rollup of the table set ({name: pattern}) an archive belongs to, or None. Tables and state
+    # are kept next to the archives, in rollups/ and .state/.
+    directory = os.path.dirname(os.path.abspath(archive))
+    for name, pattern in sets.items():
+        if re.fullmatch(pattern, os.path.basename(archive)):
+            return Rollup(set_archives(directory, pattern), name=name, rollup_dir=os.path.join(directory, "rollups"),
+                          state_dir=os.path.join(directory, ".state"))
+
+    return None
+
+
+def read_rollup(archive, resolution, symbols=None, start=None, end=None):
+    # One-call lookup for charting: the rollup is brought up to date first.
+    rollup = Rollup(archive)
+    rollup.update()
+
+    return rollup.read(resolution, symbols, start, end)
+
+
+if __name__ == "__main__":
+    # Usage: python utils/rollup.py [--rebuild] [latest-quotes archive csv files...]
+    #   Catches up (or rebuilds) the hourly/daily/weekly OHLCV tables in data/rollups/: by default
+    #   the table sets the client keeps rolled up, otherwise one table set per file given.
+    from market_response.crypto import CoinMarketCapResponse
+
+    args     = sys.argv[1:]
+    rebuild  = "--rebuild" in args
+    data_dir = os.path.join(os.getcwd(), "data")
+    files    = [arg for arg in args if arg != "--rebuild"]
+    rollups  = [Rollup(filename) for filename in files] or [
+        Rollup(archives, name=name) for name, pattern in CoinMarketCapResponse.ROLLUP_ARCHIVES.items()
+        if (archives := set_archives(data_dir, pattern))
+    ]
+
+    for rollup in rollups:
+        touched = rollup.rebuild() if rebuild else rollup.update()
+
+        for res in rollup.resolutions:
+            print(f"Rolled up : {len(rollup.archives)} archive(s) -> {rollup.table_path(res)} ({touched[res]} buckets updated)")
@@ -0,0 +1,199 @@
+import sys
+sys.path.append('.')
+
+from fnmatch import fnmatchcase
+
+import pandas as pd
+
+from utils.csv_archive import read_header
+from utils.timezone    import to_utc_datetime
+
+
+# Compact in-memory dtypes per endpoint, applied when an archive is read for analysis (read_csv(),
+# the Clean_* loaders). Client responses and the archives they are written to keep the source
+# values and strings: float32 and the parsed datetimes are lossy once written back as text.
+# Column names may be patterns ("quote.*.price" covers every convert currency).
+#   category: low-cardinality strings repeated on every snapshot/article.
+#   int8/16/32: counts, ranks and ids; columns with gaps become the nullable Int* equivalent.
+#   float32: percentages and scores (7 significant digits is plenty); prices, volumes, supplies
+#            and market caps stay float64.
+#   datetime: parsed to UTC; the value is the explicit strptime format, or None to infer.
+CMC_SCHEMA = {
+    "dtypes": {
+        "id":                               "int32",
+        "name":                             "category",
+        "symbol":                           "category",
+        "slug":                             "category",
+        "num_market_pairs":                 "int32",
+        "tags":                             "category",
+        "max_supply":                       "float64",
+        "circulating_supply":               "float64",
+        "total_supply":                     "float64",
+        "is_active":                        "int8",
+        "is_fiat":                          "int8",
+        "cmc_rank":                         "int32",
+        "platform.id":                      "int32",
+        "platform.name":                    "category",
+        "platform.symbol":                  "category",
+        "platform.slug":                    "category",
+        "platform.token_address":           "category",
+        "quote.*.price":                    "float64",
+        "quote.*.volume_24h":               "float64",
+        "quote.*.percent_change_*":         "float32",
+        "quote.*.market_cap":               "float64",
+        "quote.*.market_cap_dominance":     "float32",
+        "quote.*.fully_diluted_market_cap": "float64",
+    },
+    "datetimes": {
+        "date_added":                       None,
+        "last_updated":                     None,
+        "quote.*.last_updated":             None,
+    },
+}
+
+SCHEMAS = {
+    "latest-quotes":   CMC_SCHEMA,
+    "latest-listings": CMC_SCHEMA,
+    "ticker-news": {
+        "dtypes": {
+            "source_name": "category",
+            "topics":      "category",
+            "sentiment":   "category",
+            "type":        "category",
+            "tickers":     "category",
+            "news_id":     "int32",
+            "rank_score":  "float32",
+            "eventid":     "category",
+        },
+        "datetimes": {
+            "date": None,
+        },
+    },
+    "ticker-stats": {
+        "dtypes": {
+            "ticker":          "category",
+            "Positive":        "int32",
+            "Negative":        "int32",
+            "Neutral":         "int32",
+            "sentiment_score": "float32",
+            "Total Positive":  "int32",
+            "Total Negative":  "int32",
+            "Total Neutral":   "int32",
+            "Sentiment Score": "float32",
+        },
+        "datetimes": {
+            "date": "%Y-%m-%d",
+        },
+    },
+    "ticker-top-mention": {
+        "dtypes": {
+            "ticker":            "category",
+            "name":              "category",
+            "total_mentions":    "int32",
+            "positive_mentions": "int32",
+            "negative_mentions": "int32",
+            "neutral_mentions":  "int32",
+            "sentiment_score":   "float32",
+        },
+        "datetimes": {
+            "from_date": "%m%d%Y",
+            "to_date":   "%m%d%Y",
+        },
+    },
+}
+
+NULLABLE_INTS = {"int8": "Int8", "int16": "Int16", "int32": "Int32", "int64": "Int64"}
+
+
+def resolve(patterns, columns):
+    # {column: value} for every column matching one of the (pattern: value) entries.
+    resolved = {}
+    for col in columns:
+        for pattern, value in patterns.items():
+            if fnmatchcase(str(col), pattern):
+                resolved[col] = value
+                break
+
+    return resolved
+
+
+def column_dtypes(endpoint, columns):
+    schema = SCHEMAS.get(endpoint, {})
+    return resolve(schema.get("dtypes", {}), columns), resolve(schema.get("datetimes", {}), columns)
+
+
+def parser_dtypes(endpoint, columns):
+    # Dtypes safe to hand to the CSV parser: categorical and float columns. Integers and datetimes
+    # are cast afterwards (apply_schema), since they may contain gaps or need format inference.
+    dtypes, _ = column_dtypes(endpoint, columns)
+    return {col: dtype for col, dtype in dtypes.items() if dtype not in NULLABLE_INTS}
+
+
+def parse_datetime(values, fmt=None):
+    # Values that do not match an explicit format (e.g. already written back in ISO form) are
+    # inferred instead of being dropped.
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return to_utc_datetime(values)
+
+    times = to_utc_datetime(values, fmt)
+    if fmt:
+        missed = times.isna() & values.notna()
+        if missed.any():
+            times[missed] = to_utc_datetime(values[missed])
+
+    return times
+
+
+def cast(values, dtype):
+    if dtype in NULLABLE_INTS and values.isna().any():
+        dtype = NULLABLE_INTS[dtype]
+
+    try:
+        return values.astype(dtype)
+    except (TypeError, ValueError):
+        # Unhashable values (tickers/tags lists straight from the API) or non-integral numbers
+        # keep their original dtype.
+        return values
+
+
+def apply_schema(df, endpoint):
+    # Cast df in place to the endpoint's compact dtypes; unknown endpoints/columns are left as is.
+    if not isinstance(df, pd.DataFrame) or df.empty:
+        return df
+
+    dtypes, datetimes = column_dtypes(endpoint, df.columns)
+
+    for col, dtype in dtypes.items():
+        if df[col].dtype != dtype:
+            df[col] = cast(df[col], dtype)
+
+    for col, fmt in datetimes.items():
+        df[col] = parse_datetime(df[col], fmt)
+
+    return df
+
+
+def read_csv(filename, endpoint, **kwargs):
+    # pd.read_csv with the endpoint schema; repeated strings never exist as object columns.
+    dtype = parser_dtypes(endpoint, read_header(filename))
+
+    return apply_schema(pd.read_csv(filename, dtype=dtype, **kwargs), endpoint)
+
+
+def memory_usage(df):
+    return int(df.memory_usage(deep=True).sum())
+
+
+if __name__ == "__main__":
+    # Usage: python utils/schema.py [endpoint csv]...
+    #   Compares the in-memory size of archives read with and without the schema.
+    files = sys.argv[1:] or [
+        "latest-quotes",   "./data/latest-quotes_data_ALL.csv",
+        "ticker-news",     "./data/ticker-news_data_ALL.csv",
+        "ticker-stats",    "./data/ticker-stats_last7days.csv",
+    ]
+
+    for endpoint, filename in zip(files[::2], files[1::2]):
+        before = memory_usage(pd.read_csv(filename))
+        after  = memory_usage(read_csv(filename, endpoint))
+        print(f"{filename}: {before / 1024**2:.2f} MB -> {after / 1024**2:.2f} MB ({before / after:.1f}x)")
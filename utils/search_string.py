@@ -1,82 +1,164 @@
-def location():
-    locations = [
-        "America",
-        "USA",
-        "United States",
-        "United States of America",
-        "New York",
-        "California",
-        "Texas",
-        "Florida",
-        "New York City",
-        "NYC",
-        "Seattle",
-        "Portland",
-        "San Francisco",
-        "Silicon Valley",
-        "Menlo Park",
-        "San Jose",
-        "Los Angeles",
-        "San Diego",
-        "Las Vegas",
-        "Denver",
-        "Austin",
-        "Dallas",
-        "Houston",
-        "Canada",
-        "Vancouver",
-        "Toronto",
-        "Montreal",
-        "Asia",
-        "China",
-        "Hong Kong",
-        "South Korea",
-        "Korea",
-        "Seoul",
-        "Busan",
-        "Pusan",
-        "Japan",
-        "Tokyo",
-        "Russia",
-        "Moscow",
-        "Shanghai",
-        "Beijing",
-        "Chongqing",
-        "Tianjin",
-        "Guangzhou",
-        "Shenzhen",
-        "Chengdu",
-        "Nanjing",
-        "Wuhan",
-        "India",
-        "New Delhi",
-        "Europe",
-        "UK",
-        "United Kingdom",
-        "England",
-        "Scotland",
-        "France",
-        "Paris",
-        "Germany",
-        "Munich",
-        "Berlin",
-        "Switzerland",
-        "Zurich",
-        "Spain",
-        "Italy",
-        "Norway",
-        "Oslo",
-        "Sweden",
-        "Stockholm",
-        "Poland",
-        "Netherlands",
-        "Belgium",
-        "Greece",
-        "Portugal",
-        "Denmark",
-        "Finland",
-        "Ireland",
-    ]
+# Place names used both as the Crypto News searchOR filter and by the local location tagger
+# (utils/location_tagger.py). Order matters for the searchOR string.
+LOCATIONS = [
+    "America",
+    "USA",
+    "United States",
+    "United States of America",
+    "New York",
+    "California",
+    "Texas",
+    "Florida",
+    "New York City",
+    "NYC",
+    "Seattle",
+    "Portland",
+    "San Francisco",
+    "Silicon Valley",
+    "Menlo Park",
+    "San Jose",
+    "Los Angeles",
+    "San Diego",
+    "Las Vegas",
+    "Denver",
+    "Austin",
+    "Dallas",
+    "Houston",
+    "Canada",
+    "Vancouver",
+    "Toronto",
+    "Montreal",
+    "Asia",
+    "China",
+    "Hong Kong",
+    "South Korea",
+    "Korea",
+    "Seoul",
+    "Busan",
+    "Pusan",
+    "Japan",
+    "Tokyo",
+    "Russia",
+    "Moscow",
+    "Shanghai",
+    "Beijing",
+    "Chongqing",
+    "Tianjin",
+    "Guangzhou",
+    "Shenzhen",
+    "Chengdu",
+    "Nanjing",
+    "Wuhan",
+    "India",
+    "New Delhi",
+    "Europe",
+    "UK",
+    "United Kingdom",
+    "England",
+    "Scotland",
+    "France",
+    "Paris",
+    "Germany",
+    "Munich",
+    "Berlin",
+    "Switzerland",
+    "Zurich",
+    "Spain",
+    "Italy",
+    "Norway",
+    "Oslo",
+    "Sweden",
+    "Stockholm",
+    "Poland",
+    "Netherlands",
+    "Belgium",
+    "Greece",
+    "Portugal",
+    "Denmark",
+    "Finland",
+    "Ireland",
+]
+
+# Region of every location above.
+REGIONS = {
+    "America":                  "North America",
+    "USA":                      "North America",
+    "United States":            "North America",
+    "United States of America": "North America",
+    "New York":                 "North America",
+    "California":               "North America",
+    "Texas":                    "North America",
+    "Florida":                  "North America",
+    "New York City":            "North America",
+    "NYC":                      "North America",
+    "Seattle":                  "North America",
+    "Portland":                 "North America",
+    "San Francisco":            "North America",
+    "Silicon Valley":           "North America",
+    "Menlo Park":               "North America",
+    "San Jose":                 "North America",
+    "Los Angeles":              "North America",
+    "San Diego":                "North America",
+    "Las Vegas":                "North America",
+    "Denver":                   "North America",
+    "Austin":                   "North America",
+    "Dallas":                   "North America",
+    "Houston":                  "North America",
+    "Canada":                   "North America",
+    "Vancouver":                "North America",
+    "Toronto":                  "North America",
+    "Montreal":                 "North America",
+    "Asia":                     "Asia",
+    "China":                    "Asia",
+    "Hong Kong":                "Asia",
+    "South Korea":              "Asia",
+    "Korea":                    "Asia",
+    "Seoul":                    "Asia",
+    "Busan":                    "Asia",
+    "Pusan":                    "Asia",
+    "Japan":                    "Asia",
+    "Tokyo":                    "Asia",
+    "Shanghai":                 "Asia",
+    "Beijing":                  "Asia",
+    "Chongqing":                "Asia",
+    "Tianjin":                  "Asia",
+    "Guangzhou":                "Asia",
+    "Shenzhen":                 "Asia",
+    "Chengdu":                  "Asia",
+    "Nanjing":                  "Asia",
+    "Wuhan":                    "Asia",
+    "India":                    "Asia",
+    "New Delhi":                "Asia",
+    "Russia":                   "Russia",
+    "Moscow":                   "Russia",
+    "Europe":                   "Europe",
+    "UK":                       "Europe",
+    "United Kingdom":           "Europe",
+    "England":                  "Europe",
+    "Scotland":                 "Europe",
+    "France":                   "Europe",
+    "Paris":                    "Europe",
+    "Germany":                  "Europe",
+    "Munich":                   "Europe",
+    "Berlin":                   "Europe",
+    "Switzerland":              "Europe",
+    "Zurich":                   "Europe",
+    "Spain":                    "Europe",
+    "Italy":                    "Europe",
+    "Norway":                   "Europe",
+    "Oslo":                     "Europe",
+    "Sweden":                   "Europe",
+    "Stockholm":                "Europe",
+    "Poland":                   "Europe",
+    "Netherlands":              "Europe",
+    "Belgium":                  "Europe",
+    "Greece":                   "Europe",
+    "Portugal":                 "Europe",
+    "Denmark":                  "Europe",
+    "Finland":                  "Europe",
+    "Ireland":                  "Europe",
+}
 
-    return ",".join(["+".join(x.split()) for x in locations])
 
+def location(locations=LOCATIONS):
+    return ",".join(["+".join(x.split()) for x in locations])
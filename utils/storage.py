@@ -0,0 +1,296 @@
+import sys
+sys.path.append('.')
+
+import os
+import re
+import json
+import uuid
+import urllib.parse
+
+import pandas as pd
+
+from datetime import datetime
+
+from utils.timezone import to_utc_datetime
+
+
+DATA_DIR    = os.path.join(os.getcwd(), "data")
+ARCHIVE_DIR = os.path.join(DATA_DIR, "archive")
+
+# Partition keys per endpoint:
+#   time:   candidate timestamp columns (first one present wins) used for the date=YYYY-MM-DD partition.
+#   format: explicit strftime format of the time column, if pandas cannot infer it.
+#   ticker: column used for the ticker=<SYMBOL> partition. News rows can carry several tickers,
+#           so they are partitioned by date only and filtered on "tickers" at read time.
+PARTITION_KEYS = {
+    "metadata":           {"time": ["date_added"],                             "format": None,     "ticker": "symbol"},
+    "latest-listings":    {"time": ["quote.USD.last_updated", "last_updated"], "format": None,     "ticker": "symbol"},
+    "latest-quotes":      {"time": ["quote.USD.last_updated", "last_updated"], "format": None,     "ticker": "symbol"},
+    "ticker-news":        {"time": ["date"],                                   "format": None,     "ticker": None},
+    "ticker-stats":       {"time": ["date"],                                   "format": None,     "ticker": "ticker"},
+    "ticker-top-mention": {"time": ["to_date"],                                "format": "%m%d%Y", "ticker": "ticker"},
+}
+
+# Flat CSV archive name (without suffix) -> endpoint tag, used by the migration tool.
+CSV_ENDPOINTS = {
+    "metadata_data":       "metadata",
+    "latest-listing_data": "latest-listings",
+    "latest-quotes_data":  "latest-quotes",
+    "ticker-news_data":    "ticker-news",
+    "ticker-stats":        "ticker-stats",
+    "ticker-top-mention":  "ticker-top-mention",
+}
+
+UNKNOWN_PARTITION = "unknown"
+
+
+class PartitionedStorage:
+    # Compressed columnar archive laid out as:
+    #   <root>/<endpoint>/date=YYYY-MM-DD/ticker=<SYMBOL>/part-<timestamp>-<id>.<ext>
+    # Every write adds new part files, so appends never touch existing data.
+    FORMATS = {
+        "parquet": ".parquet",
+        "feather": ".feather",
+    }
+
+    def __init__(self, root=ARCHIVE_DIR, fmt="parquet", compression="zstd"):
+        if fmt not in self.FORMATS:
+            raise ValueError(f"Variable 'fmt' must be one of the values in {list(self.FORMATS)}." +
+                             f"'{fmt}' is not valid.")
+
+        self.root        = root
+        self.fmt         = fmt
+        self.compression = compression
+
+    @property
+    def ext(self):
+        return self.FORMATS[self.fmt]
+
+    def write(self, df, endpoint):
+        if df is None or df.empty:
+            return []
+
+        keys  = self.__partition_keys(endpoint)
+        df    = self.__prepare(df.reset_index(drop=True))
+        dates = self.__partition_dates(df, keys)
+
+        if keys["ticker"] in df.columns:
+            tickers = df[keys["ticker"]].fillna(UNKNOWN_PARTITION).astype(str)
+        else:
+            tickers = pd.Series(UNKNOWN_PARTITION, index=df.index)
+
+        stamp = datetime.now().strftime("%Y%m%d%H%M%S%f")
+        paths = []
+        for (date, ticker), part in df.groupby([dates, tickers], sort=True):
+            dirname = self.partition_dir(endpoint, date, ticker if keys["ticker"] else None)
+            os.makedirs(dirname, exist_ok=True)
+
+            path = os.path.join(dirname, f"part-{stamp}-{uuid.uuid4().hex[:8]}{self.ext}")
+            self.__write_file(part.reset_index(drop=True), path)
+            paths.append(path)
+
+        return paths
+
+    def read(self, endpoint, columns=None, start=None, end=None, tickers=None):
+        # start/end are inclusive bounds on the endpoint's time column; tickers is a str or list.
+        keys    = self.__partition_keys(endpoint)
+        tickers = [tickers] if isinstance(tickers, str) else tickers
+        start   = None if start is None else to_utc_datetime(pd.Series([start])).iloc[0]
+        end     = None if end   is None else to_utc_datetime(pd.Series([end])).iloc[0]
+
+        paths  = self.partition_files(endpoint, start=start, end=end, tickers=tickers if keys["ticker"] else None)
+        frames = [self.__read_file(path, self.__projection(path, columns, keys)) for path in paths]
+        frames = [frame for frame in frames if not frame.empty]
+
+        if not frames:
+            return pd.DataFrame(columns=columns)
+
+        df = pd.concat(frames, axis=0, ignore_index=True)
+
+        # Row-level predicates for partitions that straddle the requested bounds.
+        time_col = self.__time_col(df, keys)
+        if time_col and (start is not None or end is not None):
+            times = to_utc_datetime(df[time_col], keys["format"])
+            mask  = pd.Series(True, index=df.index)
+            if start is not None:
+                mask &= times >= start
+            if end is not None:
+                mask &= times <= end
+            df = df[mask]
+
+        if tickers and not keys["ticker"] and "tickers" in df.columns:
+            pattern = "|".join(rf"\b{re.escape(t)}\b" for t in tickers)
+            df      = df[df["tickers"].astype(str).str.contains(pattern, regex=True, na=False)]
+
+        if columns:
+            df = df.loc[:, [col for col in columns if col in df.columns]]
+
+        return df.reset_index(drop=True)
+
+    def partition_dir(self, endpoint, date, ticker=None):
+        dirname = os.path.join(self.root, endpoint, f"date={date}")
+        if ticker is not None:
+            dirname = os.path.join(dirname, f"ticker={urllib.parse.quote(str(ticker), safe='')}")
+
+        return dirname
+
+    def partition_files(self, endpoint, start=None, end=None, tickers=None):
+        # Prune on the directory names alone; no data file is opened here.
+        endpoint_dir = os.path.join(self.root, endpoint)
+        if not os.path.isdir(endpoint_dir):
+            return []
+
+        start_day = None if start is None else start.strftime("%Y-%m-%d")
+        end_day   = None if end   is None else end.strftime("%Y-%m-%d")
+        wanted    = None if not tickers else {urllib.parse.quote(str(t), safe="") for t in tickers}
+
+        paths = []
+        for date_dir in sorted(os.listdir(endpoint_dir)):
+            date = date_dir.split("=", 1)[-1]
+
+            if date != UNKNOWN_PARTITION:
+                if start_day and date < start_day:
+                    continue
+                if end_day and date > end_day:
+                    continue
+
+            for dirpath, dirnames, filenames in os.walk(os.path.join(endpoint_dir, date_dir)):
+                dirnames.sort()
+                ticker_dir = os.path.basename(dirpath)
+
+                if wanted is not None and ticker_dir.startswith("ticker=") and ticker_dir[len("ticker="):] not in wanted:
+                    continue
+
+                paths += [os.path.join(dirpath, f) for f in sorted(filenames) if f.endswith(self.ext)]
+
+        return paths
+
+    def __write_file(self, df, path):
+        tmp = path + ".tmp"
+        if self.fmt == "parquet":
+            df.to_parquet(tmp, compression=self.compression, index=False)
+        else:
+            df.to_feather(tmp, compression=self.compression)
+        os.replace(tmp, path)
+
+    def __read_file(self, path, columns):
+        if self.fmt == "parquet":
+            return pd.read_parquet(path, columns=columns)
+        else:
+            return pd.read_feather(path, columns=columns)
+
+    def __projection(self, path, columns, keys):
+        if not columns:
+            return None
+
+        # Key columns are always loaded so the row-level predicates can be applied.
+        available = self.__file_columns(path)
+        wanted    = list(columns) + keys["time"] + [keys["ticker"], "tickers"]
+
+        return [col for col in dict.fromkeys(wanted) if col in available]
+
+    def __file_columns(self, path):
+        import pyarrow.ipc     as ipc
+        import pyarrow.parquet as pq
+
+        # Only the file footer/schema is read.
+        if self.fmt == "parquet":
+            return pq.read_schema(path).names
+        else:
+            return ipc.open_file(path).schema.names
+
+    def __partition_dates(self, df, keys):
+        time_col = self.__time_col(df, keys)
+        if not time_col:
+            return pd.Series(UNKNOWN_PARTITION, index=df.index)
+
+        times = to_utc_datetime(df[time_col], keys["format"])
+
+        return times.dt.strftime("%Y-%m-%d").fillna(UNKNOWN_PARTITION)
+
+    def __partition_keys(self, endpoint):
+        if endpoint not in PARTITION_KEYS:
+            raise ValueError(f"Variable 'endpoint' must be one of the values in {list(PARTITION_KEYS)}." +
+                             f"'{endpoint}' is not valid.")
+
+        return PARTITION_KEYS[endpoint]
+
+    @staticmethod
+    def __time_col(df, keys):
+        return next((col for col in keys["time"] if col in df.columns), None)
+
+    @staticmethod
+    def __prepare(df):
+        # Columnar formats need one type per column: nested API values (tags, platform, quote
+        # dicts) are stored as JSON text, mixed scalar columns as plain text.
+        df = df.loc[:, [col for col in df.columns if not str(col).startswith("Unnamed: ")]].copy()
+
+        for col in df.columns[df.dtypes == object]:
+            values = df[col]
+            kinds  = set(values.dropna().map(type))
+
+            if kinds <= {str}:
+                continue
+
+            df[col] = values.map(
+                lambda v: v if v is None or isinstance(v, str) or v != v
+                else json.dumps(v) if isinstance(v, (dict, list))
+                else str(v)
+            )
+
+        return df
+
+
+STORAGE_BACKENDS = {
+    "parquet": lambda root: PartitionedStorage(root, fmt="parquet"),
+    "feather": lambda root: PartitionedStorage(root, fmt="feather"),
+}
+
+
+def get_storage(backend="parquet", root=ARCHIVE_DIR):
+    if backend not in STORAGE_BACKENDS:
+        raise ValueError(f"Variable 'backend' must be one of the values in {list(STORAGE_BACKENDS)}." +
+                         f"'{backend}' is not valid.")
+
+    return STORAGE_BACKENDS[backend](root)
+
+
+def csv_endpoint(filename):
+    # "latest-quotes_data_ALL.csv" -> "latest-quotes"
+    name = os.path.splitext(os.path.basename(filename))[0]
+    name = re.sub("^(debug|sandbox)_", "", name)
+
+    for prefix in sorted(CSV_ENDPOINTS, key=len, reverse=True):
+        if name == prefix or name.startswith(prefix + "_"):
+            return CSV_ENDPOINTS[prefix]
+
+    return None
+
+
+def migrate_csv(filename, storage, endpoint=None, chunksize=50_000):
+    # One-shot conversion of a flat CSV archive into partitions, streamed in chunks.
+    endpoint = endpoint or csv_endpoint(filename)
+    if endpoint is None:
+        raise ValueError(f"Cannot infer the endpoint of '{filename}'.")
+
+    rows = 0
+    for chunk in pd.read_csv(filename, chunksize=chunksize):
+        storage.write(chunk, endpoint)
+        rows += len(chunk)
+
+    return rows
+
+
+if __name__ == "__main__":
+    # Usage: python utils/storage.py [parquet|feather] [csv files...]
+    #   Defaults to every data/*_ALL.csv archive.
+    args    = sys.argv[1:]
+    backend = args.pop(0) if args and args[0] in STORAGE_BACKENDS else "parquet"
+    files   = args or sorted(
+        os.path.join(DATA_DIR, f) for f in os.listdir(DATA_DIR) if f.endswith("_ALL.csv")
+    )
+
+    storage = get_storage(backend)
+    for filename in files:
+        rows = migrate_csv(filename, storage)
+        print(f"Migrated : {filename} ({rows} rows) -> {os.path.join(storage.root, csv_endpoint(filename))}")
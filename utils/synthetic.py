@@ -0,0 +1,186 @@
+import random
+import string
+
+from datetime import datetime, timedelta, timezone
+
+
+# Synthetic, schema-faithful API payloads for benchmarks and offline load tests.
+# Field names and nesting follow the real CoinMarketCap v1 and Crypto News responses.
+
+CMC_SEED_COINS = [
+    (1,    "Bitcoin",  "BTC",  "bitcoin"),
+    (1027, "Ethereum", "ETH",  "ethereum"),
+    (2010, "Cardano",  "ADA",  "cardano"),
+    (2,    "Litecoin", "LTC",  "litecoin"),
+    (328,  "Monero",   "XMR",  "monero"),
+    (74,   "Dogecoin", "DOGE", "dogecoin"),
+]
+
+NEWS_SOURCES = ["Coindesk", "Forbes", "AMBCrypto", "Coingape", "Cointelegraph", "Decrypt", "NewsBTC"]
+SENTIMENTS   = ["Positive", "Negative", "Neutral"]
+
+
+def timestamp(dt):
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+def cmc_coin(i, rng):
+    # The first coins are the project's tracked set; the rest get generated names.
+    if i < len(CMC_SEED_COINS):
+        cmc_id, name, symbol, slug = CMC_SEED_COINS[i]
+    else:
+        symbol = "".join(rng.choice(string.ascii_uppercase) for _ in range(4)) + str(i)
+        cmc_id, name, slug = 10_000 + i, f"Coin {symbol}", f"coin-{symbol.lower()}"
+
+    return cmc_id, name, symbol, slug
+
+
+def cmc_record(i, rng, now, currency="USD", tokens=0.5):
+    cmc_id, name, symbol, slug = cmc_coin(i, rng)
+    price    = rng.lognormvariate(0, 3)
+    supply   = rng.uniform(1e6, 1e11)
+    platform = None if rng.random() >= tokens else {
+        "id": 1027, "name": "Ethereum", "symbol": "ETH", "slug": "ethereum", "token_address": "0x" + "0" * 40,
+    }
+
+    return {
+        "id":                 cmc_id,
+        "name":               name,
+        "symbol":             symbol,
+        "slug":               slug,
+        "num_market_pairs":   rng.randint(1, 9000),
+        "date_added":         timestamp(now - timedelta(days=rng.randint(30, 4000))),
+        "tags":               rng.sample(["mineable", "pow", "defi", "store-of-value", "payments", "memes"], 2),
+        "max_supply":         None if rng.random() < 0.3 else supply * 2,
+        "circulating_supply": supply,
+        "total_supply":       supply * 1.1,
+        "is_active":          1,
+        "platform":           platform,
+        "cmc_rank":           i + 1,
+        "is_fiat":            0,
+        "last_updated":       timestamp(now),
+        "quote": {
+            currency: {
+                "price":                    price,
+                "volume_24h":               price * supply * rng.uniform(0.01, 0.2),
+                "percent_change_1h":        rng.gauss(0, 1),
+                "percent_change_24h":       rng.gauss(0, 4),
+                "percent_change_7d":        rng.gauss(0, 10),
+                "percent_change_30d":       rng.gauss(0, 20),
+                "percent_change_60d":       rng.gauss(0, 30),
+                "percent_change_90d":       rng.gauss(0, 40),
+                "market_cap":               price * supply,
+                "market_cap_dominance":     rng.uniform(0, 50),
+                "fully_diluted_market_cap": price * supply * 1.1,
+                "last_updated":             timestamp(now),
+            }
+        },
+    }
+
+
+def cmc_payload(coins=100, endpoint="latest-quotes", currency="USD", tokens=0.5, seed=0, now=None):
+    # latest-quotes: "data" keyed by CMC id; latest-listings: "data" is a list of records.
+    # tokens is the share of records carrying a "platform" dict (the rest have null).
+    rng     = random.Random(seed)
+    now     = now or datetime.now(timezone.utc)
+    records = [cmc_record(i, rng, now, currency, tokens) for i in range(coins)]
+
+    if endpoint == "latest-listings":
+        data = records
+    else:
+        data = {str(record["id"]): record for record in records}
+
+    return {
+        "status": {
+            "timestamp":     timestamp(now),
+            "error_code":    0,
+            "error_message": None,
+            "elapsed":       rng.randint(5, 50),
+            "credit_count":  max(1, coins // 200 + 1),
+            "notice":        None,
+        },
+        "data": data,
+    }
+
+
+def news_article(i, rng, now, tickers):
+    picked = rng.sample(tickers, rng.choice([1, 1, 1, 2, 3]) if len(tickers) >= 3 else 1)
+    date   = now - timedelta(minutes=7 * i + rng.randint(0, 6))
+    title  = f"{picked[0]} market update {i}: " + " ".join(rng.choice(["rally", "dip", "whales", "ETF", "upgrade"]) for _ in range(5))
+
+    return {
+        "news_url":    f"https://example.com/news/{i}-{'-'.join(t.lower() for t in picked)}",
+        "image_url":   f"https://example.com/images/{i}.jpg",
+        "title":       title,
+        "text":        title + ". " + " ".join(rng.choice(["Bitcoin", "New York", "Tokyo", "London", "price"]) for _ in range(30)),
+        "source_name": rng.choice(NEWS_SOURCES),
+        "date":        date.strftime("%a, %d %b %Y %H:%M:%S %z"),
+        "topics":      [],
+        "sentiment":   rng.choice(SENTIMENTS),
+        "type":        "Article",
+        "tickers":     picked,
+        "news_id":     100_000 - i,
+        "rank_score":  round(rng.uniform(1, 7), 2),
+        "eventid":     None,
+    }
+
+
+def news_payload(items=50, tickers=("BTC", "ETH", "ADA", "LTC", "XMR", "DOGE"), page=1, total_pages=10, seed=0, now=None):
+    rng   = random.Random(seed + page)
+    now   = now or datetime.now(timezone.utc)
+    start = (page - 1) * items
+
+    return {
+        "data":        [news_article(start + i, rng, now, list(tickers)) for i in range(items)],
+        "total_pages": total_pages,
+    }
+
+
+def mention_counts(rng, scale=100):
+    return {sentiment: rng.randint(0, scale) for sentiment in ["Neutral", "Positive", "Negative"]}
+
+
+def stats_payload(tickers=("BTC", "ETH", "ADA", "LTC", "XMR", "DOGE"), days=7, seed=0, now=None):
+    # ticker-stats: daily counts per ticker under "data" (newest day first), totals under "total".
+    rng   = random.Random(seed)
+    now   = now or datetime.now(timezone.utc)
+    dates = [(now - timedelta(days=d)).strftime("%Y-%m-%d") for d in range(days)]
+
+    data = {
+        date: {ticker: {**mention_counts(rng), "sentiment_score": round(rng.uniform(-1.5, 1.5), 3)} for ticker in tickers}
+        for date in dates
+    }
+
+    total = {}
+    for ticker in tickers:
+        counts = {sentiment: sum(data[date][ticker][sentiment] for date in dates) for sentiment in ["Positive", "Negative", "Neutral"]}
+        total[ticker] = {
+            **{f"Total {sentiment}": count for sentiment, count in counts.items()},
+            "Sentiment Score": round(sum(data[date][ticker]["sentiment_score"] for date in dates) / days, 3),
+        }
+
+    return {"data": data, "total": total}
+
+
+def top_mention_payload(tickers=None, count=50, seed=0):
+    # ticker-top-mention: the most mentioned tickers, busiest first.
+    rng     = random.Random(seed)
+    tickers = list(tickers) if tickers else [cmc_coin(i, rng)[2] for i in range(count)]
+    names   = {symbol: name for _, name, symbol, _ in CMC_SEED_COINS}
+
+    records = []
+    for ticker in tickers:
+        counts = mention_counts(rng, scale=1000)
+        records.append({
+            "ticker":            ticker,
+            "name":              names.get(ticker, f"Coin {ticker}"),
+            "total_mentions":    sum(counts.values()),
+            "positive_mentions": counts["Positive"],
+            "negative_mentions": counts["Negative"],
+            "neutral_mentions":  counts["Neutral"],
+            "sentiment_score":   round(rng.uniform(-1.5, 1.5), 3),
+        })
+
+    records.sort(key=lambda record: record["total_mentions"], reverse=True)
+
+    return {"data": {"all": records}}
@@ -0,0 +1,306 @@
+import sys
+sys.path.append('.')
+
+import io
+import os
+import tempfile
+
+import numpy  as np
+import pandas as pd
+
+from utils.timezone import to_utc_datetime
+
+
+STATE_DIR   = os.path.join(os.getcwd(), "data", ".state")
+TICKERS_COL = "tickers"
+TIME_COL    = "date"
+
+# Bytes scanned per step when catching up with an archive.
+CHUNK_SIZE = 8 * 1024**2
+
+NAT = np.iinfo(np.int64).min
+
+
+def split_tickers(values):
+    # "BTC,ETH", "['BTC', 'ETH']" (archived lists) or ["BTC", "ETH"] -> ["BTC", "ETH"].
+    # Each distinct value is parsed once, so repeated ticker sets cost a lookup.
+    values  = pd.Series(values).astype(str)
+    uniques = pd.unique(values)
+    parsed  = pd.Series(uniques).str.strip("[]").str.replace("'", "").str.replace('"', "").str.split(",")
+    parsed  = parsed.map(lambda tickers: [t.strip() for t in tickers if t.strip()])
+
+    return values.map(dict(zip(uniques, parsed)))
+
+
+def record_ends(buf):
+    # Offsets just past every complete CSV record in buf, which must start on a record boundary.
+    # A newline only ends a record outside quoted fields, i.e. after an even number of quote
+    # characters ("" escapes count twice, so they keep the parity). The uint8 running count wraps
+    # at 256, which keeps the parity intact.
+    data   = np.frombuffer(buf, dtype=np.uint8)
+    quotes = np.cumsum(data == ord('"'), dtype=np.uint8) & 1
+
+    return np.flatnonzero((data == ord("\n")) & (quotes == 0)) + 1
+
+
+class TickerIndex:
+    # Inverted index over a CSV news archive, persisted next to the other collection state:
+    #   starts:   byte offset of every row, so any row can be read with a seek instead of a scan.
+    #   postings: (ticker, date, row) triples sorted by ticker then date: one ticker's rows in a
+    #             date range are two binary searches away.
+    #   dates:    row ids ordered by date, for date-only queries.
+    # The index remembers how far into the archive it got. Appended bytes are scanned on the next
+    # load; a rewritten archive (different header or bytes before that point) is re-indexed.
+    TAIL = 64
+
+    def __init__(self, archive, key=TICKERS_COL, time_col=TIME_COL, state_dir=STATE_DIR):
+        self.archive  = archive
+        self.key      = key
+        self.time_col = time_col
+        self.path     = os.path.join(state_dir, os.path.basename(archive) + ".tickers.npz")
+
+        self.load()
+
+    def __len__(self):
+        return len(self.starts)
+
+    @property
+    def columns(self):
+        return pd.read_csv(io.BytesIO(self.header), nrows=0).columns
+
+    def reset(self):
+        self.header      = b""
+        self.size        = 0
+        self.tail        = b""
+        self.starts      = np.empty(0, dtype=np.int64)
+        self.row_dates   = np.empty(0, dtype=np.int64)
+        self.date_order  = np.empty(0, dtype=np.int64)
+        self.vocab       = []
+        self.post_ticker = np.empty(0, dtype=np.int32)
+        self.post_date   = np.empty(0, dtype=np.int64)
+        self.post_row    = np.empty(0, dtype=np.int64)
+        self.changed     = True
+
+    def load(self):
+        self.reset()
+
+        if os.path.isfile(self.path):
+            with np.load(self.path) as saved:
+                self.header      = saved["header"].tobytes()
+                self.size        = int(saved["size"])
+                self.tail        = saved["tail"].tobytes()
+                self.starts      = saved["starts"]
+                self.row_dates   = saved["row_dates"]
+                self.date_order  = saved["date_order"]
+                self.vocab       = list(saved["vocab"])
+                self.post_ticker = saved["post_ticker"]
+                self.post_date   = saved["post_date"]
+                self.post_row    = saved["post_row"]
+            self.changed = False
+
+            if not self.valid():
+                self.reset()
+
+        self.update()
+
+    def valid(self):
+        # The indexed part of the archive must be untouched: same header and same bytes just
+        # before the indexed size.
+        if not os.path.isfile(self.archive) or os.path.getsize(self.archive) < self.size:
+            return False
+
+        with open(self.archive, "rb") as f:
+            if f.read(len(self.header)) != self.header:
+                return False
+
+            f.seek(self.size - len(self.tail))
+            return f.read(len(self.tail)) == self.tail
+
+    def update(self):
+        # Index whatever was appended to the archive since the last update.
+        with open(self.archive, "rb") as f:
+            f.seek(self.size)
+            buf = b""
+
+            while True:
+                chunk = f.read(CHUNK_SIZE)
+                buf  += chunk
+                ends  = record_ends(buf)
+
+                # At EOF, a final record without a trailing newline still counts.
+                if not chunk and buf.strip() and (not len(ends) or ends[-1] != len(buf)):
+                    ends = np.append(ends, len(buf))
+
+                if len(ends):
+                    self.__index_block(buf[:ends[-1]], ends)
+                    buf = buf[ends[-1]:]
+
+                if not chunk:
+                    break
+
+            if self.changed:
+                f.seek(max(self.size - self.TAIL, 0))
+                self.tail = f.read(min(self.TAIL, self.size))
+
+        return self
+
+    def __index_block(self, block, ends):
+        # block holds the complete records found at the current end of the index.
+        start  = self.size
+        bounds = np.concatenate([[0], ends]).astype(np.int64)
+
+        if not self.header:
+            self.header = block[:bounds[1]]
+            bounds      = bounds[1:]
+
+        self.size    = start + int(bounds[-1])
+        self.changed = True
+
+        # Blank lines are not rows (pd.read_csv skips them); they stay attached to the row above.
+        first, last = bounds[:-1], bounds[1:]
+        keep        = np.ones(len(first), dtype=bool)
+        for i in np.flatnonzero(last - first <= 2):
+            keep[i] = bool(block[first[i]:last[i]].strip())
+
+        if not keep.any():
+            return
+
+        columns = self.columns
+        usecols = [col for col in [self.key, self.time_col] if col in columns]
+        df      = pd.read_csv(io.BytesIO(self.header + block[bounds[0]:]), usecols=usecols)
+
+        if len(df) != keep.sum():
+            raise ValueError(f"Archive '{self.archive}' could not be indexed: {keep.sum()} records found, " +
+                             f"{len(df)} rows parsed.")
+
+        rows  = np.arange(len(self), len(self) + len(df), dtype=np.int64)
+        dates = self.__dates(df)
+
+        self.starts     = np.concatenate([self.starts, start + first[keep]])
+        self.row_dates  = np.concatenate([self.row_dates, dates])
+        self.date_order = np.argsort(self.row_dates, kind="stable")
+
+        if self.key not in df.columns:
+            return
+
+        tickers = split_tickers(df[self.key].where(df[self.key].notna(), "")).explode()
+        tickers = tickers[tickers.notna()]
+
+        vocab = {ticker: i for i, ticker in enumerate(self.vocab)}
+        for ticker in pd.unique(tickers.values):
+            if ticker not in vocab:
+                vocab[ticker] = len(self.vocab)
+                self.vocab.append(ticker)
+
+        pos              = tickers.index.values
+        self.post_ticker = np.concatenate([self.post_ticker, tickers.map(vocab).values.astype(np.int32)])
+        self.post_date   = np.concatenate([self.post_date, dates[pos]])
+        self.post_row    = np.concatenate([self.post_row, rows[pos]])
+
+        order            = np.lexsort((self.post_row, self.post_date, self.post_ticker))
+        self.post_ticker = self.post_ticker[order]
+        self.post_date   = self.post_date[order]
+        self.post_row    = self.post_row[order]
+
+    def __dates(self, df):
+        if self.time_col not in df.columns:
+            return np.full(len(df), NAT, dtype=np.int64)
+
+        dates = to_utc_datetime(df[self.time_col]).astype("datetime64[ns, UTC]")
+        return dates.values.view(np.int64)
+
+    def rows(self, tickers=None, start=None, end=None):
+        # Sorted row ids of the articles mentioning any of tickers, published within [start, end].
+        lo, hi = self.__bounds(start, end)
+
+        if tickers is None:
+            dates = self.row_dates[self.date_order]
+            return np.sort(self.date_order[np.searchsorted(dates, lo):np.searchsorted(dates, hi, side="right")])
+
+        tickers = [tickers] if isinstance(tickers, str) else tickers
+        vocab   = {ticker: i for i, ticker in enumerate(self.vocab)}
+        found   = []
+        for ticker in tickers:
+            if ticker not in vocab:
+                continue
+
+            first = np.searchsorted(self.post_ticker, vocab[ticker])
+            last  = np.searchsorted(self.post_ticker, vocab[ticker], side="right")
+            dates = self.post_date[first:last]
+
+            found.append(self.post_row[first:last][np.searchsorted(dates, lo):np.searchsorted(dates, hi, side="right")])
+
+        return np.unique(np.concatenate(found)) if found else np.empty(0, dtype=np.int64)
+
+    @staticmethod
+    def __bounds(start, end):
+        # Undated rows only match queries without date bounds.
+        if start is None and end is None:
+            return NAT, np.iinfo(np.int64).max
+
+        lo = NAT + 1 if start is None else to_utc_datetime(pd.Series([start])).astype("datetime64[ns, UTC]").iloc[0].value
+        hi = np.iinfo(np.int64).max if end is None else to_utc_datetime(pd.Series([end])).astype("datetime64[ns, UTC]").iloc[0].value
+
+        return lo, hi
+
+    def read(self, tickers=None, start=None, end=None, **kwargs):
+        # Parse only the matching rows: each run of consecutive rows is one seek and one read.
+        rows  = self.rows(tickers, start, end)
+        parts = [self.header]
+
+        if len(rows):
+            breaks = np.flatnonzero(np.diff(rows) != 1) + 1
+            with open(self.archive, "rb") as f:
+                for run in np.split(rows, breaks):
+                    first = int(self.starts[run[0]])
+                    last  = int(self.starts[run[-1] + 1]) if run[-1] + 1 < len(self) else self.size
+
+                    f.seek(first)
+                    parts.append(f.read(last - first))
+
+        return pd.read_csv(io.BytesIO(b"".join(parts)), **kwargs)
+
+    def save(self):
+        if not self.changed:
+            return
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        fd, tmp = tempfile.mkstemp(prefix=".tmp_", suffix=".npz", dir=os.path.dirname(self.path))
+        with os.fdopen(fd, "wb") as f:
+            np.savez(
+                f,
+                header      = np.frombuffer(self.header, dtype=np.uint8),
+                size        = np.int64(self.size),
+                tail        = np.frombuffer(self.tail, dtype=np.uint8),
+                starts      = self.starts,
+                row_dates   = self.row_dates,
+                date_order  = self.date_order,
+                vocab       = np.array(self.vocab, dtype=str),
+                post_ticker = self.post_ticker,
+                post_date   = self.post_date,
+                post_row    = self.post_row,
+            )
+        os.replace(tmp, self.path)
+
+        self.changed = False
+
+
+def read_ticker_news(archive, tickers=None, start=None, end=None, **kwargs):
+    # One-call lookup for the dashboard/plots. The saved index is kept current by the archive
+    # writes; anything appended since is caught up in memory, never written from here.
+    return TickerIndex(archive).read(tickers, start, end, **kwargs)
+
+
+if __name__ == "__main__":
+    # Usage: python utils/ticker_index.py [news archive csv files...]
+    #   Builds (or catches up) the ticker index of every data/*ticker-news_data*.csv archive.
+    data_dir = os.path.join(os.getcwd(), "data")
+    files    = sys.argv[1:] or sorted(
+        os.path.join(data_dir, f) for f in os.listdir(data_dir) if "ticker-news_data" in f
+    )
+
+    for filename in files:
+        index = TickerIndex(filename)
+        index.save()
+        print(f"Indexed : {filename} ({len(index)} rows, {len(index.vocab)} tickers)")
@@ -19,4 +19,41 @@ def get_et_datetime(client_timestamp, strformat):
 def get_et_pd_timestamp(client_timestamp):
     et_timestamp = set_et_timestamp(client_timestamp)    
 
-    return pd.Timestamp(et_timestamp)
\ No newline at end of file
+    return pd.Timestamp(et_timestamp)
+
+
+# Formats found in the archives, tried in order before falling back to per-element inference
+# (which goes through dateutil and is ~100x slower): API/ISO timestamps and Crypto News RFC 2822 dates.
+KNOWN_FORMATS = ["ISO8601", "%a, %d %b %Y %H:%M:%S %z"]
+
+
+def to_utc_datetime(values, fmt=None):
+    # Archived timestamps mix formats ("Tue, 17 Aug 2021 07:19:49 -0400" and
+    # "2021-08-21 10:30:18+00:00"), so let pandas infer per element where supported.
+    if fmt:
+        return pd.to_datetime(values, format=fmt, utc=True, errors="coerce")
+
+    values = values if isinstance(values, pd.Series) else pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return pd.to_datetime(values, utc=True)
+
+    times   = pd.Series(pd.NaT, index=values.index, dtype="datetime64[ns, UTC]")
+    pending = values.notna()
+
+    for known in KNOWN_FORMATS:
+        if not pending.any():
+            return times
+        try:
+            times[pending] = pd.to_datetime(values[pending], format=known, utc=True, errors="coerce")
+        except (TypeError, ValueError):
+            # e.g. "ISO8601" is not understood by pandas < 2.0.
+            continue
+        pending &= times.isna()
+
+    if pending.any():
+        try:
+            times[pending] = pd.to_datetime(values[pending], format="mixed", utc=True, errors="coerce")
+        except (TypeError, ValueError):
+            times[pending] = pd.to_datetime(values[pending], utc=True, errors="coerce")
+
+    return times